@@ -0,0 +1,113 @@
+/*
+ * Callbacks exécutés dans le navigateur (voir dashboard.py, app.clientside_callback).
+ *
+ * restaurants.lien_recherche : lien de recherche Google du restaurant sélectionné.
+ * restaurants.types et restaurants.options : dropdowns en cascade de la vue « Trouve ton restaurant »
+ * quand CONFIG['CLIENTSIDE_CASCADE'] est activé. La structure département -> type -> noms
+ * (/data/restaurants/<version>.json, voir NameSearchIndex.cascade) est téléchargée une fois par version
+ * puis toutes les mises à jour des dropdowns se font sans appel au serveur.
+ */
+(function () {
+    var SUGGESTIONS = 20;
+    var cascades = {};
+
+    function fold(text) {
+        // Même repli que name_search.fold_text : sans accents, en minuscules, mots séparés par une espace
+        return text.normalize('NFKD').replace(/[^\x00-\x7f]/g, '').toLowerCase()
+            .replace(/[^a-z0-9]+/g, ' ').trim();
+    }
+
+    function load(store) {
+        var version = store && store.version;
+        if (!cascades[version]) {
+            cascades[version] = fetch('/data/restaurants/' + version + '.json')
+                .then(function (response) { return response.json(); })
+                .then(function (cascade) {
+                    cascade.replies = cascade.noms.map(function (nom) { return ' ' + fold(nom); });
+                    return cascade;
+                });
+        }
+        return cascades[version];
+    }
+
+    function entries(cascade, departement, typeRestaurant) {
+        // Numéros des noms d'un département (et d'un type), décodés et triés
+        var pairs = cascade.departements[departement] || [];
+        var t = cascade.types.indexOf(typeRestaurant);
+        var result = [];
+        pairs.forEach(function (pair) {
+            if (typeRestaurant && pair[0] !== t) {
+                return;
+            }
+            var entry = 0;
+            pair[1].forEach(function (delta) {
+                entry += delta;
+                result.push(entry);
+            });
+        });
+        if (!typeRestaurant) {
+            result.sort(function (a, b) { return a - b; });
+            result = result.filter(function (entry, i) { return i === 0 || entry !== result[i - 1]; });
+        }
+        return result;
+    }
+
+    function option(nom) {
+        return {label: nom, value: nom, search: nom + ' ' + fold(nom)};
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        restaurants: {
+            lien_recherche: function (restaurant, typeRestaurant, departement) {
+                if (restaurant && typeRestaurant && departement) {
+                    var query = [restaurant, typeRestaurant, departement].map(encodeURIComponent).join('+');
+                    return ['https://www.google.com/search?q=' + query, {display: 'inline-block'},
+                            'Chercher ' + restaurant + ' sur Google'];
+                }
+                return ['', {display: 'none'}, 'Rechercher sur Google'];
+            },
+
+            types: function (departement, store) {
+                if (!departement) {
+                    return [{label: 'Aucun', value: 'aucun'}];
+                }
+                return load(store).then(function (cascade) {
+                    return (cascade.departements[departement] || []).map(function (pair) {
+                        var typeRestaurant = cascade.types[pair[0]];
+                        return {label: typeRestaurant, value: typeRestaurant};
+                    });
+                });
+            },
+
+            options: function (searchValue, typeRestaurant, departement, store) {
+                var context = window.dash_clientside.callback_context;
+                // Le choix d'une option vide la saisie : on conserve alors les options affichées
+                if (!searchValue && context.triggered.length
+                        && context.triggered[0].prop_id === 'restaurant-dropdown3.search_value') {
+                    throw window.dash_clientside.PreventUpdate;
+                }
+                if (!searchValue && (!typeRestaurant || !departement)) {
+                    return [];
+                }
+                return load(store).then(function (cascade) {
+                    var words = fold(searchValue || '').split(' ').filter(Boolean);
+                    // Sans département sélectionné, la recherche porte sur toute la France
+                    var scope = departement ? entries(cascade, departement, typeRestaurant) : null;
+                    var count = scope ? scope.length : cascade.noms.length;
+                    var first = [], others = [];
+                    for (var i = 0; i < count && first.length < SUGGESTIONS; i++) {
+                        var entry = scope ? scope[i] : i;
+                        var reply = cascade.replies[entry];
+                        if (words.every(function (word) { return reply.indexOf(' ' + word) >= 0; })) {
+                            // Les noms qui commencent par le premier mot saisi sont proposés en premier
+                            (words.length && reply.lastIndexOf(' ' + words[0], 0) !== 0 ? others : first).push(entry);
+                        }
+                    }
+                    return first.concat(others).slice(0, SUGGESTIONS).map(function (entry) {
+                        return option(cascade.noms[entry]);
+                    });
+                });
+            }
+        }
+    });
+})();
@@ -0,0 +1,65 @@
+"""
+Compare le nettoyage des données brutes à la relecture des données nettoyées partitionnées (voir cleaned_store).
+
+Usage : python -m benchmarks.bench_cleaned_store --rows 100000 1000000
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+import warnings
+import pandas as pd
+
+from src.utils.clean_data import clean_data
+from src.utils.cleaned_store import input_key, read_cleaned, write_cleaned
+from src.utils.serving import COLONNES_PARTAGEES
+from benchmarks.synthetic import generate_food_service
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore", FutureWarning)
+    for n_rows in args.rows:
+        with tempfile.TemporaryDirectory() as directory:
+            snapshot = os.path.join(directory, "brut.parquet")
+            generate_food_service(n_rows).to_parquet(snapshot)
+
+            durations = {}
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                data = clean_data(pd.read_parquet(snapshot))
+            durations["lecture + nettoyage"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            key = input_key(snapshot)
+            durations["clé des données brutes"] = time.perf_counter() - start
+
+            store = os.path.join(directory, "store")
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                write_cleaned(data, key, store)
+            durations["écriture partitionnée"] = time.perf_counter() - start
+
+            departement = data['Département'].value_counts().index[0]
+            lectures = {
+                "relecture complète": lambda: read_cleaned(key, directory=store),
+                "colonnes utilisées": lambda: read_cleaned(key, COLONNES_PARTAGEES, directory=store),
+                "un département": lambda: read_cleaned(key, departements=[departement], directory=store),
+            }
+            for name, read in lectures.items():
+                start = time.perf_counter()
+                read()
+                durations[name] = time.perf_counter() - start
+
+            print(f"{n_rows} lignes ({len(data)} nettoyées, plus grand département : {departement})")
+            for name, seconds in durations.items():
+                print(f"  {name:<24} {seconds * 1e3:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
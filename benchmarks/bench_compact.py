@@ -0,0 +1,45 @@
+"""
+Compare la mémoire occupée par les données nettoyées avant et après compact_frame, colonne par colonne,
+et la durée de la conversion. Vérifie que les noms de la métrique nom_type référencent le dictionnaire de la colonne Nom.
+
+Usage : python -m benchmarks.bench_compact --rows 300000 1000000
+"""
+import argparse
+import contextlib
+import io
+import time
+import warnings
+
+from src.utils.aggregation import compute_metrics
+from src.utils.clean_data import clean_data
+from src.utils.compact import compact_frame, resident_bytes
+from benchmarks.synthetic import generate_food_service
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[300_000, 1_000_000])
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore", FutureWarning)
+    for n_rows in args.rows:
+        with contextlib.redirect_stdout(io.StringIO()):
+            data = clean_data(generate_food_service(n_rows))
+        metrics = compute_metrics(data)
+
+        start = time.perf_counter()
+        compact = compact_frame(data)
+        compact_metrics = metrics.share_dictionaries(compact)
+        seconds = time.perf_counter() - start
+
+        before, after = resident_bytes(data), resident_bytes(compact)
+        print(f"{n_rows} lignes ({len(data)} après nettoyage), conversion en {seconds * 1e3:.0f} ms")
+        for column, size in before.items():
+            print(f"  {column:<14} {size / 1e6:8.1f} Mo -> {after.get(column, 0) / 1e6:8.1f} Mo  {compact[column].dtype if column in compact else ''}")
+        print(f"  {'données':<14} {sum(before.values()) / 1e6:8.1f} Mo -> {sum(after.values()) / 1e6:8.1f} Mo")
+        shared = compact_metrics.nom_type.categories is compact['Nom'].cat.categories.to_numpy()
+        print(f"  {'métriques':<14} {compact_metrics.nbytes / 1e6:8.1f} Mo  (noms de nom_type partagés avec la colonne Nom : {shared})")
+
+
+if __name__ == "__main__":
+    main()
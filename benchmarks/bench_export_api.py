@@ -0,0 +1,58 @@
+"""
+Mesure les routes d'export (voir export_api) : durée et taille des réponses complètes, compressées ou non,
+et coût d'une interrogation répétée répondue par 304.
+
+Usage : python -m benchmarks.bench_export_api --rows 100000 1000000
+"""
+import argparse
+import contextlib
+import io
+import time
+import warnings
+
+from src.utils.aggregation import compute_metrics
+from src.utils.clean_data import clean_data
+from src.utils.dashboard import create_app
+from benchmarks.synthetic import generate_food_service
+
+ROUTES = [
+    "/api/metrics/restaurants_par_departement",
+    "/api/metrics/nom_type?format=csv",
+    "/api/counts?by=Département&by=Type",
+    "/api/restaurants",
+    "/api/restaurants?format=csv",
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=200, help="Nombre d'interrogations répondues par 304")
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore", FutureWarning)
+    for n_rows in args.rows:
+        with contextlib.redirect_stdout(io.StringIO()):
+            data = clean_data(generate_food_service(n_rows))
+            client = create_app(data, compute_metrics(data)).server.test_client()
+        print(f"{n_rows} lignes")
+        for route in ROUTES:
+            sizes = {}
+            start = time.perf_counter()
+            for encoding in ("identity", "gzip"):
+                response = client.get(route, headers={"Accept-Encoding": encoding})
+                sizes[encoding] = len(response.get_data())
+            complete = (time.perf_counter() - start) / 2
+            etag = response.headers["ETag"]
+
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                response = client.get(route, headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+            assert response.status_code == 304
+            poll = (time.perf_counter() - start) / args.repeat
+            print(f"  {route:<44} {complete * 1e3:8.1f} ms  {sizes['identity'] / 1e6:7.2f} Mo  "
+                  f"gzip {sizes['gzip'] / 1e6:6.2f} Mo  304 : {poll * 1e6:6.0f} µs")
+
+
+if __name__ == "__main__":
+    main()
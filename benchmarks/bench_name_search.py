@@ -0,0 +1,54 @@
+"""
+Mesure la latence et la taille des réponses de la recherche par nom sur des données synthétiques.
+
+Usage : python -m benchmarks.bench_name_search --rows 100000 1000000
+"""
+import argparse
+import json
+import time
+import warnings
+import numpy as np
+
+from src.utils.clean_data import clean_data
+from src.utils.name_search import NameSearchIndex
+from benchmarks.synthetic import generate_food_service
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore", FutureWarning)
+    rng = np.random.default_rng(0)
+    for n_rows in args.rows:
+        data = clean_data(generate_food_service(n_rows))
+        start = time.perf_counter()
+        index = NameSearchIndex(data)
+        build = time.perf_counter() - start
+
+        # Saisies tirées parmi les noms existants : chaque frappe d'un début de nom est une requête
+        named = data.dropna(subset=['nom_complet'])
+        sample = named.iloc[rng.integers(0, len(named), args.queries)]
+        saisies = [nom[:length] for nom, length in zip(sample['nom_complet'], rng.integers(1, 12, args.queries))]
+        paires = list(zip(sample['Département'], sample['Type']))
+
+        print(f"{n_rows} lignes, {len(index.noms)} noms distincts, index construit en {build:.2f} s")
+        queries = {
+            "toute la France": lambda i: index.options(saisies[i]),
+            "département et type": lambda i: index.options(saisies[i], *paires[i]),
+        }
+        for name, query in queries.items():
+            durations, sizes = [], []
+            for i in range(args.queries):
+                start = time.perf_counter()
+                options = query(i)
+                durations.append((time.perf_counter() - start) * 1e6)
+                sizes.append(len(json.dumps(options)))
+            print(f"  {name:<22} médiane {np.median(durations):8.1f} µs | p95 {np.percentile(durations, 95):8.1f} µs"
+                  f" | réponse {np.mean(sizes) / 1e3:.1f} Ko")
+
+
+if __name__ == "__main__":
+    main()
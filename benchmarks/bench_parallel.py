@@ -0,0 +1,72 @@
+"""
+Compare le nettoyage et le calcul des métriques en série (clean_data puis compute_metrics) au mode parallèle
+(voir parallel) pour 1 à N processus, et vérifie que les résultats sont identiques.
+Le démarrage du pool (import de pandas et de l'application par chaque processus) est mesuré à part :
+en production, le pool est réutilisé d'un rafraîchissement à l'autre.
+
+Usage : python -m benchmarks.bench_parallel --rows 1000000 --workers 1 2 4 8
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+import warnings
+import numpy as np
+import pandas as pd
+
+from src.utils.aggregation import compute_metrics
+from src.utils.clean_data import clean_data
+from src.utils.parallel import parallel_clean_data
+from benchmarks.synthetic import generate_food_service
+
+
+def _identical(serial, parallel) -> bool:
+    """
+    :return: True si les données nettoyées et les métriques des deux modes sont identiques.
+    """
+    (data, metrics), (other, other_metrics) = serial, parallel
+    cube, other_cube = metrics.cube, other_metrics.cube
+    return (data.equals(other) and data.dtypes.equals(other.dtypes) and data.index.equals(other.index)
+            and metrics.to_dict(data) == other_metrics.to_dict(other)
+            and all(np.array_equal(getattr(cube, name), getattr(other_cube, name))
+                    for name in ('dense', 'communes', 'counts', 'offsets')))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000])
+    default_workers = sorted({1, *(2 ** i for i in range(1, 6) if 2 ** i <= (os.cpu_count() or 1)), os.cpu_count() or 1})
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers)
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore", FutureWarning)
+    print(f"{os.cpu_count()} cœurs disponibles")
+    for n_rows in args.rows:
+        with tempfile.TemporaryDirectory() as directory:
+            snapshot = os.path.join(directory, "brut.parquet")
+            generate_food_service(n_rows).to_parquet(snapshot)
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                data = clean_data(pd.read_parquet(snapshot))
+                serial = data, compute_metrics(data)
+                reference = time.perf_counter() - start
+            print(f"{n_rows} lignes")
+            print(f"  {'série':<14} {reference * 1e3:9.1f} ms")
+
+            for workers in args.workers:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    start = time.perf_counter()
+                    parallel_clean_data(snapshot, workers)
+                    cold = time.perf_counter() - start
+                    start = time.perf_counter()
+                    parallel = parallel_clean_data(snapshot, workers)
+                    seconds = time.perf_counter() - start
+                print(f"  {workers:>2} processus   {seconds * 1e3:9.1f} ms  accélération x{reference / seconds:5.2f}  "
+                      f"(avec démarrage du pool : {cold * 1e3:.0f} ms)  identique : {_identical(serial, parallel)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Compare la durée du moteur d'agrégation (compute_metrics) à celle de l'ancienne implémentation de prepare_metrics.
+L'équivalence des résultats est vérifiée par tests/test_aggregation.py.
+
+Usage : python -m benchmarks.bench_prepare_metrics --rows 100000 1000000
+"""
+import argparse
+import time
+import warnings
+from typing import Callable
+import pandas as pd
+
+from src.utils.aggregation import compute_metrics
+from src.utils.clean_data import clean_data
+from benchmarks.synthetic import generate_food_service
+
+
+def prepare_metrics_reference(data: pd.DataFrame) -> dict:
+    """
+    Ancienne implémentation de prepare_metrics (un groupby par métrique), conservée comme référence.
+    """
+    restaurants_par_type = data['Type'].value_counts().reset_index()
+    restaurants_par_type.columns = ['Type', 'Count']
+    restaurants_par_type = restaurants_par_type.to_dict(orient='records')
+    restaurants_par_departement_type = data.groupby(['Département', 'Type'])['Nom'].count().reset_index(name='Count')
+    restaurants_par_departement_type = restaurants_par_departement_type.to_dict(orient='records')
+    restaurants_par_region = data.groupby('Région')['Nom'].count().reset_index(name='Count')
+    restaurants_par_region = restaurants_par_region.to_dict(orient='records')
+    geo_points = data[['Nom', 'latitude', 'longitude']].dropna(subset=['latitude', 'longitude']).to_dict(orient='records')
+    restaurants_par_region = data.groupby('Région')['Nom'].count().reset_index(name='Count')
+    restaurants_par_region = restaurants_par_region.to_dict(orient='records')
+    restaurants_par_type_departement = (data.groupby('Département')['Type'].apply(lambda x: list(x.unique()))).reset_index(name='Type')
+    restaurants_par_type_departement = restaurants_par_type_departement.to_dict(orient='records')
+    restaurants_par_type_nom = (data.groupby(['Département', 'Type'])['Nom'].apply(lambda x: list(x.unique()))).reset_index(name='Nom')
+    restaurants_par_type_nom = restaurants_par_type_nom.to_dict(orient='records')
+    return {
+        "restaurants_par_type": restaurants_par_type,
+        "restaurants_par_departement": restaurants_par_departement_type,
+        "restaurants_par_region": restaurants_par_region,
+        "geo_points": geo_points,
+        "type_departement": restaurants_par_type_departement,
+        "nom_type": restaurants_par_type_nom,
+    }
+
+
+def normalize_reference(metrics: dict, data: pd.DataFrame) -> dict:
+    """
+    Retire du résultat de référence ce que le moteur ne produit volontairement pas :
+    les couples (département, type) absents des données (produits de catégories) et les noms manquants.
+    Le nombre de restaurants par type ne compte, comme les autres décomptes, que les restaurants nommés.
+    """
+    par_type = data.dropna(subset=['Nom'])['Type'].value_counts().reset_index()
+    par_type.columns = ['Type', 'Count']
+    observed = {(r['Département'], r['Type']) for r in metrics['nom_type'] if isinstance(r['Nom'], list)}
+    metrics = dict(metrics)
+    metrics['restaurants_par_type'] = par_type.to_dict(orient='records')
+    metrics['restaurants_par_departement'] = [
+        r for r in metrics['restaurants_par_departement'] if (r['Département'], r['Type']) in observed
+    ]
+    metrics['nom_type'] = [
+        {**r, 'Nom': [n for n in r['Nom'] if isinstance(n, str)]} for r in metrics['nom_type']
+        if (r['Département'], r['Type']) in observed
+    ]
+    metrics['type_departement'] = [
+        {**r, 'Type': [t for t in r['Type'] if isinstance(t, str)]} for r in metrics['type_departement']
+    ]
+    return metrics
+
+
+def best_time(function: Callable, repeat: int) -> float:
+    """
+    :return: Meilleure durée (en secondes) sur repeat exécutions.
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 500_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore", FutureWarning)
+    for n_rows in args.rows:
+        data = clean_data(generate_food_service(n_rows))
+        reference = best_time(lambda: prepare_metrics_reference(data), args.repeat)
+        engine = best_time(lambda: compute_metrics(data), args.repeat)
+        engine_records = best_time(lambda: compute_metrics(data).to_dict(data), args.repeat)
+        print(f"{n_rows:>10} lignes | référence {reference:7.3f} s | compute_metrics {engine:7.3f} s "
+              f"(x{reference / engine:.1f}) | avec conversion en dictionnaires {engine_records:7.3f} s")
+
+
+if __name__ == "__main__":
+    main()
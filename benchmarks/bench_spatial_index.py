@@ -0,0 +1,63 @@
+"""
+Mesure la latence des requêtes de proximité de SpatialIndex sur des données synthétiques.
+
+Usage : python -m benchmarks.bench_spatial_index --rows 300000 1000000
+"""
+import argparse
+import time
+import warnings
+from typing import Callable, List
+import numpy as np
+
+from src.utils.clean_data import clean_data
+from src.utils.spatial_index import SpatialIndex
+from benchmarks.synthetic import generate_food_service
+
+
+def latencies_us(query: Callable[[float, float], object], points: np.ndarray) -> List[float]:
+    """
+    :return: Durée de chaque requête, en microsecondes.
+    """
+    durations = []
+    for lat, lon in points:
+        start = time.perf_counter()
+        query(lat, lon)
+        durations.append((time.perf_counter() - start) * 1e6)
+    return durations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[300_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore", FutureWarning)
+    rng = np.random.default_rng(0)
+    for n_rows in args.rows:
+        data = clean_data(generate_food_service(n_rows))
+        start = time.perf_counter()
+        index = SpatialIndex(data)
+        build = time.perf_counter() - start
+
+        # Points de requête tirés autour de restaurants existants (zones denses comprises)
+        sample = rng.integers(0, len(data), args.queries)
+        points = np.column_stack((
+            data['latitude'].to_numpy()[sample] + rng.normal(0, 0.01, args.queries),
+            data['longitude'].to_numpy()[sample] + rng.normal(0, 0.01, args.queries),
+        ))
+
+        print(f"{n_rows} lignes, index construit en {build:.2f} s")
+        queries = {
+            "rayon 1 km": lambda lat, lon: index.radius_query(lat, lon, 1.0),
+            "rayon 5 km": lambda lat, lon: index.radius_query(lat, lon, 5.0),
+            "10 plus proches": lambda lat, lon: index.knn_query(lat, lon, 10),
+            "10 plus proches (biergarten)": lambda lat, lon: index.knn_query(lat, lon, 10, "biergarten"),
+        }
+        for name, query in queries.items():
+            durations = latencies_us(query, points)
+            print(f"  {name:<30} médiane {np.median(durations):8.1f} µs | p95 {np.percentile(durations, 95):8.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
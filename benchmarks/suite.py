@@ -0,0 +1,328 @@
+"""
+Suite de benchmarks du tableau de bord sur des exports CSV synthétiques (10 000 à 5 000 000 de lignes).
+
+Mesure chaque étape du chargement (get_data servi par un serveur HTTP local, clean_data, save_cleaned_data,
+sauvegarde partitionnée, prepare_metrics, compute_metrics) puis chaque callback de dashboard.py, appelé
+par la route des callbacks de Dash sans navigateur : durée, pic mémoire (tracemalloc) et taille de la réponse.
+Les résultats sont enregistrés en JSON et peuvent être comparés à une référence précédente.
+
+Usage : python -m benchmarks.suite --rows 10000 100000 1000000 --output benchmarks/baselines/ref.json
+        python -m benchmarks.suite --rows 10000 100000 --compare benchmarks/baselines/ref.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import socket
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Tuple
+import dash
+import numpy as np
+import pandas as pd
+
+from src.utils.aggregation import compute_metrics
+from src.utils.clean_data import clean_data, save_cleaned_data
+from src.utils.cleaned_store import read_cleaned, write_cleaned
+from config import CONFIG
+from src.utils.dashboard import _graph_id, create_app
+from src.utils.get_data import get_data
+from src.utils.metrics_store import REGISTRY
+from src.utils.prepare_metrics import prepare_metrics
+from benchmarks.synthetic import http_stand_in, write_food_service_csv
+
+# Nom du jeu de données servi par le serveur HTTP local
+FICHIER_SOURCE = "osm-france-food-service.csv"
+# Écart relatif au-delà duquel une durée médiane est signalée comme une régression
+TOLERANCE = 0.25
+# Durées en dessous desquelles les écarts ne sont pas significatifs (bruit de mesure)
+DUREE_MINIMALE_MS = 2.0
+
+Mesure = Dict[str, float]
+
+
+def measure(func: Callable[[], Any], repeat: int = 1, memory: bool = True) -> Tuple[Mesure, Any]:
+    """
+    Mesure une fonction : durée du premier appel, durée médiane sur repeat appels et, lors d'un appel
+    supplémentaire sous tracemalloc (qui ralentit l'exécution), pic des allocations Python et numpy.
+    :param func: Fonction sans argument à mesurer.
+    :param repeat: Nombre d'appels chronométrés.
+    :param memory: Si False, le pic mémoire n'est pas mesuré.
+    :return: Les mesures et le résultat du dernier appel chronométré.
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        durations.append(time.perf_counter() - start)
+    mesure = {"premier_ms": durations[0] * 1e3, "median_ms": statistics.median(durations) * 1e3}
+    if memory:
+        tracemalloc.start()
+        try:
+            func()
+            mesure["pic_memoire_mo"] = tracemalloc.get_traced_memory()[1] / 1e6
+        finally:
+            tracemalloc.stop()
+    return mesure, result
+
+
+def bench_pipeline(directory: str, n_rows: int, repeat: int) -> Tuple[Dict[str, Mesure], pd.DataFrame]:
+    """
+    Mesure les étapes du chargement sur un export CSV synthétique de n_rows lignes.
+    :param directory: Dossier de travail (export CSV, instantanés, données nettoyées).
+    :param n_rows: Nombre de lignes de l'export.
+    :param repeat: Nombre d'appels chronométrés par étape.
+    :return: Les mesures de chaque étape et les données nettoyées.
+    """
+    write_food_service_csv(os.path.join(directory, FICHIER_SOURCE), n_rows)
+    results = {}
+    with http_stand_in(directory) as root:
+        url = f"{root}/{FICHIER_SOURCE}"
+        snapshots = os.path.join(directory, "snapshots")
+        # Chaque téléchargement part d'un dossier d'instantanés vide
+        results["get_data (téléchargement)"], raw = measure(
+            lambda: get_data(FICHIER_SOURCE, url, cache_dir=tempfile.mkdtemp(dir=directory)), repeat)
+        get_data(FICHIER_SOURCE, url, cache_dir=snapshots)
+        results["get_data (revalidation 304)"], _ = measure(lambda: get_data(FICHIER_SOURCE, url, cache_dir=snapshots), repeat)
+        results["get_data (hors ligne)"], _ = measure(lambda: get_data(FICHIER_SOURCE, offline=True, cache_dir=snapshots), repeat)
+
+    # clean_data ajoute des colonnes à son entrée : chaque appel reçoit une copie superficielle
+    results["clean_data"], data = measure(lambda: clean_data(raw.copy(deep=False)), repeat)
+    del raw
+
+    csv_name = f"benchmark-{os.getpid()}.csv"
+    try:
+        results["save_cleaned_data"], _ = measure(lambda: save_cleaned_data(data, csv_name), repeat)
+    finally:
+        csv_path = os.path.join(os.path.dirname(__file__), "..", "data", "cleaned", csv_name)
+        if os.path.exists(csv_path):
+            os.remove(csv_path)
+
+    store = os.path.join(directory, "store")
+    results["write_cleaned"], _ = measure(lambda: write_cleaned(data, f"cle-{time.perf_counter_ns()}", store), repeat)
+    key = sorted(os.listdir(store))[0]
+    results["read_cleaned"], _ = measure(lambda: read_cleaned(key, directory=store), repeat)
+    results["prepare_metrics"], _ = measure(lambda: prepare_metrics(data), repeat)
+    results["compute_metrics"], _ = measure(lambda: compute_metrics(data), repeat)
+    return results, data
+
+
+def scenarios(data: pd.DataFrame) -> List[Tuple[str, str, Dict[str, Any], str]]:
+    """
+    Construit les appels de callbacks mesurés, avec des valeurs tirées des données (département le plus
+    fréquent, son type le plus fréquent, un restaurant et sa position).
+    :param data: Données nettoyées.
+    :return: Liste de (nom du callback, libellé, valeurs des entrées 'id.propriété', entrée déclenchante).
+    Pour les identifiants à motif, les valeurs sont indexées par 'type.propriété' et donnent la liste
+    des couples (identifiant, valeur) des composants correspondants.
+    """
+    departement = data['Département'].value_counts().index[0]
+    local = data[data['Département'] == departement]
+    type_restaurant = local['Type'].value_counts().index[0]
+    restaurant = local[(local['Type'] == type_restaurant) & local['nom_complet'].notna()].iloc[0]
+    lat, lon = float(restaurant['latitude']), float(restaurant['longitude'])
+    saisie = str(restaurant['Nom'])[:3]
+    region = str(restaurant['Région'])
+    graphs = [_graph_id("pie"), _graph_id("region"), _graph_id("carte", CONFIG['GEOMETRY_LEVEL'])]
+    filters = {"Région": [region], "Type": [type_restaurant]}
+
+    calls = [("update_readiness", "update_readiness", {"readiness-interval.n_intervals": 1}, "readiness-interval.n_intervals")]
+    for button in ["btn-type", "btn-carte", "btn-region", "btn-departement", "btn-restaurant", "btn-proximite"]:
+        calls.append(("display_content", f"display_content ({button})",
+                      {f"{button}.n_clicks": 1}, f"{button}.n_clicks"))
+    calls += [
+        ("update_treemap", "update_treemap", {"departement-dropdown.value": departement}, "departement-dropdown.value"),
+        ("update_carte", "update_carte (départements, fin)",
+         {"carte-mode.value": "departements", "carte-niveau.value": "fin"}, "carte-niveau.value"),
+        ("update_carte", "update_carte (restaurants)",
+         {"carte-mode.value": "points", "carte-niveau.value": "moyen"}, "carte-mode.value"),
+        ("update_points", "update_points (zoom 11)",
+         {"points-map.relayoutData": {"mapbox.center": {"lat": lat, "lon": lon}, "mapbox.zoom": 11}}, "points-map.relayoutData"),
+        ("update_proximite", "update_proximite (rayon 2 km)",
+         {"proximite-lat.value": lat, "proximite-lon.value": lon, "proximite-mode.value": "rayon", "proximite-valeur.value": 2},
+         "proximite-valeur.value"),
+        ("update_proximite", "update_proximite (20 plus proches, type)",
+         {"proximite-lat.value": lat, "proximite-lon.value": lon, "proximite-mode.value": "proches",
+          "proximite-valeur.value": 20, "proximite-type.value": type_restaurant}, "proximite-type.value"),
+        ("update_type_dropdown", "update_type_dropdown", {"restaurant-dropdown1.value": departement}, "restaurant-dropdown1.value"),
+        ("update_restaurant_dropdown", "update_restaurant_dropdown (toute la France)",
+         {"restaurant-dropdown3.search_value": saisie}, "restaurant-dropdown3.search_value"),
+        ("update_restaurant_dropdown", "update_restaurant_dropdown (département et type)",
+         {"restaurant-dropdown3.search_value": saisie, "restaurant-dropdown2.value": type_restaurant,
+          "restaurant-dropdown1.value": departement}, "restaurant-dropdown3.search_value"),
+        ("update_cross_filter", "update_cross_filter (clic sur une région)",
+         {"graphique-filtrable.clickData": [(graphs[0], None), (graphs[1], {"points": [{"x": region}]})]},
+         f"{_prop_id(graphs[1])}.clickData"),
+        ("update_filtered_graphs", "update_filtered_graphs (région et type)",
+         {"cross-filter.data": filters, "graphique-filtrable.id": [(graph, graph) for graph in graphs],
+          "graphique-filtrable.figure": [(graph, None) for graph in graphs]}, "cross-filter.data"),
+    ]
+    return calls
+
+
+def _prop_id(component_id: Dict[str, str]) -> str:
+    """
+    :return: L'identifiant à motif sous la forme envoyée par le navigateur (clés triées, sans espaces).
+    """
+    return json.dumps(component_id, sort_keys=True, separators=(",", ":"))
+
+
+def _spec_values(spec: Dict[str, str], values: Dict[str, Any]) -> Any:
+    """
+    :return: L'entrée d'une requête de callback pour une dépendance : la valeur d'un composant,
+    ou une liste de composants pour un identifiant à motif (ALL).
+    """
+    if spec["id"].startswith("{"):
+        pattern = json.loads(spec["id"])
+        return [{"id": component_id, "property": spec["property"], "value": value}
+                for component_id, value in values.get(f"{pattern['type']}.{spec['property']}", [])]
+    return dict(spec, value=values.get(f"{spec['id']}.{spec['property']}"))
+
+
+def bench_callbacks(data: pd.DataFrame, metrics: Any, repeat: int) -> Dict[str, Mesure]:
+    """
+    Mesure chaque callback de l'application par la route /_dash-update-component (sérialisation comprise).
+    Le premier appel construit les figures et index, les suivants sont servis par les caches.
+    :param data: Données nettoyées.
+    :param metrics: Les métriques des données.
+    :param repeat: Nombre d'appels chronométrés par scénario.
+    :return: Les mesures de chaque scénario, avec la taille de la réponse en kilo-octets.
+    """
+    app = create_app(data, metrics)
+    client = app.server.test_client()
+    # Les callbacks exécutés dans le navigateur (voir assets/dashboard.js) n'appellent pas le serveur
+    callbacks = {entry["callback"].__name__: (output, entry) for output, entry in app.callback_map.items() if "callback" in entry}
+    store = {"version": REGISTRY.current().key}
+
+    results, covered = {}, set()
+    for name, label, values, trigger in scenarios(data):
+        if name not in callbacks:
+            continue
+        output, entry = callbacks[name]
+        values = {"metrics-store.data": store, **values}
+        # Sortie à motif : une sortie par composant correspondant
+        outputs = None
+        if output.startswith("{"):
+            pattern, prop = output.rsplit(".", 1)
+            outputs = _spec_values({"id": pattern, "property": prop}, values)
+            outputs = [{"id": item["id"], "property": prop} for item in outputs]
+        body = {
+            "output": output,
+            "outputs": outputs,
+            "inputs": [_spec_values(spec, values) for spec in entry["inputs"]],
+            "state": [_spec_values(spec, values) for spec in entry["state"]],
+            "changedPropIds": [trigger],
+        }
+        mesure, response = measure(lambda: client.post("/_dash-update-component", json=body), repeat)
+        if response.status_code not in (200, 204):
+            raise RuntimeError(f"{label} : réponse {response.status_code}\n{response.get_data(as_text=True)[:500]}")
+        mesure["reponse_ko"] = len(response.get_data()) / 1e3
+        results[label] = mesure
+        covered.add(name)
+
+    missing = set(callbacks) - covered
+    if missing:
+        print(f"Callbacks non mesurés : {', '.join(sorted(missing))}")
+    return results
+
+
+def environment() -> Dict[str, str]:
+    """
+    :return: La description de la machine et des versions utilisées, enregistrée avec les résultats.
+    """
+    return {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "machine": socket.gethostname(),
+        "plateforme": platform.platform(),
+        "processeur": platform.processor() or platform.machine(),
+        "cpus": str(os.cpu_count()),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "dash": dash.__version__,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float = TOLERANCE) -> List[str]:
+    """
+    Compare les durées médianes à celles d'une référence, pour les tailles et mesures communes.
+    :param results: Résultats de la suite.
+    :param baseline: Résultats de référence (même format).
+    :param tolerance: Écart relatif toléré.
+    :return: La description des régressions.
+    """
+    regressions = []
+    for n_rows, sections in results["tailles"].items():
+        for section, mesures in sections.items():
+            reference = baseline.get("tailles", {}).get(n_rows, {}).get(section, {})
+            for label, mesure in mesures.items():
+                if label not in reference:
+                    continue
+                before, after = reference[label]["median_ms"], mesure["median_ms"]
+                ratio = after / before if before else float("inf")
+                flag = ""
+                if after > DUREE_MINIMALE_MS and ratio > 1 + tolerance:
+                    flag = "  <-- régression"
+                    regressions.append(f"{n_rows} lignes, {label} : {before:.1f} ms -> {after:.1f} ms (x{ratio:.2f})")
+                print(f"  {n_rows:>8} {label:<52} {before:10.1f} -> {after:10.1f} ms  x{ratio:5.2f}{flag}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=1, help="appels chronométrés par étape du chargement")
+    parser.add_argument("--callback-repeat", type=int, default=5, help="appels chronométrés par callback")
+    parser.add_argument("--output", help="fichier JSON des résultats (par défaut benchmarks/baselines/<date>.json)")
+    parser.add_argument("--compare", help="fichier JSON de référence à comparer aux résultats")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore", FutureWarning)
+    results = {"environnement": environment(), "tailles": {}}
+    for n_rows in args.rows:
+        with tempfile.TemporaryDirectory() as directory:
+            # Les étapes mesurées affichent leur progression : elle est masquée pour garder un rapport lisible
+            with contextlib.redirect_stdout(io.StringIO()):
+                pipeline, data = bench_pipeline(directory, n_rows, args.repeat)
+                metrics = compute_metrics(data)
+            callbacks = bench_callbacks(data, metrics, args.callback_repeat)
+        results["tailles"][str(n_rows)] = {"pipeline": pipeline, "callbacks": callbacks}
+
+        print(f"\n{n_rows} lignes ({len(data)} après nettoyage)")
+        for section, mesures in results["tailles"][str(n_rows)].items():
+            print(f"  {section}")
+            for label, mesure in mesures.items():
+                taille = f" | réponse {mesure['reponse_ko']:9.1f} Ko" if "reponse_ko" in mesure else ""
+                print(f"    {label:<52} premier {mesure['premier_ms']:9.1f} ms | médiane {mesure['median_ms']:9.1f} ms"
+                      f" | pic {mesure['pic_memoire_mo']:8.1f} Mo{taille}")
+        del data, metrics
+
+    output = args.output or os.path.join(os.path.dirname(__file__), "baselines",
+                                         datetime.now().strftime("%Y%m%dT%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\nRésultats enregistrés : {output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"\nComparaison avec {args.compare} ({baseline['environnement']['date']}, {baseline['environnement']['machine']})")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} régression(s) au-delà de {args.tolerance:.0%} :")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
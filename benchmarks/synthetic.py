@@ -0,0 +1,143 @@
+import contextlib
+import functools
+import http.server
+import json
+import os
+import threading
+from typing import Any, Dict, Iterator, List
+import numpy as np
+import pandas as pd
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+REGIONS: Dict[str, List[str]] = {
+    "Auvergne-Rhône-Alpes": ["01", "03", "07", "15", "26", "38", "42", "43", "63", "69", "73", "74"],
+    "Bourgogne-Franche-Comté": ["21", "25", "39", "58", "70", "71", "89", "90"],
+    "Bretagne": ["22", "29", "35", "56"],
+    "Centre-Val de Loire": ["18", "28", "36", "37", "41", "45"],
+    "Corse": ["2A", "2B"],
+    "Grand Est": ["08", "10", "51", "52", "54", "55", "57", "67", "68", "88"],
+    "Hauts-de-France": ["02", "59", "60", "62", "80"],
+    "Île-de-France": ["75", "77", "78", "91", "92", "93", "94", "95"],
+    "Normandie": ["14", "27", "50", "61", "76"],
+    "Nouvelle-Aquitaine": ["16", "17", "19", "23", "24", "33", "40", "47", "64", "79", "86", "87"],
+    "Occitanie": ["09", "11", "12", "30", "31", "32", "34", "46", "48", "65", "66", "81", "82"],
+    "Pays de la Loire": ["44", "49", "53", "72", "85"],
+    "Provence-Alpes-Côte d'Azur": ["04", "05", "06", "13", "83", "84"],
+}
+
+TYPES = {
+    "restaurant": 0.50, "fast_food": 0.20, "cafe": 0.12, "bar": 0.10,
+    "pub": 0.03, "ice_cream": 0.025, "food_court": 0.015, "biergarten": 0.01,
+}
+
+CHAINES = ["McDonald's", "Burger King", "KFC", "Subway", "Starbucks", "Quick", "Domino's", "Pizza Hut", "Paul", "Brioche Dorée"]
+MOTS = ["Bistrot", "Café", "Auberge", "Brasserie", "Crêperie", "Pizzeria", "Relais", "Comptoir", "Taverne", "Épicerie"]
+
+
+def _departements() -> pd.DataFrame:
+    """
+    :return: Code, nom, région et centre approximatif de chaque département du geojson du dépôt.
+    """
+    with open(os.path.join(REPO_DIR, "data", "departements.geojson"), 'r', encoding='utf-8') as f:
+        features = json.load(f)["features"]
+    region_of = {code: region for region, codes in REGIONS.items() for code in codes}
+    rows = []
+    for feature in features:
+        coords = np.array([point for ring in _rings(feature["geometry"]) for point in ring])
+        rows.append({
+            "code": feature["properties"]["code"],
+            "nom": feature["properties"]["nom"],
+            "region": region_of.get(feature["properties"]["code"], "Autre"),
+            "lon": coords[:, 0].mean(), "lat": coords[:, 1].mean(),
+            "span": max(np.ptp(coords[:, 0]), np.ptp(coords[:, 1])) / 3,
+        })
+    return pd.DataFrame(rows)
+
+
+def _rings(geometry: dict) -> List[list]:
+    """
+    :return: Les anneaux extérieurs d'un Polygon ou d'un MultiPolygon.
+    """
+    if geometry["type"] == "Polygon":
+        return [geometry["coordinates"][0]]
+    return [polygon[0] for polygon in geometry["coordinates"]]
+
+
+def generate_food_service(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Génère un DataFrame ayant la forme de l'export osm-france-food-service (colonnes et séparateur de OSM Point).
+    Les départements suivent une loi de Zipf, environ 5 % des noms et 1 % des coordonnées sont manquants.
+    :param n_rows: Nombre de lignes.
+    :param seed: Graine du générateur aléatoire.
+    :return: DataFrame brut avec des colonnes de chaînes de caractères.
+    """
+    rng = np.random.default_rng(seed)
+    departements = _departements()
+
+    weights = 1.0 / np.arange(1, len(departements) + 1)
+    dep = rng.permutation(len(departements))[rng.choice(len(departements), n_rows, p=weights / weights.sum())]
+    typ = rng.choice(list(TYPES), n_rows, p=np.array(list(TYPES.values())) / sum(TYPES.values()))
+
+    uniques = np.char.add(np.char.add(rng.choice(MOTS, n_rows).astype(str), " "), rng.integers(0, max(n_rows // 2, 1), n_rows).astype(str))
+    noms = np.where(rng.random(n_rows) < 0.2, rng.choice(CHAINES, n_rows), uniques).astype(object)
+    noms[rng.random(n_rows) < 0.05] = None
+
+    communes = np.char.add(np.char.add(departements["code"].to_numpy()[dep].astype(str), "-Commune "), rng.integers(0, 400, n_rows).astype(str))
+
+    spans = departements["span"].to_numpy()[dep]
+    lat = departements["lat"].to_numpy()[dep] + rng.normal(0, 1, n_rows) * spans
+    lon = departements["lon"].to_numpy()[dep] + rng.normal(0, 1, n_rows) * spans
+    points = np.char.add(np.char.add(lat.round(7).astype(str), ","), lon.round(7).astype(str)).astype(object)
+    points[rng.random(n_rows) < 0.01] = None
+
+    return pd.DataFrame({
+        "OSM Id": np.arange(n_rows).astype(str).astype(object),
+        "Nom": noms,
+        "Type": typ.astype(object),
+        "Commune": communes.astype(object),
+        "Région": departements["region"].to_numpy()[dep],
+        "Département": departements["nom"].to_numpy()[dep],
+        "OSM Point": points,
+    })
+
+
+def write_food_service_csv(path: str, n_rows: int, seed: int = 0, chunk_rows: int = 500_000) -> str:
+    """
+    Écrit un export CSV synthétique au format osm-france-food-service (séparateur ';'), par morceaux
+    de chunk_rows lignes pour que la mémoire reste bornée jusqu'à plusieurs millions de lignes.
+    :param path: Chemin du fichier CSV.
+    :param n_rows: Nombre de lignes.
+    :param seed: Graine du générateur aléatoire (chaque morceau utilise seed + son numéro).
+    :param chunk_rows: Nombre de lignes générées à la fois.
+    :return: Le chemin du fichier écrit.
+    """
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for i, start in enumerate(range(0, n_rows, chunk_rows)):
+            chunk = generate_food_service(min(chunk_rows, n_rows - start), seed=seed + i)
+            # Identifiants uniques sur tout le fichier
+            chunk["OSM Id"] = (np.arange(len(chunk)) + start).astype(str).astype(object)
+            chunk.to_csv(f, sep=";", index=False, header=(i == 0))
+    return path
+
+
+@contextlib.contextmanager
+def http_stand_in(directory: str) -> Iterator[str]:
+    """
+    Sert un dossier par HTTP sur un port libre de la machine locale, à la place du serveur opendatasoft.
+    Le serveur gère Last-Modified / If-Modified-Since : une revalidation d'un fichier inchangé répond 304.
+    :param directory: Dossier servi.
+    :return: L'URL du dossier.
+    """
+    class Handler(http.server.SimpleHTTPRequestHandler):
+        def log_message(self, *args: Any) -> None:
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(Handler, directory=directory))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -2,7 +2,29 @@
 import os
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 CONFIG = {
-    'DEBUG': True,
+    # Mode debug du serveur de développement (désactivable avec DASHBOARD_DEBUG=0)
+    'DEBUG': os.environ.get('DASHBOARD_DEBUG', '1') == '1',
     'APP_HOST': '127.0.0.1',
-    'APP_PORT': 8050
+    'APP_PORT': 8050,
+    'OFFLINE': False,
+    'STREAMING': False,
+    'CHUNKSIZE': 100_000,
+    # Processus du nettoyage et du calcul des métriques en parallèle, par département (0 ou 1 : nettoyage en série)
+    'CLEAN_WORKERS': int(os.environ.get('DASHBOARD_CLEAN_WORKERS', 0)),
+    'WARM_UP_FIGURES': True,
+    'GEOMETRY_LEVEL': 'moyen',
+    # Dropdowns de la vue « Trouve ton restaurant » résolus dans le navigateur (activable avec DASHBOARD_CLIENTSIDE_CASCADE=1)
+    'CLIENTSIDE_CASCADE': os.environ.get('DASHBOARD_CLIENTSIDE_CASCADE', '0') == '1',
+    # Démarre le serveur avant le chargement des données, chargées en arrière-plan (désactivable avec DASHBOARD_FAST_STARTUP=0)
+    'FAST_STARTUP': os.environ.get('DASHBOARD_FAST_STARTUP', '1') == '1',
+    # Intervalle de rafraîchissement des données en arrière-plan, en secondes (0 pour désactiver)
+    'REFRESH_INTERVAL': int(os.environ.get('DASHBOARD_REFRESH_INTERVAL', 6 * 3600)),
+    # Mode production (gunicorn, voir gunicorn.conf.py)
+    'WORKERS': int(os.environ.get('DASHBOARD_WORKERS', 4)),
+    'COMPRESSION': True,
+    'COMPRESSION_MIN_SIZE': 1024,
+    'SHARED_DATA_DIR': os.path.join(BASE_DIR, 'data', 'shared'),
+    # Profilage des callbacks plus lents que ce nombre de secondes, écrit dans PROFILE_DIR (0 pour désactiver)
+    'PROFILE_SLOW_REQUESTS': float(os.environ.get('DASHBOARD_PROFILE_SLOW_REQUESTS', 0)),
+    'PROFILE_DIR': os.path.join(BASE_DIR, 'data', 'profiles'),
 }
@@ -0,0 +1,18 @@
+# Configuration de gunicorn pour le mode production (lancement : gunicorn wsgi:server)
+from config import CONFIG
+
+bind = f"{CONFIG['APP_HOST']}:{CONFIG['APP_PORT']}"
+workers = CONFIG['WORKERS']
+# Les données sont chargées une seule fois dans le processus principal, avant la création des processus serveurs
+preload_app = True
+timeout = 120
+
+
+def post_fork(server, worker) -> None:
+    """
+    Démarre le rafraîchissement des données en arrière-plan dans chaque processus serveur
+    (les threads du processus principal ne survivent pas à la création des processus).
+    Un seul processus recharge les données ; les autres relisent le fichier partagé qu'il publie (voir serving.SharedRefresh).
+    """
+    from src.utils.serving import start_refresh
+    start_refresh()
@@ -1,4 +1,13 @@
-from src.utils import clean_data, save_cleaned_data, prepare_metrics, get_data, create_dashboard
+import time
+
+# Début du démarrage : la durée des imports (dash, pandas, plotly) fait partie du rapport de démarrage
+START = time.perf_counter()
+
+from config import CONFIG
+from src.utils import load_dataset, create_app, create_dashboard, load_in_background, run_dev_server
+from src.utils.profiling import STARTUP
+
+STARTUP.record("import", START, time.perf_counter())
 
 
 
@@ -6,20 +15,18 @@ def main()->None:
     """
     Fonction principal gérant le déroulé du code
     """
-    raw_data = get_data("osm-france-food-service.csv")
-    print("Données brutes chargées :")
-    print(raw_data.head())
+    if CONFIG['FAST_STARTUP']:
+        # Le serveur répond tout de suite, les données sont chargées en arrière-plan
+        app = create_app()
+        load_in_background()
+        run_dev_server(app)
+        return
 
-    cleaned_data = clean_data(raw_data)
-    print("\nDonnées nettoyées :")
-    print(cleaned_data.head())
-
-    save_cleaned_data(cleaned_data, "cleaneddata.csv")
-    metrics = prepare_metrics(cleaned_data)
+    cleaned_data, metrics = load_dataset(STARTUP)
 
     create_dashboard(cleaned_data, metrics)
 
-    
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
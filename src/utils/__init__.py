@@ -1,6 +1,8 @@
-from .clean_data import clean_data,save_cleaned_data
-from .get_data import get_data
+from .clean_data import clean_data,save_cleaned_data,stream_clean_data
+from .get_data import get_data,iter_data
 from .prepare_metrics import prepare_metrics
-from .dashboard import create_dashboard 
+from .aggregation import compute_metrics
+from .pipeline import load_dataset
+from .dashboard import create_app, run_dev_server, create_dashboard, load_in_background
 
-__all__ = ['clean_data', 'save_cleaned_data','get_data', 'prepare_metrics','create_dashboard']
\ No newline at end of file
+__all__ = ['clean_data', 'save_cleaned_data','stream_clean_data','get_data','iter_data', 'prepare_metrics','compute_metrics','load_dataset','create_app','run_dev_server','create_dashboard','load_in_background']
\ No newline at end of file
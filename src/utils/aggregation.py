@@ -0,0 +1,250 @@
+from dataclasses import dataclass, replace
+from typing import Dict, List, Tuple
+import numpy as np
+import pandas as pd
+from .compact import coordinates
+from .cube import CountCube
+
+
+@dataclass
+class GroupedValues:
+    """
+    Valeurs distinctes par groupe, stockées au format CSR (offsets + codes) au lieu de listes Python.
+    Les valeurs du groupe i sont categories[codes[offsets[i]:offsets[i + 1]]], dans l'ordre de première apparition.
+    """
+    keys: pd.DataFrame
+    offsets: np.ndarray
+    codes: np.ndarray
+    categories: np.ndarray
+    name: str
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        :return: La taille des clés et des tableaux de codes, en octets (les catégories sont comptées comme références).
+        """
+        return int(self.keys.memory_usage(index=True).sum()) + self.offsets.nbytes + self.codes.nbytes + self.categories.nbytes
+
+    def share_categories(self, column: pd.Series) -> 'GroupedValues':
+        """
+        Fait pointer les codes vers le dictionnaire d'une colonne catégorielle des mêmes valeurs (voir compact_frame) :
+        les chaînes ne sont plus copiées dans les métriques. L'ordre des valeurs de chaque groupe est inchangé.
+        :param column: La colonne catégorielle.
+        :return: Les mêmes valeurs par groupe, avec les catégories de la colonne (inchangées si une valeur en est absente).
+        """
+        categories = column.cat.categories
+        remap = categories.get_indexer(self.categories)
+        if (remap < 0).any():
+            return self
+        return replace(self, codes=remap[self.codes].astype(np.int32), categories=categories.to_numpy())
+
+    def values(self, i: int) -> np.ndarray:
+        """
+        :param i: Position du groupe dans keys.
+        :return: Valeurs distinctes du groupe.
+        """
+        return self.categories[self.codes[self.offsets[i]:self.offsets[i + 1]]]
+
+    def to_records(self) -> List[Dict]:
+        """
+        :return: Le format historique de prepare_metrics : une liste de dictionnaires par groupe.
+        """
+        records = self.keys.to_dict(orient='records')
+        for i, record in enumerate(records):
+            record[self.name] = self.values(i).tolist()
+        return records
+
+
+@dataclass
+class Metrics:
+    """
+    Métriques du tableau de bord, calculées par compute_metrics.
+    Les restaurants géolocalisés ne sont pas copiés : geo_rows donne leurs positions dans les données (voir geo_points).
+    """
+    restaurants_par_type: pd.DataFrame
+    restaurants_par_departement: pd.DataFrame
+    restaurants_par_region: pd.DataFrame
+    geo_rows: np.ndarray
+    type_departement: GroupedValues
+    nom_type: GroupedValues
+    cube: CountCube
+
+    def geo_points(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        :param data: Les données à partir desquelles les métriques ont été calculées (ou leur version compacte).
+        :return: Le nom et les coordonnées des restaurants géolocalisés.
+        """
+        rows = data[['Nom']].iloc[self.geo_rows]
+        return rows.assign(**{column: coordinates(data[column])[self.geo_rows] for column in ('latitude', 'longitude')})
+
+    @property
+    def nbytes(self) -> int:
+        """
+        :return: La taille des métriques en mémoire, en octets.
+        """
+        tables = (self.restaurants_par_type, self.restaurants_par_departement, self.restaurants_par_region)
+        return (sum(int(table.memory_usage(index=True, deep=True).sum()) for table in tables) + self.geo_rows.nbytes
+                + self.type_departement.nbytes + self.nom_type.nbytes + self.cube.nbytes)
+
+    def share_dictionaries(self, data: pd.DataFrame) -> 'Metrics':
+        """
+        :param data: Les données compactes de la version (voir compact_frame).
+        :return: Les métriques dont les noms et les types référencent les dictionnaires des colonnes catégorielles.
+        """
+        metrics = self
+        for name, column in (('nom_type', 'Nom'), ('type_departement', 'Type')):
+            if column in data.columns and isinstance(data[column].dtype, pd.CategoricalDtype):
+                metrics = replace(metrics, **{name: getattr(metrics, name).share_categories(data[column])})
+        return metrics
+
+    def to_dict(self, data: pd.DataFrame) -> dict:
+        """
+        :param data: Les données à partir desquelles les métriques ont été calculées.
+        :return: Les métriques au format historique de prepare_metrics (listes de dictionnaires).
+        """
+        return {
+            "restaurants_par_type": self.restaurants_par_type.to_dict(orient='records'),
+            "restaurants_par_departement": self.restaurants_par_departement.to_dict(orient='records'),
+            "restaurants_par_region": self.restaurants_par_region.to_dict(orient='records'),
+            "geo_points": self.geo_points(data).to_dict(orient='records'),
+            "type_departement": self.type_departement.to_records(),
+            "nom_type": self.nom_type.to_records(),
+        }
+
+
+def _sorted_codes(column: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Factorise une colonne avec des libellés triés (l'ordre utilisé par groupby).
+    Pour une colonne catégorielle, les codes existants sont réutilisés sans hachage.
+    :param column: Colonne à factoriser.
+    :return: Les codes (-1 pour les valeurs manquantes) et les libellés.
+    """
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.cat.codes.to_numpy(), column.cat.categories.to_numpy()
+    codes, labels = pd.factorize(column, sort=True)
+    return codes, np.asarray(labels, dtype=object)
+
+
+def _group_unique(group: np.ndarray, values: np.ndarray, n_values: int, n_groups: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Calcule les valeurs distinctes de chaque groupe, dans l'ordre de première apparition.
+    :param group: Code de groupe de chaque ligne.
+    :param values: Code de valeur de chaque ligne.
+    :param n_values: Nombre de valeurs possibles.
+    :param n_groups: Nombre de groupes.
+    :return: Les offsets (taille n_groups + 1) et les codes de valeurs concaténés.
+    """
+    # factorize renvoie les clés distinctes dans l'ordre de première apparition, sans trier toutes les lignes
+    _, keys = pd.factorize(group.astype(np.int64) * n_values + values)
+    key_group = keys // n_values
+    order = np.argsort(key_group, kind='stable')
+    offsets = np.zeros(n_groups + 1, dtype=np.int64)
+    np.cumsum(np.bincount(key_group, minlength=n_groups), out=offsets[1:])
+    return offsets, (keys % n_values)[order].astype(np.int32)
+
+
+def _dense_rank(present: np.ndarray, size: int) -> np.ndarray:
+    """
+    Construit une table de correspondance code -> rang parmi les codes présents (accès direct, sans recherche).
+    :param present: Codes présents, triés.
+    :param size: Nombre total de codes possibles.
+    :return: Tableau de taille size (-1 pour les codes absents).
+    """
+    rank = np.full(size, -1, dtype=np.int64)
+    rank[present] = np.arange(len(present))
+    return rank
+
+
+def geo_rows(data: pd.DataFrame) -> np.ndarray:
+    """
+    :return: Les positions des restaurants dont les coordonnées sont renseignées.
+    """
+    return np.flatnonzero(data['latitude'].notna().to_numpy(dtype=bool) & data['longitude'].notna().to_numpy(dtype=bool))
+
+
+def compute_metrics(data: pd.DataFrame) -> Metrics:
+    """
+    Calcule toutes les métriques du tableau de bord en un seul passage sur les codes
+    de Département, Type et Région, ainsi que le cube de décomptes des filtres croisés.
+    Seules les combinaisons présentes dans les données sont conservées. Les décomptes ne portent que sur
+    les restaurants dont le nom est renseigné.
+    :param data: DataFrame nettoyé contenant les données des restaurants.
+    :return: Les métriques sous forme de tableaux compacts.
+    """
+    dep, dep_labels = _sorted_codes(data['Département'])
+    typ, typ_labels = _sorted_codes(data['Type'])
+    reg, reg_labels = _sorted_codes(data['Région'])
+    nom, nom_labels = pd.factorize(data['Nom'])
+    nom_labels = np.asarray(nom_labels, dtype=object)
+    n_typ = len(typ_labels)
+
+    # Les décomptes historiques portent sur les noms renseignés (groupby(...)['Nom'].count()) : tous les décomptes,
+    # cube compris, sont faits sur cette base pour que les graphiques filtrés et non filtrés restent comparables
+    has_nom = nom >= 0
+
+    # Nombre de restaurants par type, trié comme value_counts (par ordre de première apparition à égalité)
+    has_typ = typ >= 0
+    typ_counts = np.bincount(typ[has_typ & has_nom], minlength=n_typ)
+    _, present = pd.factorize(typ[has_typ & has_nom])
+    par_type = pd.Series(typ_counts[present], index=typ_labels[present]).sort_values(ascending=False)
+    restaurants_par_type = pd.DataFrame({'Type': par_type.index.to_numpy(), 'Count': par_type.to_numpy()})
+
+    # Couples (département, type) observés et nombre de restaurants
+    valid = (dep >= 0) & has_typ
+    pair = dep[valid].astype(np.int64) * n_typ + typ[valid]
+    pairs = np.flatnonzero(np.bincount(pair, minlength=len(dep_labels) * n_typ))
+    pair_counts = np.bincount(pair[has_nom[valid]], minlength=len(dep_labels) * n_typ)[pairs]
+    restaurants_par_departement = pd.DataFrame({
+        'Département': dep_labels[pairs // n_typ],
+        'Type': typ_labels[pairs % n_typ],
+        'Count': pair_counts,
+    })
+
+    # Nombre de restaurants par région
+    has_reg = reg >= 0
+    regions = np.flatnonzero(np.bincount(reg[has_reg], minlength=len(reg_labels)))
+    reg_counts = np.bincount(reg[has_reg & has_nom], minlength=len(reg_labels))[regions]
+    restaurants_par_region = pd.DataFrame({'Région': reg_labels[regions], 'Count': reg_counts})
+
+    # Restaurants en fonction des coordonnées
+    geo_points = geo_rows(data)
+
+    # Types de restaurants de chaque département
+    departements = np.flatnonzero(np.bincount(dep[valid], minlength=len(dep_labels)))
+    dep_index = _dense_rank(departements, len(dep_labels))[dep[valid]]
+    offsets, codes = _group_unique(dep_index, typ[valid], n_typ, len(departements))
+    type_departement = GroupedValues(
+        keys=pd.DataFrame({'Département': dep_labels[departements]}),
+        offsets=offsets, codes=codes, categories=typ_labels, name='Type',
+    )
+
+    # Noms de restaurants de chaque couple (département, type)
+    named = has_nom[valid]
+    pair_index = _dense_rank(pairs, len(dep_labels) * n_typ)[pair[named]]
+    offsets, codes = _group_unique(pair_index, nom[valid][named], max(len(nom_labels), 1), len(pairs))
+    nom_type = GroupedValues(
+        keys=restaurants_par_departement[['Département', 'Type']],
+        offsets=offsets, codes=codes, categories=nom_labels, name='Nom',
+    )
+
+    # Cube Région × Département × Type × Commune des filtres croisés, construit sur les mêmes codes et les mêmes lignes
+    com, com_labels = _sorted_codes(data['Commune'])
+    cube = CountCube({
+        'Région': (reg[has_nom], reg_labels),
+        'Département': (dep[has_nom], dep_labels),
+        'Type': (typ[has_nom], typ_labels),
+        'Commune': (com[has_nom], com_labels),
+    })
+
+    return Metrics(
+        restaurants_par_type=restaurants_par_type,
+        restaurants_par_departement=restaurants_par_departement,
+        restaurants_par_region=restaurants_par_region,
+        geo_rows=geo_points,
+        type_departement=type_departement,
+        nom_type=nom_type,
+        cube=cube,
+    )
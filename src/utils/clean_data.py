@@ -1,34 +1,110 @@
 import pandas as pd
 import os
+from typing import Dict, Iterable, Tuple
+from pandas.api.types import union_categoricals
+from .profiling import StageStats
 
-def clean_data(data: pd.DataFrame) -> pd.DataFrame:
+# Colonnes catégorielles du DataFrame nettoyé
+COLONNES_CATEGORIELLES = ['Région', 'Département']
+
+
+def _normalize_columns(data: pd.DataFrame) -> None:
     """
-    Nettoie et prépare les données relatives aux restaurants.
-    :param data: DataFrame brut contenant les informations sur les restaurants.
-    :return: DataFrame nettoyé.
+    Nettoie les noms de colonnes et vérifie la présence des colonnes nécessaires.
+    :param data: DataFrame brut, modifié sur place.
     """
-    # Nettoie les noms de colonnes
     data.columns = data.columns.str.strip().str.replace('\\s+', ' ', regex=True)
-    print("Colonnes normalisées :", data.columns)
 
     if 'Nom' not in data.columns or 'Commune' not in data.columns or 'Région' not in data.columns:
         raise KeyError("Certaines colonnes nécessaires sont manquantes : 'Nom', 'Commune', 'Région'.")
 
 
+def clean_chunk(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Applique les transformations ligne à ligne du nettoyage à un morceau de données.
+    :param data: Morceau de DataFrame brut dont les colonnes ont été normalisées.
+    :return: Morceau nettoyé (sans conversion catégorielle).
+    """
     data['nom_complet'] = data['Nom'] + " - " + data['Commune']
 
-    data[['latitude', 'longitude']] = data['OSM Point'].str.split(',', expand=True)
-    
+    # Un morceau sans aucune virgule (coordonnées absentes) ne produit qu'une colonne : la longitude est alors manquante
+    data[['latitude', 'longitude']] = data['OSM Point'].str.split(',', n=1, expand=True).reindex(columns=[0, 1])
+
     data['latitude'] = pd.to_numeric(data['latitude'], errors='coerce')
     data['longitude'] = pd.to_numeric(data['longitude'], errors='coerce')
 
-    data = data.dropna(subset=['latitude', 'longitude'])
+    return data.dropna(subset=['latitude', 'longitude'])
+
+
+def _categorize(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convertit les colonnes de COLONNES_CATEGORIELLES en catégories, sans copier les autres colonnes.
+    :param data: DataFrame nettoyé.
+    :return: DataFrame avec les colonnes catégorielles converties.
+    """
+    return data.astype({column: 'category' for column in COLONNES_CATEGORIELLES}, copy=False)
+
+
+def clean_data(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Nettoie et prépare les données relatives aux restaurants.
+    :param data: DataFrame brut contenant les informations sur les restaurants.
+    :return: DataFrame nettoyé.
+    """
+    # Nettoie les noms de colonnes
+    _normalize_columns(data)
+    print("Colonnes normalisées :", data.columns)
+
+    data = clean_chunk(data)
+
+    return _categorize(data)
+
+
+def stream_clean_data(chunks: Iterable[pd.DataFrame]) -> Tuple[pd.DataFrame, Dict[str, StageStats]]:
+    """
+    Nettoie les données morceau par morceau, au fil de leur lecture.
+    Seuls les morceaux nettoyés sont conservés, avec les colonnes catégorielles déjà converties,
+    ce qui borne la mémoire utilisée quelle que soit la taille de l'extrait.
+    :param chunks: Itérable de morceaux de DataFrame brut (voir get_data.iter_data).
+    :return: Le DataFrame nettoyé et les mesures (durée, lignes/s, pic RSS) de chaque étape.
+    """
+    stats = {name: StageStats(name) for name in ("lecture", "nettoyage", "assemblage")}
+
+    parts = []
+    iterator = iter(chunks)
+    while True:
+        with stats["lecture"].measure():
+            chunk = next(iterator, None)
+        if chunk is None:
+            break
+        stats["lecture"].rows += len(chunk)
+
+        with stats["nettoyage"].measure():
+            _normalize_columns(chunk)
+            chunk = _categorize(clean_chunk(chunk))
+        stats["nettoyage"].rows += len(chunk)
+        parts.append(chunk)
+
+    with stats["assemblage"].measure():
+        if not parts:
+            raise ValueError("Aucune donnée à nettoyer.")
+        # Les catégories diffèrent d'un morceau à l'autre : on les unifie avant la concaténation
+        categories = {
+            column: union_categoricals([part[column] for part in parts], sort_categories=True).categories
+            for column in COLONNES_CATEGORIELLES
+        }
+        parts = [
+            part.assign(**{column: part[column].cat.set_categories(cats) for column, cats in categories.items()})
+            for part in parts
+        ]
+        data = pd.concat(parts, ignore_index=True)
+        del parts
+    stats["assemblage"].rows = len(data)
 
-  
-    data['Région'] = data['Région'].astype('category')
-    data['Département'] = data['Département'].astype('category')
+    for stage in stats.values():
+        print(stage)
 
-    return data
+    return data, stats
 
 
 
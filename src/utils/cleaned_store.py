@@ -0,0 +1,165 @@
+import hashlib
+import os
+import shutil
+from typing import Iterable, List, Optional
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from pyarrow import fs
+
+# Colonnes de partitionnement du magasin, dans l'ordre des sous-dossiers
+PARTITIONS = ['Région', 'Département']
+# Colonne qui conserve l'index du DataFrame nettoyé (les lignes sont regroupées par partition sur disque)
+COLONNE_INDEX = '__ligne'
+# À incrémenter quand le nettoyage change : les magasins existants ne correspondent plus à ses résultats
+VERSION_NETTOYAGE = 1
+# Nombre de versions des données nettoyées conservées sur disque
+MAGASINS_A_CONSERVER = 2
+
+
+def _store_dir(directory: Optional[str] = None) -> str:
+    """
+    Renvoie le répertoire des données nettoyées partitionnées et le crée si besoin.
+    :param directory: Répertoire à utiliser à la place de data/cleaned/store.
+    :return: Chemin absolu du répertoire.
+    """
+    if directory is None:
+        script_dir = os.path.dirname(__file__)
+        dashboard_dir = os.path.abspath(os.path.join(script_dir, "..", ".."))
+        directory = os.path.join(dashboard_dir, "data", "cleaned", "store")
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def input_key(path: str, *params: str) -> str:
+    """
+    Calcule la clé d'un fichier de données brutes à partir de son contenu, de VERSION_NETTOYAGE
+    et des paramètres du nettoyage (le mode streaming ne conserve pas les mêmes colonnes).
+    :param path: Chemin de l'instantané des données brutes.
+    :param params: Paramètres du nettoyage.
+    :return: Empreinte hexadécimale de 16 caractères.
+    """
+    digest = hashlib.blake2b("|".join(["nettoyage", str(VERSION_NETTOYAGE), *params]).encode(), digest_size=8)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(4 * 1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def has_cleaned(key: str, directory: Optional[str] = None) -> bool:
+    """
+    :param key: Clé des données brutes (voir input_key).
+    :param directory: Répertoire du magasin (data/cleaned/store par défaut).
+    :return: True si les données nettoyées de cette clé sont sur disque.
+    """
+    return os.path.isdir(os.path.join(_store_dir(directory), key))
+
+
+def write_cleaned(data: pd.DataFrame, key: str, directory: Optional[str] = None) -> str:
+    """
+    Écrit les données nettoyées au format Arrow, partitionnées par région puis par département
+    (un fichier par département, dans des dossiers Région=.../Département=...).
+    Le dossier est d'abord écrit sous un nom temporaire puis renommé : une lecture ne voit jamais un magasin incomplet.
+    :param data: DataFrame nettoyé.
+    :param key: Clé des données brutes (voir input_key).
+    :param directory: Répertoire du magasin (data/cleaned/store par défaut).
+    :return: Chemin du dossier écrit.
+    """
+    directory = _store_dir(directory)
+    path = os.path.join(directory, key)
+    if os.path.isdir(path):
+        return path
+
+    table = pa.Table.from_pandas(data.rename_axis(COLONNE_INDEX).reset_index(), preserve_index=False)
+    # Les catégories sont réécrites comme chaînes : le partitionnement ne conserve que les valeurs
+    for column in PARTITIONS:
+        position = table.schema.get_field_index(column)
+        table = table.set_column(position, column, table.column(column).cast(pa.string()))
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    ds.write_dataset(
+        table, tmp_path, format="ipc",
+        partitioning=ds.partitioning(pa.schema([table.schema.field(column) for column in PARTITIONS]), flavor="hive"),
+        existing_data_behavior="overwrite_or_ignore",
+    )
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        # Un autre processus a écrit la même version entre-temps
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    _prune_cleaned(directory)
+    print(f"Données nettoyées sauvegardées : {path}")
+    return path
+
+
+def _prune_cleaned(directory: str) -> None:
+    """
+    Supprime les versions les plus anciennes au-delà de MAGASINS_A_CONSERVER.
+    """
+    versions = [os.path.join(directory, name) for name in os.listdir(directory) if not name.endswith(".tmp")]
+    versions = sorted((path for path in versions if os.path.isdir(path)), key=os.path.getmtime, reverse=True)
+    for path in versions[MAGASINS_A_CONSERVER:]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _dataset(key: str, directory: Optional[str] = None) -> ds.Dataset:
+    """
+    Ouvre les données nettoyées d'une clé. Les fichiers sont projetés en mémoire : seules les pages
+    des colonnes et des partitions lues sont effectivement chargées.
+    """
+    path = os.path.join(_store_dir(directory), key)
+    return ds.dataset(path, format="ipc", partitioning="hive", filesystem=fs.LocalFileSystem(use_mmap=True))
+
+
+def read_cleaned(key: str, columns: Optional[List[str]] = None, departements: Optional[Iterable[str]] = None,
+                 regions: Optional[Iterable[str]] = None, directory: Optional[str] = None) -> pd.DataFrame:
+    """
+    Relit les données nettoyées d'une clé, en ne chargeant que les colonnes et les partitions demandées.
+    Sans filtre, le résultat est identique au DataFrame écrit (ordre des lignes, index, colonnes catégorielles).
+    :param key: Clé des données brutes (voir input_key).
+    :param columns: Colonnes à lire (toutes par défaut).
+    :param departements: Départements à lire (tous par défaut) ; les autres fichiers ne sont pas ouverts.
+    :param regions: Régions à lire (toutes par défaut).
+    :param directory: Répertoire du magasin (data/cleaned/store par défaut).
+    :return: Le DataFrame nettoyé.
+    """
+    dataset = _dataset(key, directory)
+    names = [field['name'] for field in dataset.schema.pandas_metadata['columns'] if field['name'] != COLONNE_INDEX]
+    columns = names if columns is None else [column for column in columns if column in names]
+    lues = [column for column in columns if column not in PARTITIONS]
+
+    condition = None
+    for column, values in (('Département', departements), ('Région', regions)):
+        if values is not None:
+            part = ds.field(column).isin(list(values))
+            condition = part if condition is None else condition & part
+
+    # Seuls les fichiers des partitions retenues sont ouverts ; les valeurs des colonnes de partitionnement
+    # viennent des noms de dossiers et sont reconstruites directement sous forme de dictionnaire (catégories)
+    tables, keys = [], []
+    for fragment in dataset.get_fragments(filter=condition):
+        table = fragment.to_table(columns=[COLONNE_INDEX] + lues)
+        tables.append(table)
+        keys.append((ds.get_partition_keys(fragment.partition_expression), table.num_rows))
+    if tables:
+        table = pa.concat_tables(tables).combine_chunks()
+    else:
+        table = dataset.schema.empty_table().select([COLONNE_INDEX] + lues)
+    counts = [n_rows for _, n_rows in keys]
+
+    for column in PARTITIONS:
+        if column in columns:
+            values = [partition.get(column) for partition, _ in keys]
+            categories = sorted({value for value in values if value is not None})
+            codes = np.repeat([categories.index(value) if value is not None else -1 for value in values], counts).astype(np.int32)
+            array = pa.DictionaryArray.from_arrays(pa.array(codes, mask=codes < 0), pa.array(categories, pa.string()))
+            table = table.append_column(column, array)
+
+    # Les lignes sont regroupées par partition sur disque : l'ordre d'origine est rétabli par l'index
+    index = table.column(COLONNE_INDEX).to_numpy()
+    order = np.argsort(index, kind='stable')
+    data = table.select(columns).take(order).to_pandas(deduplicate_objects=False)
+    data.index = pd.Index(index[order])
+    return data
@@ -0,0 +1,61 @@
+from typing import Dict
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# Colonnes des données nettoyées gardées en mémoire par une version (index spatial, recherche par nom, exports)
+COLONNES_RESIDENTES = ['Nom', 'Type', 'Commune', 'Région', 'Département', 'nom_complet', 'latitude', 'longitude']
+# Colonnes de texte répétitif, encodées en dictionnaire (catégories) : chaque chaîne distincte n'est stockée qu'une fois.
+# Le dictionnaire des noms est partagé avec la métrique nom_type (voir Metrics.share_dictionaries)
+COLONNES_DICTIONNAIRE = ['Nom', 'Type', 'Commune', 'Région', 'Département']
+# Colonnes de texte presque unique par ligne (« Nom - Commune »), stockées dans un tampon Arrow contigu
+COLONNES_TEXTE = ['nom_complet']
+# Coordonnées stockées en float32 (environ 0,5 m de précision en France)
+COLONNES_COORDONNEES = ['latitude', 'longitude']
+# Décimales des coordonnées float32 relues en float64 : au-delà, les chiffres ne viennent que de l'arrondi float32
+DECIMALES_COORDONNEES = 6
+
+
+def coordinates(column: pd.Series) -> np.ndarray:
+    """
+    Relit une colonne de coordonnées en float64. Les coordonnées stockées en float32 sont arrondies
+    à DECIMALES_COORDONNEES : les graphiques et les exports n'affichent pas les chiffres dus à l'arrondi float32.
+    :param column: Colonne latitude ou longitude, compacte ou non.
+    :return: Les coordonnées en float64.
+    """
+    values = column.to_numpy(dtype=np.float64, na_value=np.nan)
+    if column.dtype == np.float32:
+        values = np.round(values, DECIMALES_COORDONNEES)
+    return values
+
+
+def compact_frame(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Construit la représentation gardée en mémoire d'une version des données : uniquement les COLONNES_RESIDENTES,
+    le texte répétitif encodé en dictionnaire, le texte presque unique en chaînes Arrow, les coordonnées en float32 et un index de positions (RangeIndex).
+    Les colonnes adossées à un fichier Arrow partagé (voir serving.share_dataframe) ne sont pas converties :
+    elles sont déjà hors de la mémoire propre du processus.
+    :param data: DataFrame nettoyé.
+    :return: Les données compactes, dans le même ordre de lignes.
+    """
+    data = data[[column for column in COLONNES_RESIDENTES if column in data.columns]].reset_index(drop=True)
+    for column in data.columns:
+        dtype = data[column].dtype
+        if isinstance(dtype, (pd.ArrowDtype, pd.CategoricalDtype)):
+            continue
+        if column in COLONNES_DICTIONNAIRE:
+            data[column] = data[column].astype('category')
+        elif column in COLONNES_TEXTE:
+            data[column] = data[column].astype(pd.ArrowDtype(pa.string()))
+        elif column in COLONNES_COORDONNEES and dtype == np.float64:
+            data[column] = data[column].astype(np.float32)
+    return data
+
+
+def resident_bytes(data: pd.DataFrame) -> Dict[str, int]:
+    """
+    :param data: Données d'une version.
+    :return: La mémoire occupée par l'index et chaque colonne, en octets (chaînes et dictionnaires compris).
+    Les colonnes adossées à un fichier Arrow partagé comptent la taille de leurs tampons projetés.
+    """
+    return {column: int(size) for column, size in data.memory_usage(index=True, deep=True).items()}
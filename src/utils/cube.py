@@ -0,0 +1,204 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import numpy as np
+import pandas as pd
+
+# Dimensions du cube de décomptes, dans l'ordre des axes
+DIMENSIONS = ['Région', 'Département', 'Type', 'Commune']
+# Dimensions de faible cardinalité, stockées dans un tableau dense (une case par combinaison)
+DIMENSIONS_DENSES = ['Région', 'Département', 'Type']
+
+
+def _dimension_list(dimensions: Union[str, Sequence[str]]) -> List[str]:
+    """
+    :return: La ou les dimensions demandées, sans doublon, dans l'ordre de leur première mention.
+    """
+    return list(dict.fromkeys([dimensions] if isinstance(dimensions, str) else dimensions))
+
+
+class CountCube:
+    """
+    Nombre de restaurants par Région × Département × Type × Commune, construit une fois par version des données
+    (voir compute_metrics), pour répondre aux filtres croisés des graphiques sans regrouper les données.
+    Comme les agrégats de compute_metrics, le cube ne compte que les restaurants dont le nom est renseigné :
+    rollup(dimension, {}) redonne restaurants_par_type, restaurants_par_region et restaurants_par_departement.
+
+    Les dimensions de DIMENSIONS_DENSES forment un tableau dense de quelques milliers de cases. La commune,
+    de forte cardinalité, est stockée au format creux : pour chaque case du tableau dense, les communes présentes
+    et leur effectif (offsets + codes, comme GroupedValues). La dernière position de chaque axe compte les
+    restaurants dont la valeur est manquante : ils sont comptés tant que la dimension n'est pas filtrée.
+    """
+
+    def __init__(self, codes: Dict[str, Tuple[np.ndarray, np.ndarray]]):
+        """
+        :param codes: Pour chaque dimension de DIMENSIONS, le code de chaque ligne (-1 si la valeur est manquante)
+        et les libellés triés (voir aggregation._sorted_codes).
+        """
+        self._set_labels({dim: codes[dim][1] for dim in DIMENSIONS})
+        axes = [self._axis_codes(dim, codes[dim][0]) for dim in DIMENSIONS_DENSES]
+        cell = np.ravel_multi_index(axes, tuple(self._sizes[dim] for dim in DIMENSIONS_DENSES))
+        self._store(cell * self._sizes['Commune'] + self._axis_codes('Commune', codes['Commune'][0]))
+
+    @classmethod
+    def merge(cls, cubes: Sequence['CountCube']) -> 'CountCube':
+        """
+        Assemble les cubes calculés sur des partitions disjointes des données (voir parallel).
+        Les libellés sont réunis et triés, puis les décomptes additionnés : le résultat est identique
+        au cube calculé sur toutes les lignes.
+        :param cubes: Les cubes des partitions.
+        :return: Le cube des données complètes.
+        """
+        cube = cls.__new__(cls)
+        cube._set_labels({dim: sorted(set().union(*(part.labels[dim] for part in cubes))) for dim in DIMENSIONS})
+        shape = tuple(cube._sizes[dim] for dim in DIMENSIONS_DENSES)
+        keys, weights = [], []
+        for part in cubes:
+            # Position de chaque libellé de la partition dans le cube complet (valeur manquante : dernière position)
+            remap = {dim: np.append(np.searchsorted(cube.labels[dim], part.labels[dim]), cube._sizes[dim] - 1)
+                     for dim in DIMENSIONS}
+            cells = np.repeat(np.arange(part.dense.size), np.diff(part.offsets))
+            axes = [remap[dim][axis] for dim, axis in zip(DIMENSIONS_DENSES, np.unravel_index(cells, part.dense.shape))]
+            keys.append(np.ravel_multi_index(axes, shape) * cube._sizes['Commune'] + remap['Commune'][part.communes])
+            weights.append(part.counts)
+        cube._store(np.concatenate(keys), np.concatenate(weights))
+        return cube
+
+    def _set_labels(self, labels: Dict[str, Iterable[str]]) -> None:
+        """
+        :param labels: Les libellés triés de chaque dimension.
+        """
+        self.labels = {dim: np.asarray(labels[dim], dtype=object) for dim in DIMENSIONS}
+        self._positions = {dim: {label: i for i, label in enumerate(labels)} for dim, labels in self.labels.items()}
+        # Taille de chaque axe, valeur manquante comprise
+        self._sizes = {dim: len(labels) + 1 for dim, labels in self.labels.items()}
+
+    def _store(self, keys: np.ndarray, weights: Optional[np.ndarray] = None) -> None:
+        """
+        Construit le tableau dense et les communes de chaque case.
+        :param keys: Clé (case dense × nombre de communes + commune) de chaque ligne, ou de chaque décompte.
+        :param weights: Décompte de chaque clé (une ligne par clé par défaut).
+        """
+        shape = tuple(self._sizes[dim] for dim in DIMENSIONS_DENSES)
+        n_cells = int(np.prod(shape))
+        n_communes = self._sizes['Commune']
+        # Couples (case dense, commune) présents, triés par case puis par commune
+        if weights is None:
+            keys, counts = np.unique(keys, return_counts=True)
+        else:
+            keys, inverse = np.unique(keys, return_inverse=True)
+            counts = np.bincount(inverse, weights=weights, minlength=len(keys))
+        cells = keys // n_communes
+        self.dense = np.bincount(cells, weights=counts, minlength=n_cells).astype(np.int32).reshape(shape)
+        self.communes = (keys % n_communes).astype(np.int32)
+        self.counts = counts.astype(np.int32)
+        self.offsets = np.zeros(n_cells + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cells, minlength=n_cells), out=self.offsets[1:])
+
+    def _axis_codes(self, dim: str, codes: np.ndarray) -> np.ndarray:
+        """
+        :return: Les positions sur l'axe d'une dimension (les valeurs manquantes vont à la dernière position).
+        """
+        return np.where(codes < 0, self._sizes[dim] - 1, codes).astype(np.int64)
+
+    def _selection(self, dim: str, filters: Dict[str, Iterable[str]]) -> np.ndarray:
+        """
+        :return: Les positions retenues sur l'axe d'une dimension (toutes sans filtre, valeur manquante comprise).
+        """
+        values = filters.get(dim)
+        if values is None:
+            return np.arange(self._sizes[dim])
+        positions = self._positions[dim]
+        return np.array(sorted({positions[value] for value in values if value in positions}), dtype=np.int64)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        :return: La taille des tableaux du cube, en octets.
+        """
+        return self.dense.nbytes + self.communes.nbytes + self.counts.nbytes + self.offsets.nbytes
+
+    def query(self, dimensions: Union[str, Sequence[str]] = (),
+              filters: Optional[Dict[str, Iterable[str]]] = None) -> Tuple[List[np.ndarray], np.ndarray]:
+        """
+        Restreint chaque dimension filtrée aux valeurs demandées (slice), puis additionne les décomptes
+        sur toutes les dimensions qui ne sont pas conservées (roll-up).
+        Sans la commune, seule la partie dense du cube est lue (quelques dizaines de microsecondes).
+        :param dimensions: La ou les dimensions conservées, dans l'ordre demandé (une dimension répétée n'est conservée qu'une fois).
+        :param filters: Les valeurs retenues de chaque dimension filtrée, par exemple {'Région': ['Bretagne']}.
+        :return: Les libellés de chaque dimension conservée et le décompte de chaque combinaison non nulle
+        (sans valeur manquante), triés par libellés.
+        """
+        dimensions = _dimension_list(dimensions)
+        filters = filters or {}
+        selections = [self._selection(dim, filters) for dim in DIMENSIONS_DENSES]
+        if 'Commune' in dimensions or 'Commune' in filters:
+            positions, counts = self._rollup_communes(dimensions, filters, selections)
+        elif not dimensions:
+            positions, counts = [], np.array([self.dense[np.ix_(*selections)].sum()])
+        else:
+            kept = [DIMENSIONS_DENSES.index(dim) for dim in dimensions]
+            block = self.dense[np.ix_(*selections)].sum(axis=tuple(i for i in range(len(DIMENSIONS_DENSES)) if i not in kept))
+            # Les axes restants sont dans l'ordre de DIMENSIONS_DENSES : ils sont remis dans l'ordre demandé
+            block = block.transpose([sorted(kept).index(i) for i in kept])
+            cells = np.nonzero(block)
+            positions = [selections[i][cell] for i, cell in zip(kept, cells)]
+            counts = block[cells]
+
+        counts = np.asarray(counts, dtype=np.int64)
+        keep = counts > 0
+        for dim, position in zip(dimensions, positions):
+            keep &= position < self._sizes[dim] - 1
+        return [self.labels[dim][position[keep]] for dim, position in zip(dimensions, positions)], counts[keep]
+
+    def rollup(self, dimensions: Union[str, Sequence[str]] = (),
+               filters: Optional[Dict[str, Iterable[str]]] = None) -> pd.DataFrame:
+        """
+        Comme query, sous la forme d'une table utilisable par les graphiques.
+        :param dimensions: La ou les dimensions conservées, dans l'ordre des colonnes du résultat.
+        :param filters: Les valeurs retenues de chaque dimension filtrée.
+        :return: Une ligne par combinaison non nulle des dimensions conservées, avec la colonne 'Count'.
+        """
+        dimensions = _dimension_list(dimensions)
+        labels, counts = self.query(dimensions, filters)
+        return pd.DataFrame({**dict(zip(dimensions, labels)), 'Count': counts})
+
+    def _rollup_communes(self, dimensions: List[str], filters: Dict[str, Iterable[str]],
+                         selections: List[np.ndarray]) -> Tuple[List[np.ndarray], np.ndarray]:
+        """
+        Roll-up qui conserve ou filtre la commune : seules les communes des cases denses retenues sont lues.
+        :return: Les positions de chaque dimension conservée et le décompte de chaque combinaison.
+        """
+        mask = np.zeros(self.dense.shape, dtype=bool)
+        mask[np.ix_(*selections)] = True
+        cells = np.flatnonzero(mask.ravel() & (self.dense.ravel() > 0))
+        lengths = self.offsets[cells + 1] - self.offsets[cells]
+        entries = np.repeat(self.offsets[cells] - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        coords = dict(zip(DIMENSIONS_DENSES, np.unravel_index(np.repeat(cells, lengths), self.dense.shape)))
+        coords['Commune'] = self.communes[entries]
+        counts = self.counts[entries]
+        if 'Commune' in filters:
+            keep = np.isin(coords['Commune'], self._selection('Commune', filters))
+            coords = {dim: values[keep] for dim, values in coords.items()}
+            counts = counts[keep]
+
+        if not dimensions:
+            return [], np.array([counts.sum()])
+        sizes = [self._sizes[dim] for dim in dimensions]
+        combinations = np.ravel_multi_index([coords[dim] for dim in dimensions], sizes)
+        n_combinations = int(np.prod(sizes))
+        if n_combinations <= max(len(combinations), 1 << 16):
+            # Peu de combinaisons possibles : décompte direct, sans tri
+            sums = np.bincount(combinations, weights=counts, minlength=n_combinations)
+            keys = np.flatnonzero(sums)
+            sums = sums[keys]
+        else:
+            keys, inverse = np.unique(combinations, return_inverse=True)
+            sums = np.bincount(inverse, weights=counts, minlength=len(keys))
+        return list(np.unravel_index(keys, sizes)), sums.astype(np.int64)
+
+    def total(self, filters: Optional[Dict[str, Iterable[str]]] = None) -> int:
+        """
+        :param filters: Les valeurs retenues de chaque dimension filtrée.
+        :return: Le nombre de restaurants correspondant aux filtres.
+        """
+        _, counts = self.query((), filters)
+        return int(counts.sum())
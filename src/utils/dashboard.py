@@ -1,30 +1,161 @@
 # -*- coding: utf-8 -*- 
 
-from dash import dcc, html, Input, Output, State
-from threading import Timer
+from dash import dcc, html, ALL, ClientsideFunction, Input, Output, State
+from threading import Thread, Timer
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import json
 import dash
 import dash_bootstrap_components as dbc
+import flask
+import json
+import os
+import traceback
 import webbrowser
 from src.components import create_buttons, create_footer, create_header 
-from typing import List, Dict, Tuple, Union
+from typing import List, Dict, Optional, Tuple, Union
+from config import BASE_DIR, CONFIG
+from .aggregation import Metrics
+from .figure_cache import FIGURE_CACHE
+from .geometry import NIVEAUX, load_geojson
+from .export_api import register_export_api
+from .instrumentation import instrument
+from .figures import CENTRE_FRANCE, ZOOM_FRANCE, bar_par_region, choropleth_departements, pie_par_type, points_map, proximite_map, treemap_departement
+from .point_clusters import viewport_bounds
+from .metrics_store import REGISTRY, DatasetVersion
+from .pipeline import load_dataset
+from .profiling import STARTUP
+from .refresh import RefreshScheduler
+
+# Nombre maximal de restaurants affichés dans le tableau d'une recherche de proximité
+MAX_RESULTATS_PROXIMITE = 200
+# Rayon maximal d'une recherche de proximité, en km : borne le nombre de restaurants parcourus et triés par recherche
+RAYON_MAX_KM = 50
+
+# Intervalles d'interrogation du serveur (en ms) pendant le chargement des données, puis après un échec du chargement
+# (un rafraîchissement ultérieur peut encore publier les données)
+INTERVALLE_CHARGEMENT_MS = 1000
+INTERVALLE_APRES_ECHEC_MS = 15000
+
+# Les figures d'une version sont retirées du cache dès que la version est libérée
+REGISTRY.on_release(FIGURE_CACHE.evict_version)
+
+# Vues dont un clic filtre les autres graphiques : dimension du cube filtrée et champ du point cliqué qui porte la valeur
+VUES_FILTRABLES = {"pie": ("Type", "label"), "region": ("Région", "x"), "carte": ("Département", "location")}
+
+def _cross_filtered(version: DatasetVersion, dimension: str, filters: Dict[str, List[str]]) -> Tuple[pd.DataFrame, Optional[List[str]], str]:
+    """
+    Lit dans le cube les décomptes d'un graphique filtré par les autres graphiques. Le filtre de la dimension
+    du graphique lui-même n'est pas appliqué : toutes ses valeurs restent affichées et la sélection est mise en avant.
+    :param version: La version des données.
+    :param dimension: La dimension affichée par le graphique.
+    :param filters: Les filtres croisés ({dimension: [valeurs]}).
+    :return: Les décomptes (dimension, Count), la sélection de la dimension et la description des autres filtres.
+    """
+    others = {dim: values for dim, values in filters.items() if dim != dimension}
+    counts = version.metrics.cube.rollup(dimension, others)
+    description = ", ".join(f"{dim} : {', '.join(values)}" for dim, values in others.items())
+    return counts, filters.get(dimension), description
 
-def create_dashboard(data: pd.DataFrame,metrics: Dict[str, pd.DataFrame]) -> dash.Dash:
+def _render(view: str, version: DatasetVersion, params: Tuple, filters: Optional[Dict[str, List[str]]] = None) -> go.Figure:
     """
-    Crée un tableau de bord Dash avec des graphiques.
-    
+    Construit une figure du tableau de bord.
+    :param view: Nom de la vue ('pie', 'carte', 'region' ou 'treemap').
+    :param version: La version des données.
+    :param params: Paramètres de la vue (le niveau de détail pour la carte, le département pour le treemap).
+    :param filters: Les filtres croisés ; sans filtre, les figures sont construites à partir des métriques.
+    :return: La figure construite.
+    """
+    if view == "pie":
+        if filters:
+            counts, selection, description = _cross_filtered(version, "Type", filters)
+            return pie_par_type(counts.sort_values('Count', ascending=False), selection, description)
+        return pie_par_type(version.metrics.restaurants_par_type)
+    if view == "carte":
+        niveau, = params
+        if filters:
+            counts, selection, description = _cross_filtered(version, "Département", filters)
+            return choropleth_departements(counts, load_geojson(niveau), selection, description)
+        return choropleth_departements(version.metrics.restaurants_par_departement, load_geojson(niveau))
+    if view == "region":
+        if filters:
+            return bar_par_region(*_cross_filtered(version, "Région", filters))
+        return bar_par_region(version.metrics.restaurants_par_region)
+    departement, = params
+    return treemap_departement(version.indexes.treemap_rows[departement], departement)
+
+def cached_figure(view: str, version: DatasetVersion, *params: str, filters: Optional[Dict[str, List[str]]] = None) -> dict:
+    """
+    Renvoie une figure depuis le cache de figures, en la construisant si besoin.
+    :param view: Nom de la vue ('pie', 'carte', 'region' ou 'treemap').
+    :param version: La version des données.
+    :param params: Paramètres de la vue.
+    :param filters: Les filtres croisés ; sans filtre, la clé de cache est celle des figures pré-calculées.
+    :return: La figure sous forme de dictionnaire.
+    """
+    key = params + ((json.dumps(filters, sort_keys=True, ensure_ascii=False),) if filters else ())
+    return FIGURE_CACHE.get(view, key, version.key, lambda: _render(view, version, params, filters))
+
+def _graph_id(view: str, param: str = "") -> Dict[str, str]:
+    """
+    :return: L'identifiant d'un graphique filtrable (voir VUES_FILTRABLES), retrouvé par les callbacks des filtres croisés.
+    """
+    return {"type": "graphique-filtrable", "vue": view, "param": param}
+
+def warm_up_figures(version: DatasetVersion, treemaps: bool = False) -> None:
+    """
+    Pré-calcule les figures d'une version (et l'index de la carte des points) pour que les premiers clics soient servis depuis le cache.
+    :param version: La version des données.
+    :param treemaps: Si True, pré-calcule aussi le treemap de chaque département.
+    """
+    cached_figure("pie", version)
+    cached_figure("carte", version, CONFIG['GEOMETRY_LEVEL'])
+    cached_figure("region", version)
+    if treemaps:
+        for departement in version.indexes.treemap_rows:
+            cached_figure("treemap", version, departement)
+    # Construit les index de la carte des points, des recherches de proximité et de la recherche par nom avant leur première utilisation
+    version.clusters
+    version.spatial
+    version.names
+
+
+def create_app(data: Optional[pd.DataFrame] = None, metrics: Optional[Metrics] = None) -> dash.Dash:
+    """
+    Crée l'application Dash (mise en page, callbacks et routes) sans la démarrer.
+    Les données restent en mémoire côté serveur (voir metrics_store) : le navigateur ne reçoit que la clé de version.
+    L'application peut ensuite être servie par le serveur de développement (run_dev_server)
+    ou par un serveur WSGI à plusieurs processus via app.server (voir serving.py).
+    Sans données, l'application affiche un état de chargement jusqu'à la publication d'une version (voir load_in_background).
+
     :param data: Données nettoyées utilisées pour générer les graphiques.
     :param metrics: Les métriques calculées à partir des données utilisées dans les graphiques.
     :return: L'application Dash avec l'interface utilisateur et les callbacks configurés.
     """
+    if data is not None:
+        with STARTUP.phase("publication"):
+            REGISTRY.publish(data, metrics)
+    with STARTUP.phase("application"):
+        return _build_app()
 
-    with open('data/departements.geojson', 'r', encoding='utf-8') as f:
-        geojson_data = json.load(f)
 
-    app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP], suppress_callback_exceptions=True)
+def _loading(message: str) -> html.Div:
+    """
+    :return: Un message de chargement accompagné d'un indicateur d'activité.
+    """
+    return html.Div(
+        [dbc.Spinner(color="primary"), html.Div(message, style={"marginTop": "15px"})],
+        style={"textAlign": "center", "padding": "50px", "fontSize": "18px", "color": "#6c757d"},
+    )
+
+
+def _build_app() -> dash.Dash:
+    """
+    Construit la mise en page, les callbacks et les routes de l'application (voir create_app).
+    """
+    # Les callbacks exécutés dans le navigateur sont dans assets/ à la racine du projet
+    app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP], suppress_callback_exceptions=True,
+                    assets_folder=os.path.join(BASE_DIR, "assets"))
 
     style_card = {
         "backgroundColor": "#f8f9fa",
@@ -39,95 +170,158 @@ def create_dashboard(data: pd.DataFrame,metrics: Dict[str, pd.DataFrame]) -> das
         "transition": "all 0.3s ease-in-out",
     }
 
-    app.layout = dbc.Container(
-        fluid=True,
-        children=[
-            dcc.Store(id="metrics-store", data=metrics), 
-            create_header(),  
-            create_buttons(style_button),  
-            dbc.Row(
-                dbc.Col(html.Div(id="content", className="p-4", style=style_card), width=12)
-            ),
-            create_footer(),  
-        ]
+    def serve_layout() -> dbc.Container:
+        """
+        Construit la mise en page à chaque chargement de la page, pour qu'elle porte la clé de la version courante
+        (les données peuvent être rafraîchies pendant que le serveur tourne, voir refresh.py).
+        :return: La mise en page du tableau de bord.
+        """
+        version = REGISTRY.current()
+        return dbc.Container(
+            fluid=True,
+            children=[
+                dcc.Store(id="metrics-store", data={"version": version.key if version else None}), 
+                dcc.Store(id="active-view"),
+                # Filtres croisés choisis en cliquant sur les graphiques ({dimension: [valeurs]})
+                dcc.Store(id="cross-filter", data={}),
+                # Interroge le serveur tant que les données sont en cours de chargement
+                dcc.Interval(id="readiness-interval", interval=INTERVALLE_CHARGEMENT_MS, disabled=version is not None),
+                html.Div(id="readiness-banner"),
+                create_header(),  
+                create_buttons(style_button),  
+                html.Div(
+                    [html.Span(id="cross-filter-summary", style={"marginRight": "10px"}),
+                     dbc.Button("Réinitialiser les filtres", id="cross-filter-reset", size="sm", color="secondary",
+                                outline=True, style={"display": "none"})],
+                    style={"textAlign": "center", "marginTop": "10px"},
+                ),
+                dbc.Row(
+                    dbc.Col(html.Div(id="content", className="p-4", style=style_card), width=12)
+                ),
+                create_footer(),  
+            ]
+        )
+
+    app.layout = serve_layout
+
+    @app.callback(
+        [Output("metrics-store", "data"),
+         Output("readiness-interval", "disabled"),
+         Output("readiness-interval", "interval"),
+         Output("readiness-banner", "children")],
+        [Input("readiness-interval", "n_intervals")],
+        prevent_initial_call=True,
     )
+    def update_readiness(n_intervals: int) -> Tuple[Dict[str, str], bool, int, Union[dbc.Alert, None]]:
+        """
+        Suit le chargement des données en arrière-plan (voir load_in_background).
+        Après un échec, le serveur continue d'être interrogé, moins souvent : la page affiche les données
+        dès qu'un nouvel essai ou un rafraîchissement les publie.
+        :param n_intervals: Nombre d'interrogations du serveur.
+        :return: La clé de la version publiée, l'arrêt des interrogations, leur intervalle et le bandeau de chargement.
+        """
+        version = REGISTRY.current()
+        if version is not None:
+            return {"version": version.key}, True, INTERVALLE_CHARGEMENT_MS, None
+        report = STARTUP.to_dict()
+        failed = [phase for phase in report["phases"] if phase["status"] == "failed"]
+        if failed:
+            banner = dbc.Alert(f"Échec du chargement des données ({failed[0]['name']}) : {failed[0]['error']}", color="danger")
+            return dash.no_update, False, INTERVALLE_APRES_ECHEC_MS, banner
+        banner = dbc.Alert(
+            [dbc.Spinner(size="sm", spinner_style={"marginRight": "10px"}),
+             f"Chargement des données en cours ({STARTUP.current() or 'démarrage'}, {report['elapsed']:.0f} s)"],
+            color="info",
+        )
+        return dash.no_update, False, INTERVALLE_CHARGEMENT_MS, banner
 
     @app.callback(
-        Output("content", "children"),
+        [Output("content", "children"),
+         Output("active-view", "data")],
         [Input("btn-type", "n_clicks"),
          Input("btn-carte", "n_clicks"),
          Input("btn-region", "n_clicks"),
          Input("btn-departement", "n_clicks"),
-         Input("btn-restaurant", "n_clicks")],
-        State("metrics-store", "data")
+         Input("btn-restaurant", "n_clicks"),
+         Input("btn-proximite", "n_clicks"),
+         Input("metrics-store", "data")],
+        [State("active-view", "data"),
+         State("cross-filter", "data")]
     )
-    def display_content(btn_type: int, btn_carte: int, btn_region: int, btn_departement: int, btn_restaurant: int, metrics: Dict[str, pd.DataFrame]) -> Union[html.Div, go.Figure, None]:
+    def display_content(btn_type: int, btn_carte: int, btn_region: int, btn_departement: int, btn_restaurant: int, btn_proximite: int,
+                        store: Dict[str, str], active_view: Optional[str],
+                        filters: Dict[str, List[str]]) -> Tuple[Union[html.Div, dcc.Graph, None], Optional[str]]:
         """
         Met à jour le contenu affiché en fonction du bouton cliqué.
-        :param btn_type, btn_carte, btn_region, btn_departement, btn_restaurant: Le bouton sélectionné.
-        :param metrics: Les métriques qui contiennent les données nécessaires pour afficher les graphiques.
-        :return: Un graphique correspondant au bouton cliqué.
+        Tant que les données ne sont pas chargées, un message de chargement est affiché ; la vue choisie
+        est affichée dès la publication des données.
+        :param btn_type, btn_carte, btn_region, btn_departement, btn_restaurant, btn_proximite: Le bouton sélectionné.
+        :param store: La clé de la version des données affichées.
+        :param active_view: Le dernier bouton cliqué.
+        :param filters: Les filtres croisés appliqués aux graphiques.
+        :return: Un graphique correspondant au bouton cliqué et le bouton affiché.
         """
         ctx = dash.callback_context
-        if not ctx.triggered:
-            return html.Div("Sélectionnez un graphique à afficher.", style={"textAlign": "center", "padding": "50px", "fontSize": "18px", "color": "#6c757d"})
-
-        button_id = ctx.triggered[0]["prop_id"].split(".")[0]
-
+        button_id = ctx.triggered[0]["prop_id"].split(".")[0] if ctx.triggered else None
+        if button_id in (None, "metrics-store"):
+            button_id = active_view
+        if store["version"] is None:
+            return _loading("Chargement des données en cours, l'affichage suivra automatiquement."), button_id
+        if button_id is None:
+            return html.Div("Sélectionnez un graphique à afficher.", style={"textAlign": "center", "padding": "50px", "fontSize": "18px", "color": "#6c757d"}), None
+        return _view(button_id, REGISTRY.get(store["version"]), filters), button_id
+
+    def _view(button_id: str, version: DatasetVersion, filters: Dict[str, List[str]]) -> Union[html.Div, dcc.Graph, None]:
+        """
+        Construit le contenu d'un bouton.
+        :param button_id: Le bouton sélectionné.
+        :param version: La version des données affichées.
+        :param filters: Les filtres croisés appliqués aux graphiques.
+        :return: Le contenu correspondant au bouton.
+        """
         if button_id == "btn-type":
-            return dcc.Graph(
-                figure=px.pie(
-                    metrics["restaurants_par_type"],
-                    names='Type',
-                    values='Count',
-                    title="Répartition des restaurants par type",
-                    template="seaborn",
-                ).update_traces(
-                    textinfo='percent+label'
-                )
-            )
+            return dcc.Graph(id=_graph_id("pie"), figure=cached_figure("pie", version, filters=filters))
 
         elif button_id == "btn-carte":
-            return dcc.Graph(
-                figure=px.choropleth(
-                    metrics["restaurants_par_departement"],
-                    geojson=geojson_data,
-                    locations="Département",
-                    featureidkey="properties.nom",
-                    color="Count",
-                    title="Nombre de restaurants par département",
-                    color_continuous_scale="Turbo", 
-                    range_color=[0, 5000]
-                ).update_geos(
-                    visible=False,
-                    fitbounds="locations",
-                    resolution=50
-                ).update_layout(
-                    height=700,
-                )
+            mode = dcc.RadioItems(
+                id="carte-mode",
+                options=[{"label": "Par département", "value": "departements"},
+                         {"label": "Restaurants", "value": "points"}],
+                value="departements",
+                inline=True,
+                inputStyle={"marginLeft": "15px", "marginRight": "5px"},
+                style={"textAlign": "center"},
+            )
+            niveau = dcc.RadioItems(
+                id="carte-niveau",
+                options=[{"label": f"Détail {niveau}", "value": niveau} for niveau in NIVEAUX],
+                value=CONFIG['GEOMETRY_LEVEL'],
+                inline=True,
+                inputStyle={"marginLeft": "15px", "marginRight": "5px"},
+                style={"textAlign": "center"},
+            )
+            return html.Div(
+                [
+                    mode,
+                    niveau,
+                    html.Div(
+                        dcc.Graph(id=_graph_id("carte", CONFIG['GEOMETRY_LEVEL']),
+                                  figure=cached_figure("carte", version, CONFIG['GEOMETRY_LEVEL'], filters=filters)),
+                        id="carte-container",
+                    ),
+                ]
             )
 
         elif button_id == "btn-region":
-            return dcc.Graph(
-                figure=px.bar(
-                    metrics["restaurants_par_region"],
-                    x='Région',
-                    y='Count',
-                    title="Nombre de restaurants par région",
-                    text="Count"
-                ).update_traces(
-                    textposition='auto',
-                )
-            )
+            return dcc.Graph(id=_graph_id("region"), figure=cached_figure("region", version, filters=filters))
 
         elif button_id == "btn-departement":
         
-            departements = list({item["Département"] for item in metrics["restaurants_par_departement"]})
-            departements.sort()  
+            departements = version.indexes.departements
 
             dropdown = dcc.Dropdown(
                 id="departement-dropdown",
-                options=[{"label": departement, "value": departement} for departement in departements],
+                options=version.indexes.departement_options,
                 value=departements[0] if departements else None,
                 placeholder="Sélectionnez un département",
                 style={"width": "50%", "margin": "0 auto", "padding": "10px"},
@@ -140,12 +334,11 @@ def create_dashboard(data: pd.DataFrame,metrics: Dict[str, pd.DataFrame]) -> das
             )
 
         elif button_id == "btn-restaurant":
-            departements = list({item["Département"] for item in metrics["restaurants_par_departement"]})
-            departements.sort()  
+            departements = version.indexes.departements
 
             dropdown1 = dcc.Dropdown(
                 id="restaurant-dropdown1",
-                options=[{"label": departement, "value": departement} for departement in departements],
+                options=version.indexes.departement_options,
                 value=departements[0] if departements else None,  
                 placeholder="Sélectionnez un département",
                 style={"width": "50%", "margin": "0 auto", "padding": "10px"},
@@ -163,7 +356,7 @@ def create_dashboard(data: pd.DataFrame,metrics: Dict[str, pd.DataFrame]) -> das
                 id="restaurant-dropdown3",
                 options=[],  
                 value=None, 
-                placeholder="Sélectionnez un restaurant",
+                placeholder="Tapez le nom d'un restaurant",
                 style={"width": "50%", "margin": "0 auto", "padding": "10px"},
             )
 
@@ -184,6 +377,43 @@ def create_dashboard(data: pd.DataFrame,metrics: Dict[str, pd.DataFrame]) -> das
                     html.Div([recherche], style={"textAlign": "center", "marginTop": "20px"}),
                 ]
             )
+
+        elif button_id == "btn-proximite":
+            style_input = {"width": "140px", "margin": "5px"}
+            controles = html.Div(
+                [
+                    dcc.Input(id="proximite-lat", type="number", value=48.8566, step=0.0001, placeholder="Latitude", style=style_input),
+                    dcc.Input(id="proximite-lon", type="number", value=2.3522, step=0.0001, placeholder="Longitude", style=style_input),
+                    dcc.RadioItems(
+                        id="proximite-mode",
+                        options=[{"label": f"Dans un rayon (km, {RAYON_MAX_KM} au plus)", "value": "rayon"},
+                                 {"label": "Les plus proches", "value": "proches"}],
+                        value="rayon",
+                        inline=True,
+                        inputStyle={"marginLeft": "15px", "marginRight": "5px"},
+                        style={"display": "inline-block", "margin": "5px"},
+                    ),
+                    dcc.Input(id="proximite-valeur", type="number", value=1, min=0, max=max(RAYON_MAX_KM, MAX_RESULTATS_PROXIMITE),
+                              placeholder="Rayon ou nombre", style=style_input),
+                ],
+                style={"textAlign": "center"},
+            )
+            types = dcc.Dropdown(
+                id="proximite-type",
+                options=[{"label": type_restaurant, "value": type_restaurant}
+                         for type_restaurant in version.metrics.restaurants_par_type['Type']],
+                value=None,
+                placeholder="Tous les types de restaurants",
+                style={"width": "50%", "margin": "0 auto", "padding": "10px"},
+            )
+            return html.Div(
+                [
+                    controles,
+                    types,
+                    dcc.Graph(id="proximite-carte"),
+                    html.Div(id="proximite-resultats"),
+                ]
+            )
         return None
 
     @app.callback(
@@ -191,132 +421,374 @@ def create_dashboard(data: pd.DataFrame,metrics: Dict[str, pd.DataFrame]) -> das
         [Input("departement-dropdown", "value")],
         State("metrics-store", "data"),
     )
-    def update_treemap(selected_departement: str, metrics: Dict[str, pd.DataFrame]) -> go.Figure:
+    def update_treemap(selected_departement: str, store: Dict[str, str]) -> Union[go.Figure, dict]:
         """
         Met à jour le graphique Treemap.
         :param selected_departement: Le département sélectionné.
-        :param metrics: Les métriques utilisées pour filtrer et générer les données.
+        :param store: La clé de la version des données utilisées pour filtrer et générer le graphique.
         :return: Un graphique Treemap.
         """
         if not selected_departement:
             return px.treemap(title="Veuillez sélectionner un département")
 
-        filtered_data = [item for item in metrics["restaurants_par_departement"] 
-                        if item['Département'] == selected_departement]
+        version = REGISTRY.get(store["version"])
 
-        if not filtered_data:
+        if selected_departement not in version.indexes.treemap_rows:
             return px.treemap(title=f"Aucun restaurant trouvé pour {selected_departement}")
 
-        fig = px.treemap(
-            filtered_data,
-            path=['Département', 'Type'],
-            values='Count',  
-            title=f"Répartition des restaurants par type dans {selected_departement}"
-        )
-        
-        fig.update_layout(
-            height=600,
-        )
-        
-        return fig
+        return cached_figure("treemap", version, selected_departement)
 
     @app.callback(
-        Output("restaurant-dropdown2", "options"),
-        [Input("restaurant-dropdown1", "value")],
-        State("metrics-store", "data")
+        [Output("carte-container", "children"),
+         Output("carte-niveau", "style")],
+        [Input("carte-mode", "value"),
+         Input("carte-niveau", "value")],
+        [State("metrics-store", "data"),
+         State("cross-filter", "data")],
+        prevent_initial_call=True,
     )
-    def update_type_dropdown(departement: str, metrics: Dict[str, pd.DataFrame]) -> List[Dict[str, str]]:
+    def update_carte(mode: str, niveau: str, store: Dict[str, str], filters: Dict[str, List[str]]) -> Tuple[dcc.Graph, Dict[str, str]]:
         """
-        Met à jour le dropdown des types de restaurants.
-        :param departement: Le département sélectionné.
-        :param metrics: Les métriques utilisées pour filtrer les types de restaurants.
-        :return: Les options de type de restaurant disponibles pour le département sélectionné.
+        Affiche la carte des départements avec le niveau de détail choisi, ou la carte des restaurants.
+        :param mode: 'departements' pour la carte choroplèthe, 'points' pour la carte des restaurants.
+        :param niveau: Le niveau de détail des frontières.
+        :param store: La clé de la version des données affichées.
+        :param filters: Les filtres croisés appliqués à la carte des départements.
+        :return: La carte et le style du choix du niveau de détail (masqué pour la carte des restaurants).
         """
-        if not departement:
-            return [{"label": "Aucun", "value": "aucun"}]
-        
-        filtered_data = [
-            item for item in metrics["type_departement"]
-            if item["Département"] == departement
-        ]
-
-        types = []
-        for item in filtered_data:
-            types.extend(item["Type"]) 
-
-        return [{"label": t, "value": t} for t in sorted(set(types))] 
+        version = REGISTRY.get(store["version"])
+        if mode == "points":
+            bounds, zoom = viewport_bounds(None, CENTRE_FRANCE, ZOOM_FRANCE)
+            figure = points_map(version.clusters.query(bounds, zoom))
+            return dcc.Graph(id="points-map", figure=figure), {"display": "none"}
+        niveau = niveau or CONFIG['GEOMETRY_LEVEL']
+        figure = cached_figure("carte", version, niveau, filters=filters)
+        return dcc.Graph(id=_graph_id("carte", niveau), figure=figure), {"textAlign": "center"}
 
     @app.callback(
-        Output("restaurant-dropdown3", "options"),
-        [Input("restaurant-dropdown2", "value"), Input("restaurant-dropdown1", "value")],
-        State("metrics-store", "data")
+        [Output("cross-filter", "data"),
+         Output("cross-filter-summary", "children"),
+         Output("cross-filter-reset", "style")],
+        [Input({"type": "graphique-filtrable", "vue": ALL, "param": ALL}, "clickData"),
+         Input("cross-filter-reset", "n_clicks")],
+        State("cross-filter", "data"),
+        prevent_initial_call=True,
     )
-    def update_restaurant_dropdown(selected_type: str, selected_departement: str, metrics: Dict[str, pd.DataFrame]) -> List[Dict[str, str]]:
+    def update_cross_filter(clicks: List[Optional[Dict]], reset: int,
+                            filters: Dict[str, List[str]]) -> Tuple[Dict[str, List[str]], str, Dict[str, str]]:
         """
-        Met à jour les options du dropdown des restaurants en fonction du type et du département sélectionnés.
-        :param selected_type: Le type de restaurant sélectionné.
-        :param selected_departement: Le département sélectionné.
-        :param metrics: Les métriques utilisées pour filtrer les restaurants.
-        :return: Les options de restaurants disponibles en fonction des filtres.
+        Filtre les autres graphiques par la valeur cliquée (type du camembert, région de l'histogramme,
+        département de la carte) ; un second clic sur la même valeur retire le filtre.
+        :param clicks: Le dernier point cliqué de chaque graphique filtrable affiché.
+        :param reset: Le nombre de clics sur le bouton de réinitialisation.
+        :param filters: Les filtres croisés actuels.
+        :return: Les nouveaux filtres, leur description et le style du bouton de réinitialisation.
         """
-        if not selected_type or not selected_departement:
-            return [] 
-
-        filtered_data = [
-            item for item in metrics["nom_type"]
-            if item["Type"] == selected_type and item["Département"] == selected_departement
-        ]
+        ctx = dash.callback_context
+        trigger = ctx.triggered[0]["prop_id"].rsplit(".", 1)[0] if ctx.triggered else ""
+        filters = dict(filters or {})
+        if trigger == "cross-filter-reset":
+            filters = {}
+        else:
+            click = ctx.triggered[0]["value"] if ctx.triggered else None
+            if not click or not click.get("points"):
+                raise dash.exceptions.PreventUpdate
+            dimension, field = VUES_FILTRABLES[json.loads(trigger)["vue"]]
+            value = click["points"][0].get(field)
+            if value is None:
+                raise dash.exceptions.PreventUpdate
+            if filters.get(dimension) == [value]:
+                del filters[dimension]
+            else:
+                filters[dimension] = [value]
+
+        if not filters:
+            return {}, "", {"display": "none"}
+        summary = "Filtres : " + ", ".join(f"{dim} : {', '.join(values)}" for dim, values in filters.items())
+        return filters, summary, {"display": "inline-block"}
 
-        noms = []
-        for item in filtered_data:
-            if "Nom" in item and item["Nom"]:
-                noms.extend(item["Nom"])
+    @app.callback(
+        Output({"type": "graphique-filtrable", "vue": ALL, "param": ALL}, "figure"),
+        Input("cross-filter", "data"),
+        [State({"type": "graphique-filtrable", "vue": ALL, "param": ALL}, "id"),
+         State("metrics-store", "data")],
+        prevent_initial_call=True,
+    )
+    def update_filtered_graphs(filters: Dict[str, List[str]], graphs: List[Dict[str, str]], store: Dict[str, str]) -> List[dict]:
+        """
+        Redessine les graphiques filtrables affichés quand les filtres croisés changent. Les décomptes sont lus
+        dans le cube de la version (voir CountCube) : aucune donnée n'est regroupée à chaque clic.
+        :param filters: Les filtres croisés.
+        :param graphs: Les identifiants des graphiques filtrables affichés.
+        :param store: La clé de la version des données affichées.
+        :return: La figure de chaque graphique.
+        """
+        version = REGISTRY.get(store["version"])
+        return [cached_figure(graph["vue"], version, *([graph["param"]] if graph["param"] else []), filters=filters)
+                for graph in graphs]
 
-        return [{"label": t, "value": t} for t in sorted(set(n for n in noms if n))]
+    @app.callback(
+        Output("points-map", "figure"),
+        [Input("points-map", "relayoutData")],
+        State("metrics-store", "data"),
+        prevent_initial_call=True,
+    )
+    def update_points(relayout_data: Dict, store: Dict[str, str]) -> go.Figure:
+        """
+        Met à jour les marqueurs de la carte des restaurants quand la vue change (déplacement ou zoom).
+        Seuls les groupes ou restaurants visibles sont renvoyés, dans la limite de MAX_MARKERS.
+        :param relayout_data: La position et le zoom de la carte.
+        :param store: La clé de la version des données affichées.
+        :return: La carte des restaurants.
+        """
+        if not relayout_data or not any(key.startswith("mapbox.") for key in relayout_data):
+            raise dash.exceptions.PreventUpdate
+        bounds, zoom = viewport_bounds(relayout_data, CENTRE_FRANCE, ZOOM_FRANCE)
+        return points_map(REGISTRY.get(store["version"]).clusters.query(bounds, zoom))
 
     @app.callback(
-        [Output("restaurant-recherche-boutton", "href"),  
-         Output("restaurant-recherche-boutton", "style")],  
-        [Input("restaurant-dropdown3", "value"),
-         Input("restaurant-dropdown2", "value"),
-         Input("restaurant-dropdown1", "value")]
+        [Output("proximite-carte", "figure"),
+         Output("proximite-resultats", "children")],
+        [Input("proximite-lat", "value"),
+         Input("proximite-lon", "value"),
+         Input("proximite-mode", "value"),
+         Input("proximite-valeur", "value"),
+         Input("proximite-type", "value")],
+        State("metrics-store", "data"),
     )
-    def search_restaurant_on_internet(
-        selected_restaurant: str, selected_type: str, selected_departement: str
-    ) -> Tuple[str, Dict[str, str]]:
+    def update_proximite(lat: float, lon: float, mode: str, valeur: float, type_restaurant: str,
+                         store: Dict[str, str]) -> Tuple[go.Figure, Union[dbc.Table, html.Div]]:
         """
-        Met à jour l'URL de recherche Google et rend visible le bouton de recherche si un restaurant, type et département sont sélectionnés.
-        :param selected_restaurant: Le restaurant sélectionné.
-        :param selected_type: Le type de restaurant sélectionné.
-        :param selected_departement: Le département sélectionné.
-        :return: L'URL de recherche Google et le bouton de recherche.
+        Recherche les restaurants autour d'un point, dans un rayon ou les plus proches.
+        :param lat: Latitude du point.
+        :param lon: Longitude du point.
+        :param mode: 'rayon' pour les restaurants à moins de valeur km, 'proches' pour les valeur plus proches.
+        :param valeur: Le rayon en kilomètres (borné à RAYON_MAX_KM) ou le nombre de restaurants.
+        :param type_restaurant: Le type de restaurant recherché (tous les types si vide).
+        :param store: La clé de la version des données utilisées pour la recherche.
+        :return: La carte des restaurants trouvés et le tableau des MAX_RESULTATS_PROXIMITE plus proches.
         """
+        if lat is None or lon is None or not valeur or valeur < 0:
+            raise dash.exceptions.PreventUpdate
+
+        spatial = REGISTRY.get(store["version"]).spatial
+        notes = []
+        if mode == "proches":
+            results = spatial.nearest(lat, lon, min(int(valeur), MAX_RESULTATS_PROXIMITE), type_restaurant or None)
+        else:
+            if valeur > RAYON_MAX_KM:
+                notes.append(f"Rayon limité à {RAYON_MAX_KM} km.")
+            results = spatial.within(lat, lon, min(float(valeur), RAYON_MAX_KM), type_restaurant or None)
+
+        shown = results.head(MAX_RESULTATS_PROXIMITE).assign(distance_km=lambda df: df['distance_km'].round(3))
+        table = dbc.Table.from_dataframe(shown, striped=True, bordered=True, hover=True, size="sm")
+        if len(results) > MAX_RESULTATS_PROXIMITE:
+            notes.append(f"{MAX_RESULTATS_PROXIMITE} plus proches sur {len(results)} restaurants trouvés.")
+        if notes:
+            table = html.Div([html.P(" ".join(notes)), table])
+        return proximite_map(lat, lon, shown), table
+
+    if CONFIG['CLIENTSIDE_CASCADE']:
+        # Les dropdowns en cascade sont résolus dans le navigateur (assets/dashboard.js) à partir de la structure
+        # département -> type -> noms servie une fois par version (route /data/restaurants/<key>.json)
+        app.clientside_callback(
+            ClientsideFunction("restaurants", "types"),
+            Output("restaurant-dropdown2", "options"),
+            [Input("restaurant-dropdown1", "value")],
+            State("metrics-store", "data"),
+        )
+        app.clientside_callback(
+            ClientsideFunction("restaurants", "options"),
+            Output("restaurant-dropdown3", "options"),
+            [Input("restaurant-dropdown3", "search_value"), Input("restaurant-dropdown2", "value"), Input("restaurant-dropdown1", "value")],
+            State("metrics-store", "data"),
+        )
+    else:
+        @app.callback(
+            Output("restaurant-dropdown2", "options"),
+            [Input("restaurant-dropdown1", "value")],
+            State("metrics-store", "data")
+        )
+        def update_type_dropdown(departement: str, store: Dict[str, str]) -> List[Dict[str, str]]:
+            """
+            Met à jour le dropdown des types de restaurants.
+            :param departement: Le département sélectionné.
+            :param store: La clé de la version des données utilisées pour filtrer les types de restaurants.
+            :return: Les options de type de restaurant disponibles pour le département sélectionné.
+            """
+            if not departement:
+                return [{"label": "Aucun", "value": "aucun"}]
         
-        if selected_restaurant and selected_departement and selected_type:
-            search_url = f"https://www.google.com/search?q={selected_restaurant}+{selected_type}+{selected_departement}"
-            return search_url, {"display": "inline-block"}  
-        return "", {"display": "none"}  
+            return REGISTRY.get(store["version"]).indexes.type_options.get(departement, [])
 
-    @app.callback(
-        Output("restaurant-link", "children"),  
-        [Input("restaurant-dropdown3", "value")]
+        @app.callback(
+            Output("restaurant-dropdown3", "options"),
+            [Input("restaurant-dropdown3", "search_value"), Input("restaurant-dropdown2", "value"), Input("restaurant-dropdown1", "value")],
+            State("metrics-store", "data")
+        )
+        def update_restaurant_dropdown(search_value: str, selected_type: str, selected_departement: str, store: Dict[str, str]) -> List[Dict[str, str]]:
+            """
+            Met à jour les options du dropdown des restaurants à chaque frappe : seules les premières
+            correspondances (SUGGESTIONS, dans le département et le type sélectionnés) sont envoyées au navigateur.
+            :param search_value: Le texte saisi dans le dropdown.
+            :param selected_type: Le type de restaurant sélectionné.
+            :param selected_departement: Le département sélectionné.
+            :param store: La clé de la version des données utilisées pour la recherche.
+            :return: Les options de restaurants correspondant à la saisie.
+            """
+            ctx = dash.callback_context
+            # Le choix d'une option vide la saisie : on conserve alors les options qui contiennent la valeur choisie
+            if not search_value and ctx.triggered and ctx.triggered[0]["prop_id"] == "restaurant-dropdown3.search_value":
+                raise dash.exceptions.PreventUpdate
+            if not search_value and (not selected_type or not selected_departement):
+                return [] 
+
+            # Sans département sélectionné, la recherche porte sur toute la France
+            return REGISTRY.get(store["version"]).names.options(search_value, selected_departement, selected_type)
+
+    # Lien de recherche Google du restaurant sélectionné : calculé dans le navigateur (assets/dashboard.js),
+    # sans aller-retour avec le serveur
+    app.clientside_callback(
+        ClientsideFunction("restaurants", "lien_recherche"),
+        [Output("restaurant-recherche-boutton", "href"),
+         Output("restaurant-recherche-boutton", "style"),
+         Output("restaurant-recherche-boutton", "children")],
+        [Input("restaurant-dropdown3", "value"),
+         Input("restaurant-dropdown2", "value"),
+         Input("restaurant-dropdown1", "value")],
     )
-    def update_link_text(selected_restaurant: str) -> str:
+
+    # Durée, taille et erreurs des callbacks, durée des étapes du chargement : voir la route /metrics
+    instrument(app)
+    # Export des agrégats et des restaurants en JSON ou CSV : voir les routes /api
+    register_export_api(app)
+
+    @app.server.route("/stats/figures")
+    def figure_cache_stats() -> flask.Response:
+        """
+        Expose les compteurs du cache de figures (succès, échecs, demandes regroupées).
+        :return: Les compteurs au format JSON.
+        """
+        return flask.jsonify(FIGURE_CACHE.stats())
+
+    @app.server.route("/stats/memory")
+    def memory_stats() -> flask.Response:
+        """
+        Expose la mémoire occupée par chaque version des données encore en mémoire (voir DatasetVersion.memory).
+        :return: Les octets par colonne, des données et des métriques de chaque version, au format JSON.
+        """
+        current = REGISTRY.current()
+        versions = [{"key": version.key, "current": version is current, **version.memory} for version in REGISTRY.versions()]
+        return flask.jsonify({"versions": versions, "total_bytes": sum(v["data_bytes"] + v["metrics_bytes"] for v in versions)})
+
+    @app.server.route("/health")
+    def health() -> flask.Response:
+        """
+        Indique que le serveur répond, que les données soient chargées ou non.
+        :return: Le statut du serveur au format JSON.
+        """
+        return flask.jsonify({"status": "ok"})
+
+    @app.server.route("/ready")
+    def ready() -> Tuple[flask.Response, int]:
         """
-        Met à jour le texte du lien pour rechercher un restaurant sélectionné sur Google.
-        :param selected_restaurant: Le restaurant sélectionné.
-        :return: Le texte du lien pour effectuer la recherche.
+        Indique si les données sont chargées et publiées, avec la durée de chaque phase du démarrage.
+        :return: Le rapport de démarrage au format JSON, avec le code 200 si le tableau de bord est prêt, 503 sinon.
         """
-        if selected_restaurant:
-            return f"Chercher {selected_restaurant} sur Google"  
-        return ""  
+        report = STARTUP.to_dict()
+        report["ready"] = REGISTRY.current() is not None
+        return flask.jsonify(report), 200 if report["ready"] else 503
+
+    @app.server.route("/data/restaurants/<key>.json")
+    def restaurants_cascade(key: str) -> flask.Response:
+        """
+        Sert la structure département -> type -> noms utilisée par les dropdowns exécutés dans le navigateur
+        (voir NameSearchIndex.cascade). Le contenu d'une version ne change jamais : il est mis en cache par le navigateur.
+        :param key: La clé de la version des données.
+        :return: La structure au format JSON, ou une redirection vers la version courante si la clé n'est plus publiée.
+        """
+        version = REGISTRY.get(key)
+        if version is None:
+            return flask.Response(status=503)
+        if version.key != key:
+            return flask.redirect(f"/data/restaurants/{version.key}.json")
+        response = flask.Response(version.cascade, mimetype="application/json")
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        response.set_etag(version.key)
+        return response.make_conditional(flask.request)
+
+    return app
 
 
+def publish_dataset(data: pd.DataFrame, metrics: Metrics) -> DatasetVersion:
+    """
+    Publie les données dans le registre puis pré-calcule les figures de la version (si WARM_UP_FIGURES).
+    :param data: Données nettoyées.
+    :param metrics: Les métriques calculées à partir des données.
+    :return: La version publiée.
+    """
+    with STARTUP.phase("publication"):
+        version = REGISTRY.publish(data, metrics)
+    if CONFIG['WARM_UP_FIGURES']:
+        with STARTUP.phase("figures"):
+            warm_up_figures(version)
+    return version
+
+
+def load_in_background() -> Thread:
+    """
+    Charge, nettoie et publie les données dans un thread pendant que le serveur répond déjà :
+    le tableau de bord affiche un état de chargement jusqu'à la publication (voir /ready).
+    :return: Le thread de chargement.
+    """
+    def load() -> None:
+        """
+        Charge puis publie les données ; en cas d'erreur, l'échec est visible dans le rapport de démarrage.
+        """
+        try:
+            publish_dataset(*load_dataset(STARTUP))
+        except Exception:
+            print("Échec du chargement des données :")
+            traceback.print_exc()
+            return
+        print(f"Tableau de bord prêt en {STARTUP.to_dict()['elapsed']:.1f} s")
+
+    thread = Thread(target=load, name="dataset-loader", daemon=True)
+    thread.start()
+    return thread
+
+
+def run_dev_server(app: dash.Dash) -> None:
+    """
+    Sert l'application avec le serveur de développement de Flask (un seul processus)
+    et ouvre automatiquement le tableau de bord dans un navigateur web.
+    :param app: L'application créée par create_app.
+    """
+    url = f"http://{CONFIG['APP_HOST']}:{CONFIG['APP_PORT']}/"
+
     def open_browser() -> None:
         """
         Ouvre automatiquement l'application Dash dans un navigateur web.
         """
-        webbrowser.open_new("http://127.0.0.1:8050/")
+        webbrowser.open_new(url)
+
+    if CONFIG['WARM_UP_FIGURES'] and REGISTRY.current() is not None:
+        Thread(target=warm_up_figures, args=(REGISTRY.current(),), daemon=True).start()
+    if CONFIG['REFRESH_INTERVAL']:
+        RefreshScheduler(CONFIG['REFRESH_INTERVAL'], load_dataset, prepare=warm_up_figures).start()
 
     Timer(1, open_browser).start()
-    app.run_server()
+    # Le rechargement automatique relancerait le chargement des données dans un second processus
+    app.run_server(host=CONFIG['APP_HOST'], port=CONFIG['APP_PORT'], debug=CONFIG['DEBUG'], use_reloader=False)
+
+
+def create_dashboard(data: pd.DataFrame, metrics: Metrics) -> dash.Dash:
+    """
+    Crée le tableau de bord et le sert avec le serveur de développement (voir create_app et run_dev_server).
+    :param data: Données nettoyées utilisées pour générer les graphiques.
+    :param metrics: Les métriques calculées à partir des données utilisées dans les graphiques.
+    :return: L'application Dash, une fois le serveur arrêté.
+    """
+    app = create_app(data, metrics)
+    run_dev_server(app)
+    return app
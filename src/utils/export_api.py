@@ -0,0 +1,201 @@
+import io
+import zlib
+from typing import Callable, Dict, Iterator, List, Tuple, Union
+import dash
+import flask
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pyarrow import csv
+from .aggregation import GroupedValues
+from .compact import coordinates
+from .cube import DIMENSIONS
+from .metrics_store import REGISTRY, DatasetVersion
+
+# Agrégats exportés, au format de prepare_metrics
+AGREGATS = ['restaurants_par_type', 'restaurants_par_departement', 'restaurants_par_region',
+            'type_departement', 'nom_type', 'geo_points']
+# Colonnes des listes de restaurants exportées
+COLONNES_EXPORT = ['Nom', 'Type', 'Commune', 'Département', 'Région', 'latitude', 'longitude']
+# Paramètres de filtre des routes d'export et dimension correspondante
+FILTRES = {'region': 'Région', 'departement': 'Département', 'type': 'Type', 'commune': 'Commune'}
+# Formats d'export et type de contenu
+FORMATS = {'json': 'application/json', 'csv': 'text/csv'}
+# Nombre de lignes sérialisées puis compressées à la fois : la réponse est envoyée au fil de l'eau
+LIGNES_PAR_MORCEAU = 20_000
+NIVEAU_GZIP = 6
+
+
+def _filters() -> Dict[str, List[str]]:
+    """
+    :return: Les filtres de la requête ({dimension: [valeurs]}), un paramètre pouvant être répété.
+    """
+    return {column: flask.request.args.getlist(param) for param, column in FILTRES.items()
+            if flask.request.args.getlist(param)}
+
+
+def _grouped_table(grouped: GroupedValues, fmt: str) -> pd.DataFrame:
+    """
+    :return: Les valeurs d'un agrégat par groupe : une liste par groupe en JSON (format de prepare_metrics),
+    une ligne par valeur en CSV.
+    """
+    if fmt == 'json':
+        return pd.DataFrame(grouped.to_records())
+    group = np.repeat(np.arange(len(grouped)), np.diff(grouped.offsets))
+    table = grouped.keys.iloc[group].reset_index(drop=True)
+    table[grouped.name] = grouped.categories[grouped.codes]
+    return table
+
+
+def _chunks(table: pd.DataFrame, fmt: str) -> Iterator[bytes]:
+    """
+    Sérialise une table par morceaux de LIGNES_PAR_MORCEAU lignes.
+    :param table: La table exportée.
+    :param fmt: 'json' (liste d'objets) ou 'csv' (avec en-tête).
+    :return: Les morceaux encodés en UTF-8.
+    """
+    if fmt == 'csv':
+        # pyarrow écrit le CSV une dizaine de fois plus vite que DataFrame.to_csv (formatage des nombres en C)
+        for start in range(0, max(len(table), 1), LIGNES_PAR_MORCEAU):
+            sink = io.BytesIO()
+            chunk = pa.Table.from_pandas(table.iloc[start:start + LIGNES_PAR_MORCEAU], preserve_index=False)
+            csv.write_csv(chunk, sink, csv.WriteOptions(include_header=start == 0, quoting_style="needed"))
+            yield sink.getvalue()
+        return
+    yield b"["
+    for start in range(0, len(table), LIGNES_PAR_MORCEAU):
+        records = table.iloc[start:start + LIGNES_PAR_MORCEAU].to_json(orient='records', force_ascii=False)
+        yield (("," if start else "") + records[1:-1]).encode('utf-8')
+    yield b"]"
+
+
+def _gzip(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """
+    Compresse les morceaux au fil de l'eau dans un seul flux gzip.
+    """
+    compressor = zlib.compressobj(NIVEAU_GZIP, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def _export(name: str, build: Callable[[DatasetVersion, str], pd.DataFrame]) -> Union[flask.Response, Tuple[flask.Response, int]]:
+    """
+    Répond à une requête d'export de la version courante des données.
+    L'ETag est la clé de version, calculée à partir du contenu des données (voir dataset_key) : tant que les données
+    n'ont pas changé, une requête qui renvoie cet ETag (If-None-Match) reçoit une réponse 304 sans que la table soit construite.
+    :param name: Nom de l'export (nom du fichier CSV).
+    :param build: Construit la table exportée à partir de la version et du format.
+    :return: La réponse, envoyée par morceaux et compressée en gzip si le client l'accepte.
+    """
+    version = REGISTRY.current()
+    if version is None:
+        return flask.jsonify({"error": "Données en cours de chargement."}), 503
+    fmt = flask.request.args.get('format', 'json')
+    if fmt not in FORMATS:
+        return flask.jsonify({"error": f"Format inconnu : {fmt} (formats : {', '.join(FORMATS)})."}), 400
+
+    if flask.request.if_none_match.contains_weak(version.key):
+        response = flask.Response(status=304)
+    else:
+        table = build(version, fmt)
+        chunks = _chunks(table, fmt)
+        compressed = flask.request.accept_encodings['gzip'] > 0
+        response = flask.Response(_gzip(chunks) if compressed else chunks, mimetype=FORMATS[fmt], direct_passthrough=True)
+        if compressed:
+            response.headers['Content-Encoding'] = 'gzip'
+        if fmt == 'csv':
+            response.headers['Content-Disposition'] = f'attachment; filename="{name}-{version.key}.csv"'
+        response.headers['X-Row-Count'] = str(len(table))
+    # Le même ETag vaut pour les versions gzip et non compressée : il est donc faible
+    response.set_etag(version.key, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Dataset-Version'] = version.key
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def register_export_api(app: dash.Dash) -> None:
+    """
+    Ajoute au serveur Flask les routes d'export des agrégats et des restaurants, en JSON (par défaut) ou en CSV
+    (?format=csv). Les listes de restaurants et les décomptes se filtrent par ?region=, ?departement=, ?type=
+    et ?commune= (paramètres répétables).
+    :param app: L'application Dash.
+    """
+    server = app.server
+
+    @server.route("/api")
+    def api_index() -> flask.Response:
+        """
+        Décrit les routes d'export et la version courante des données.
+        :return: La description au format JSON.
+        """
+        version = REGISTRY.current()
+        return flask.jsonify({
+            "version": version.key if version else None,
+            "restaurants": len(version.data) if version else None,
+            "agregats": [f"/api/metrics/{name}" for name in AGREGATS],
+            "restaurants_url": "/api/restaurants",
+            "decomptes_url": "/api/counts",
+            "filtres": list(FILTRES),
+            "formats": list(FORMATS),
+        })
+
+    @server.route("/api/metrics/<name>")
+    def export_metric(name: str) -> Union[flask.Response, Tuple[flask.Response, int]]:
+        """
+        Exporte un agrégat de prepare_metrics (par exemple restaurants_par_departement).
+        :param name: Le nom de l'agrégat.
+        :return: L'agrégat, ou une erreur 404 si l'agrégat n'existe pas.
+        """
+        if name not in AGREGATS:
+            return flask.jsonify({"error": f"Agrégat inconnu : {name}.", "agregats": AGREGATS}), 404
+
+        def build(version: DatasetVersion, fmt: str) -> pd.DataFrame:
+            if name == 'geo_points':
+                return version.metrics.geo_points(version.data)
+            value = getattr(version.metrics, name)
+            return _grouped_table(value, fmt) if isinstance(value, GroupedValues) else value
+
+        return _export(name, build)
+
+    @server.route("/api/restaurants")
+    def export_restaurants() -> Union[flask.Response, Tuple[flask.Response, int]]:
+        """
+        Exporte la liste des restaurants correspondant aux filtres, paginée par ?offset= et ?limit=.
+        :return: Les restaurants (nom, type, commune, département, région et coordonnées),
+        ou une erreur 400 si offset ou limit est négatif.
+        """
+        filters = _filters()
+        offset = flask.request.args.get('offset', 0, type=int)
+        limit = flask.request.args.get('limit', None, type=int)
+        if offset < 0 or (limit is not None and limit < 0):
+            return flask.jsonify({"error": "offset et limit doivent être positifs ou nuls."}), 400
+
+        def build(version: DatasetVersion, fmt: str) -> pd.DataFrame:
+            data = version.data
+            mask = np.ones(len(data), dtype=bool)
+            for column, values in filters.items():
+                mask &= data[column].isin(values).to_numpy(dtype=bool, na_value=False)
+            rows = np.flatnonzero(mask)[offset:None if limit is None else offset + limit]
+            columns = [column for column in COLONNES_EXPORT if column in data.columns]
+            table = data[columns].iloc[rows]
+            return table.assign(**{column: coordinates(table[column]) for column in ('latitude', 'longitude') if column in columns})
+
+        return _export("restaurants", build)
+
+    @server.route("/api/counts")
+    def export_counts() -> Union[flask.Response, Tuple[flask.Response, int]]:
+        """
+        Exporte le nombre de restaurants par combinaison des dimensions demandées (?by=Département&by=Type),
+        lu dans le cube de la version (voir CountCube).
+        :return: Les décomptes, ou une erreur 400 si une dimension est inconnue.
+        """
+        dimensions = flask.request.args.getlist('by')
+        unknown = [dim for dim in dimensions if dim not in DIMENSIONS]
+        if unknown:
+            return flask.jsonify({"error": f"Dimension inconnue : {', '.join(unknown)}.", "dimensions": DIMENSIONS}), 400
+        filters = _filters()
+        return _export("counts", lambda version, fmt: version.metrics.cube.rollup(dimensions, filters))
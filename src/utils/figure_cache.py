@@ -0,0 +1,147 @@
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, Hashable, List, Tuple
+import plotly.graph_objects as go
+from plotly.utils import PlotlyJSONEncoder
+
+# Taille maximale des figures en cache, en octets une fois sérialisées en JSON
+TAILLE_MAX_CACHE = 32_000_000
+
+
+def _json_bytes(value: object) -> int:
+    """
+    :return: La taille de la valeur sérialisée en JSON, comme elle est envoyée au navigateur.
+    """
+    return len(json.dumps(value, cls=PlotlyJSONEncoder, separators=(",", ":")))
+
+
+class FigureCache:
+    """
+    Cache LRU des figures déjà rendues, indexé par (vue, paramètres, version des données).
+    Les demandes simultanées d'une même figure sont regroupées : un seul rendu est exécuté
+    et les autres demandes attendent son résultat.
+
+    Le cache est borné par le nombre de figures et par leur taille sérialisée. Les frontières des départements
+    (geojson) embarquées par chaque carte, filtrée ou non, sont identiques d'une carte à l'autre : elles ne sont
+    gardées et comptées qu'une fois, et toutes les cartes référencent cette copie.
+    """
+
+    def __init__(self, maxsize: int = 256, max_bytes: int = TAILLE_MAX_CACHE) -> None:
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Figure, taille sérialisée (sans les geojson partagés) et geojson partagés utilisés, par clé
+        self._figures: "OrderedDict[Tuple, Tuple[dict, int, List[int]]]" = OrderedDict()
+        self._in_flight: Dict[Tuple, Future] = {}
+        # Geojson partagés (indexés par id), avec leur taille sérialisée, et nombre de figures qui utilisent chacun
+        self._geojsons: Dict[int, Tuple[dict, int]] = {}
+        self._geojson_users: Dict[int, int] = {}
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, view: str, params: Tuple[Hashable, ...], version: str, render: Callable[[], go.Figure]) -> dict:
+        """
+        Renvoie la figure demandée depuis le cache ou la rend avec render.
+        :param view: Nom de la vue (ex: 'pie', 'treemap').
+        :param params: Paramètres de la vue (ex: le département sélectionné).
+        :param version: Clé de la version des données.
+        :param render: Fonction qui construit la figure en cas d'absence du cache.
+        :return: La figure sous forme de dictionnaire, prête à être envoyée au navigateur.
+        """
+        key = (view, params, version)
+        with self._lock:
+            if key in self._figures:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return self._figures[key][0]
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                self.misses += 1
+                future = self._in_flight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+
+        try:
+            figure = render().to_dict()
+            geojsons = self._share_geojsons(figure)
+            size = _json_bytes({**figure, "data": [{name: value for name, value in trace.items() if name != "geojson"}
+                                                    for trace in figure.get("data", [])]})
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            for geojson, geojson_size in geojsons:
+                if id(geojson) not in self._geojsons:
+                    self._geojsons[id(geojson)] = (geojson, geojson_size)
+                    self._geojson_users[id(geojson)] = 0
+                    self.nbytes += geojson_size
+                self._geojson_users[id(geojson)] += 1
+            self._figures[key] = (figure, size, [id(geojson) for geojson, _ in geojsons])
+            self.nbytes += size
+            # La figure la plus récente est toujours gardée, même si elle dépasse à elle seule max_bytes
+            while len(self._figures) > 1 and (len(self._figures) > self.maxsize or self.nbytes > self.max_bytes):
+                self._remove(next(iter(self._figures)))
+            del self._in_flight[key]
+        future.set_result(figure)
+        return figure
+
+    def _share_geojsons(self, figure: dict) -> List[Tuple[dict, int]]:
+        """
+        Remplace le geojson de chaque trace de la figure par la copie partagée de mêmes frontières, s'il y en a une.
+        La comparaison se fait hors du verrou : elle parcourt tout le geojson.
+        :param figure: La figure rendue, modifiée sur place.
+        :return: Les geojson utilisés par la figure et leur taille sérialisée.
+        """
+        used = []
+        for trace in figure.get("data", []):
+            geojson = trace.get("geojson")
+            if not isinstance(geojson, dict):
+                continue
+            with self._lock:
+                known = list(self._geojsons.values())
+            shared = next(((value, size) for value, size in known if value is geojson or value == geojson), None)
+            used.append(shared or (geojson, _json_bytes(geojson)))
+            trace["geojson"] = used[-1][0]
+        return used
+
+    def _remove(self, key: Tuple) -> None:
+        """
+        Retire une figure du cache (verrou déjà pris), et les geojson partagés qu'aucune autre figure n'utilise.
+        """
+        _, size, geojsons = self._figures.pop(key)
+        self.nbytes -= size
+        for shared in geojsons:
+            self._geojson_users[shared] -= 1
+            if self._geojson_users[shared] == 0:
+                del self._geojson_users[shared]
+                self.nbytes -= self._geojsons.pop(shared)[1]
+
+    def evict_version(self, version: str) -> None:
+        """
+        Retire du cache les figures d'une version des données qui n'est plus utilisée.
+        :param version: Clé de la version.
+        """
+        with self._lock:
+            for key in [key for key in self._figures if key[2] == version]:
+                self._remove(key)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        :return: Les compteurs du cache (succès, échecs, demandes regroupées, nombre de figures et taille sérialisée).
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced, "size": len(self._figures),
+                    "bytes": self.nbytes}
+
+
+# Cache unique du processus
+FIGURE_CACHE = FigureCache()
@@ -0,0 +1,181 @@
+import plotly.express as px
+import plotly.graph_objects as go
+import numpy as np
+import pandas as pd
+from typing import List, Optional
+
+
+def _titre(titre: str, filtre: str) -> str:
+    """
+    :return: Le titre d'un graphique, suivi de la description des filtres croisés appliqués.
+    """
+    return f"{titre} ({filtre})" if filtre else titre
+
+
+def pie_par_type(counts: pd.DataFrame, selection: Optional[List[str]] = None, filtre: str = "") -> go.Figure:
+    """
+    Crée le camembert de la répartition des restaurants par type.
+    :param counts: Les lignes (Type, Count) à afficher.
+    :param selection: Les types sélectionnés par un filtre croisé, détachés du camembert.
+    :param filtre: La description des filtres croisés appliqués aux décomptes.
+    :return: Le graphique.
+    """
+    fig = px.pie(
+        counts,
+        names='Type',
+        values='Count',
+        title=_titre("Répartition des restaurants par type", filtre),
+        template="seaborn",
+    ).update_traces(
+        textinfo='percent+label'
+    )
+    if selection:
+        fig.update_traces(pull=[0.1 if type_restaurant in selection else 0 for type_restaurant in counts['Type']])
+    return fig
+
+
+def choropleth_departements(counts: pd.DataFrame, geojson_data: dict, selection: Optional[List[str]] = None,
+                            filtre: str = "") -> go.Figure:
+    """
+    Crée la carte du nombre de restaurants par département.
+    :param counts: Les lignes (Département, Count) à afficher.
+    :param geojson_data: Les frontières des départements.
+    :param selection: Les départements sélectionnés par un filtre croisé, entourés.
+    :param filtre: La description des filtres croisés appliqués aux décomptes.
+    :return: Le graphique.
+    """
+    fig = px.choropleth(
+        counts,
+        geojson=geojson_data,
+        locations="Département",
+        featureidkey="properties.nom",
+        color="Count",
+        title=_titre("Nombre de restaurants par département", filtre),
+        color_continuous_scale="Turbo",
+        range_color=[0, 5000]
+    ).update_geos(
+        visible=False,
+        fitbounds="locations",
+        resolution=50
+    ).update_layout(
+        height=700,
+    )
+    if selection:
+        fig.update_traces(marker_line_width=[3 if departement in selection else 0.5 for departement in counts['Département']])
+    return fig
+
+
+def bar_par_region(counts: pd.DataFrame, selection: Optional[List[str]] = None, filtre: str = "") -> go.Figure:
+    """
+    Crée l'histogramme du nombre de restaurants par région.
+    :param counts: Les lignes (Région, Count) à afficher.
+    :param selection: Les régions sélectionnées par un filtre croisé, de couleur différente.
+    :param filtre: La description des filtres croisés appliqués aux décomptes.
+    :return: Le graphique.
+    """
+    fig = px.bar(
+        counts,
+        x='Région',
+        y='Count',
+        title=_titre("Nombre de restaurants par région", filtre),
+        text="Count"
+    ).update_traces(
+        textposition='auto',
+    )
+    if selection:
+        fig.update_traces(marker_color=["#EF553B" if region in selection else "#636EFA" for region in counts['Région']])
+    return fig
+
+
+def treemap_departement(rows: pd.DataFrame, departement: str) -> go.Figure:
+    """
+    Crée le treemap de la répartition des restaurants par type dans un département.
+    :param rows: Les lignes (Département, Type, Count) du département.
+    :param departement: Le département sélectionné.
+    :return: Le graphique.
+    """
+    fig = px.treemap(
+        rows,
+        path=['Département', 'Type'],
+        values='Count',
+        title=f"Répartition des restaurants par type dans {departement}"
+    )
+
+    fig.update_layout(
+        height=600,
+    )
+
+    return fig
+
+
+# Vue initiale de la carte des points : la France métropolitaine
+CENTRE_FRANCE = (46.6, 2.4)
+ZOOM_FRANCE = 4.5
+
+
+def points_map(markers: pd.DataFrame) -> go.Figure:
+    """
+    Crée la carte des restaurants : les groupes sont affichés avec leur effectif, les restaurants isolés avec leur nom.
+    :param markers: Les marqueurs visibles (voir PointClusterIndex.query).
+    :return: Le graphique.
+    """
+    count = markers['count'].to_numpy()
+    texts = [nom if isinstance(nom, str) else f"{n} restaurants" for nom, n in zip(markers['Nom'], count)]
+    fig = go.Figure(go.Scattermapbox(
+        lat=markers['latitude'],
+        lon=markers['longitude'],
+        mode="markers",
+        marker={"size": (6 + 4 * np.log10(count)).round(1), "color": np.log10(count).round(2),
+                "colorscale": "Turbo", "cmin": 0, "cmax": 4},
+        hovertext=texts,
+        hoverinfo="text",
+    ))
+    fig.update_layout(
+        title="Restaurants (regroupés selon le zoom)",
+        mapbox={"style": "open-street-map", "center": {"lat": CENTRE_FRANCE[0], "lon": CENTRE_FRANCE[1]}, "zoom": ZOOM_FRANCE},
+        # uirevision conserve la position de la carte quand les marqueurs sont mis à jour
+        uirevision="points",
+        height=700,
+        margin={"l": 0, "r": 0, "t": 40, "b": 0},
+    )
+    return fig
+
+
+def proximite_map(lat: float, lon: float, results: pd.DataFrame) -> go.Figure:
+    """
+    Crée la carte d'une recherche de proximité : le point recherché et les restaurants trouvés.
+    :param lat: Latitude du point recherché.
+    :param lon: Longitude du point recherché.
+    :param results: Les restaurants trouvés (voir SpatialIndex.within et SpatialIndex.nearest).
+    :return: Le graphique.
+    """
+    texts = [f"{nom} ({type_restaurant}) - {distance:.2f} km"
+             for nom, type_restaurant, distance in zip(results['Nom'], results['Type'], results['distance_km'])]
+    fig = go.Figure([
+        go.Scattermapbox(
+            lat=results['latitude'],
+            lon=results['longitude'],
+            mode="markers",
+            marker={"size": 9, "color": results['distance_km'], "colorscale": "Turbo"},
+            hovertext=texts,
+            hoverinfo="text",
+            name="Restaurants",
+        ),
+        go.Scattermapbox(
+            lat=[lat],
+            lon=[lon],
+            mode="markers",
+            marker={"size": 16, "color": "black"},
+            hovertext=["Point recherché"],
+            hoverinfo="text",
+            name="Point recherché",
+        ),
+    ])
+    fig.update_layout(
+        title=f"{len(results)} restaurants trouvés",
+        mapbox={"style": "open-street-map", "center": {"lat": lat, "lon": lon}, "zoom": 13},
+        showlegend=False,
+        height=600,
+        margin={"l": 0, "r": 0, "t": 40, "b": 0},
+    )
+    return fig
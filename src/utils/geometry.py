@@ -0,0 +1,202 @@
+import json
+import os
+import tempfile
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Tuple
+import numpy as np
+
+SCRIPT_DIR = os.path.dirname(__file__)
+DATA_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, "..", "..", "data"))
+SOURCE_GEOJSON = os.path.join(DATA_DIR, "departements.geojson")
+GEOMETRY_DIR = os.path.join(DATA_DIR, "geometry")
+
+# Niveaux de détail : tolérance de simplification (en degrés) et nombre de décimales conservées
+NIVEAUX = {
+    "fin": (0.003, 4),
+    "moyen": (0.01, 3),
+    "grossier": (0.03, 3),
+}
+
+Point = Tuple[float, float]
+
+
+def _douglas_peucker(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Simplifie une ligne par l'algorithme de Douglas-Peucker (version itérative).
+    Les deux extrémités sont toujours conservées.
+    :param points: Tableau (n, 2) des points de la ligne.
+    :param tolerance: Distance maximale tolérée entre la ligne simplifiée et la ligne d'origine.
+    :return: Masque booléen des points conservés.
+    """
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        segment = points[end] - points[start]
+        inner = points[start + 1:end] - points[start]
+        length = np.hypot(*segment)
+        if length == 0:
+            distances = np.hypot(inner[:, 0], inner[:, 1])
+        else:
+            distances = np.abs(segment[0] * inner[:, 1] - segment[1] * inner[:, 0]) / length
+        i = int(np.argmax(distances))
+        if distances[i] > tolerance:
+            middle = start + 1 + i
+            keep[middle] = True
+            stack.append((start, middle))
+            stack.append((middle, end))
+    return keep
+
+
+def _polygons(geometry: dict) -> List[List[List[Point]]]:
+    """
+    :return: La liste des polygones (listes d'anneaux) d'un Polygon ou d'un MultiPolygon.
+    """
+    return [geometry["coordinates"]] if geometry["type"] == "Polygon" else geometry["coordinates"]
+
+
+def _owners(features: List[dict]) -> Dict[Point, FrozenSet[int]]:
+    """
+    :return: Pour chaque sommet, l'ensemble des départements qui le contiennent.
+    """
+    owners: Dict[Point, set] = {}
+    for i, feature in enumerate(features):
+        for polygon in _polygons(feature["geometry"]):
+            for ring in polygon:
+                for x, y in ring:
+                    owners.setdefault((x, y), set()).add(i)
+    return {point: frozenset(ids) for point, ids in owners.items()}
+
+
+def _simplify_ring(ring: List[Point], owners: Dict[Point, FrozenSet[int]], tolerance: float,
+                   arcs: Dict[Tuple[Point, ...], List[Point]]) -> List[Point]:
+    """
+    Simplifie un anneau en préservant la topologie : l'anneau est découpé en arcs aux sommets où
+    change l'ensemble des départements voisins, et chaque arc est simplifié une seule fois (cache arcs),
+    de sorte que deux départements voisins partagent exactement la même frontière simplifiée.
+    :param ring: Anneau fermé (le dernier point est égal au premier).
+    :param owners: Départements de chaque sommet (voir _owners).
+    :param tolerance: Tolérance de Douglas-Peucker.
+    :param arcs: Cache des arcs déjà simplifiés, indexé par la suite de points dans un sens canonique.
+    :return: L'anneau simplifié.
+    """
+    points = [tuple(point) for point in ring[:-1]]
+    n = len(points)
+    junctions = [
+        i for i in range(n)
+        if owners[points[i]] != owners[points[i - 1]] or owners[points[i]] != owners[points[(i + 1) % n]]
+        or len(owners[points[i]]) > 2
+    ]
+    if not junctions:
+        # Anneau sans voisin (île, côte) : on fixe arbitrairement son point le plus à l'ouest puis au sud
+        junctions = [min(range(n), key=lambda i: points[i])]
+
+    simplified: List[Point] = []
+    for j, start in enumerate(junctions):
+        end = junctions[(j + 1) % len(junctions)]
+        arc = [points[k % n] for k in range(start, end + (n if end <= start else 0) + 1)]
+        reverse = arc[::-1] < arc
+        key = tuple(arc[::-1] if reverse else arc)
+        if key not in arcs:
+            keep = _douglas_peucker(np.array(key), tolerance)
+            arcs[key] = [point for point, kept in zip(key, keep) if kept]
+        result = arcs[key][::-1] if reverse else arcs[key]
+        simplified.extend(result[:-1])
+    simplified.append(simplified[0])
+    return simplified if len(simplified) >= 4 else [tuple(point) for point in ring]
+
+
+def simplify_geojson(geojson_data: dict, tolerance: float, decimals: int) -> dict:
+    """
+    Simplifie les frontières des départements et réduit la précision des coordonnées.
+    :param geojson_data: FeatureCollection d'origine.
+    :param tolerance: Tolérance de simplification, en degrés.
+    :param decimals: Nombre de décimales conservées.
+    :return: Une nouvelle FeatureCollection simplifiée.
+    """
+    features = geojson_data["features"]
+    owners = _owners(features)
+    arcs: Dict[Tuple[Point, ...], List[Point]] = {}
+
+    simplified_features = []
+    for feature in features:
+        polygons = []
+        for polygon in _polygons(feature["geometry"]):
+            rings = []
+            for ring in polygon:
+                ring = _simplify_ring(ring, owners, tolerance, arcs)
+                rounded = [[round(x, decimals), round(y, decimals)] for x, y in ring]
+                deduplicated = [point for k, point in enumerate(rounded) if k == 0 or point != rounded[k - 1]]
+                if len(deduplicated) >= 4:
+                    rings.append(deduplicated)
+            if rings:
+                polygons.append(rings)
+        geometry = ({"type": "Polygon", "coordinates": polygons[0]} if len(polygons) == 1
+                    else {"type": "MultiPolygon", "coordinates": polygons})
+        simplified_features.append({"type": "Feature", "geometry": geometry, "properties": feature["properties"]})
+    return {"type": "FeatureCollection", "features": simplified_features}
+
+
+def geometry_path(niveau: str) -> str:
+    """
+    :param niveau: Niveau de détail (clé de NIVEAUX).
+    :return: Chemin du fichier geojson simplifié de ce niveau.
+    """
+    return os.path.join(GEOMETRY_DIR, f"departements-{niveau}.geojson")
+
+
+def preprocess_geometry() -> Dict[str, int]:
+    """
+    Écrit les frontières simplifiées de chaque niveau de détail dans data/geometry.
+    Chaque fichier est écrit sous un nom temporaire propre à l'appel puis renommé : plusieurs threads ou processus
+    peuvent régénérer le même niveau en même temps sans mélanger leurs écritures.
+    :return: Taille en octets du fichier écrit pour chaque niveau.
+    """
+    with open(SOURCE_GEOJSON, 'r', encoding='utf-8') as f:
+        geojson_data = json.load(f)
+    os.makedirs(GEOMETRY_DIR, exist_ok=True)
+
+    sizes = {}
+    for niveau, (tolerance, decimals) in NIVEAUX.items():
+        path = geometry_path(niveau)
+        with tempfile.NamedTemporaryFile(dir=GEOMETRY_DIR, suffix=".tmp", delete=False) as tmp:
+            tmp_path = tmp.name
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(simplify_geojson(geojson_data, tolerance, decimals), f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, path)
+        finally:
+            # Une simplification ou une écriture interrompue ne laisse pas de fichier temporaire
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        sizes[niveau] = os.path.getsize(path)
+    return sizes
+
+
+@lru_cache(maxsize=None)
+def load_geojson(niveau: str = "moyen") -> dict:
+    """
+    Charge les frontières des départements au niveau de détail demandé.
+    Le fichier simplifié est régénéré s'il est absent ou plus ancien que data/departements.geojson,
+    et le résultat est gardé en mémoire pour les appels suivants.
+    :param niveau: Niveau de détail (clé de NIVEAUX) ou 'original' pour le fichier d'origine.
+    :return: La FeatureCollection.
+    """
+    if niveau == "original":
+        path = SOURCE_GEOJSON
+    else:
+        if niveau not in NIVEAUX:
+            raise ValueError(f"Niveau de détail inconnu : {niveau}. Niveaux disponibles : {', '.join(NIVEAUX)}.")
+        path = geometry_path(niveau)
+        if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(SOURCE_GEOJSON):
+            preprocess_geometry()
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    for niveau, size in preprocess_geometry().items():
+        print(f"{niveau} : {size / 1e3:.0f} Ko")
@@ -1,25 +1,218 @@
 import os
+import json
+import shutil
+import tempfile
+import urllib.request
+import urllib.error
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 
-def get_data(file_name: str) -> pd.DataFrame:
+DATA_URL = 'https://public.opendatasoft.com/api/explore/v2.1/catalog/datasets/osm-france-food-service/exports/csv?lang=fr&timezone=Europe%2FBerlin&use_labels=true&delimiter=%3B'
+
+# Nombre d'instantanés conservés sur disque pour chaque jeu de données
+SNAPSHOTS_A_CONSERVER = 3
+
+# Colonnes du jeu de données utilisées par le tableau de bord
+COLONNES_UTILISEES = ['Nom', 'Commune', 'Région', 'Département', 'Type', 'OSM Point']
+
+# Nombre de lignes lues à la fois lors de la conversion et de la lecture par morceaux
+CHUNKSIZE = 100_000
+
+
+def _snapshot_dir(cache_dir: Optional[str] = None) -> str:
     """
-    Charge un fichier CSV depuis le répertoire spécifié avec possibilité de gestion par morceaux (chunks).
-    :param file_name: Nom du fichier à charger (ex: 'rawdata.csv').
-    :return: DataFrame pandas contenant les données chargées ou un DataFrame combiné si chunksize est utilisé.
+    Renvoie le répertoire des instantanés locaux et le crée si besoin.
+    :param cache_dir: Répertoire à utiliser à la place de data/raw/snapshots.
+    :return: Chemin absolu du répertoire des instantanés.
     """
-    #raw_data_path = os.path.join(r"C:\\Users\\lohan\\Downloads", file_name)
-    url = 'https://public.opendatasoft.com/api/explore/v2.1/catalog/datasets/osm-france-food-service/exports/csv?lang=fr&timezone=Europe%2FBerlin&use_labels=true&delimiter=%3B'
+    if cache_dir is None:
+        script_dir = os.path.dirname(__file__)
+        dashboard_dir = os.path.abspath(os.path.join(script_dir, "..", ".."))
+        cache_dir = os.path.join(dashboard_dir, "data", "raw", "snapshots")
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
 
+def _read_meta(meta_path: str) -> Dict[str, str]:
+    """
+    Lit les métadonnées (ETag, Last-Modified, instantané courant) d'un jeu de données.
+    :param meta_path: Chemin du fichier de métadonnées JSON.
+    :return: Dictionnaire des métadonnées, vide si le fichier n'existe pas ou est illisible.
+    """
     try:
-            # Lis le fichier complet
-            data = pd.read_csv(url, on_bad_lines='skip', sep=";",encoding='utf-8')
-            script_dir = os.path.dirname(__file__)
-            dashboard_dir = os.path.abspath(os.path.join(script_dir, "..", ".."))
-            dashboard_dir = os.path.join(dashboard_dir, "data","raw")
-            os.makedirs(dashboard_dir, exist_ok=True)
-            raw_data_path = os.path.join(dashboard_dir, file_name)
-            data.to_csv(raw_data_path, index=False, sep=";")
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _write_meta(meta_path: str, meta: Dict[str, str]) -> None:
+    """
+    Écrit les métadonnées de manière atomique (fichier temporaire puis renommage).
+    :param meta_path: Chemin du fichier de métadonnées JSON.
+    :param meta: Métadonnées à écrire.
+    """
+    tmp_path = meta_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, meta_path)
+
+
+def latest_snapshot(file_name: str, cache_dir: Optional[str] = None) -> Optional[str]:
+    """
+    Renvoie le chemin de l'instantané le plus récent d'un jeu de données.
+    :param file_name: Nom du jeu de données (ex: 'osm-france-food-service.csv').
+    :param cache_dir: Répertoire des instantanés.
+    :return: Chemin de l'instantané ou None si aucun n'existe.
+    """
+    cache_dir = _snapshot_dir(cache_dir)
+    stem = os.path.splitext(file_name)[0]
+    meta = _read_meta(os.path.join(cache_dir, f"{stem}.json"))
+    snapshot = meta.get("snapshot")
+    if snapshot and os.path.exists(os.path.join(cache_dir, snapshot)):
+        return os.path.join(cache_dir, snapshot)
+
+    candidates = sorted(f for f in os.listdir(cache_dir) if f.startswith(stem + "-") and f.endswith(".parquet"))
+    return os.path.join(cache_dir, candidates[-1]) if candidates else None
+
+
+def _prune_snapshots(cache_dir: str, stem: str) -> None:
+    """
+    Supprime les instantanés les plus anciens au-delà de SNAPSHOTS_A_CONSERVER.
+    :param cache_dir: Répertoire des instantanés.
+    :param stem: Nom du jeu de données sans extension.
+    """
+    snapshots = sorted(f for f in os.listdir(cache_dir) if f.startswith(stem + "-") and f.endswith(".parquet"))
+    for old in snapshots[:-SNAPSHOTS_A_CONSERVER]:
+        os.remove(os.path.join(cache_dir, old))
+
+
+def _csv_to_parquet(csv_path: str, parquet_path: str) -> None:
+    """
+    Convertit l'export CSV en Parquet morceau par morceau, sans le charger entièrement en mémoire.
+    Toutes les colonnes sont typées en chaînes de caractères pour que le schéma soit identique d'un morceau à l'autre.
+    Le fichier est écrit sous un nom temporaire puis renommé : une conversion interrompue ne laisse pas
+    d'instantané tronqué que latest_snapshot pourrait prendre pour le plus récent.
+    :param csv_path: Chemin du fichier CSV téléchargé.
+    :param parquet_path: Chemin du fichier Parquet à écrire.
+    """
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(parquet_path), suffix=".parquet.tmp", delete=False) as tmp:
+        tmp_path = tmp.name
+    try:
+        writer = None
+        try:
+            for chunk in pd.read_csv(csv_path, on_bad_lines='skip', sep=";", encoding='utf-8', dtype=str, chunksize=CHUNKSIZE):
+                if writer is None:
+                    schema = pa.schema([(column, pa.string()) for column in chunk.columns])
+                    writer = pq.ParquetWriter(tmp_path, schema)
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+        finally:
+            if writer is not None:
+                writer.close()
+        os.replace(tmp_path, parquet_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _download_snapshot(url: str, cache_dir: str, stem: str, meta: Dict[str, str]) -> Optional[str]:
+    """
+    Télécharge le jeu de données avec une requête conditionnelle et l'enregistre au format Parquet.
+    :param url: URL de l'export CSV.
+    :param cache_dir: Répertoire des instantanés.
+    :param stem: Nom du jeu de données sans extension.
+    :param meta: Métadonnées de l'instantané courant (ETag, Last-Modified), mises à jour sur place.
+    :return: Chemin du nouvel instantané, ou None si le serveur répond 304 (données inchangées).
+    """
+    request = urllib.request.Request(url)
+    if meta.get("etag"):
+        request.add_header("If-None-Match", meta["etag"])
+    if meta.get("last_modified"):
+        request.add_header("If-Modified-Since", meta["last_modified"])
+
+    try:
+        response = urllib.request.urlopen(request)
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return None
+        raise
+
+    # Le corps est écrit sur disque par blocs au lieu d'être gardé en mémoire
+    with response, tempfile.NamedTemporaryFile(dir=cache_dir, suffix=".csv", delete=False) as tmp:
+        shutil.copyfileobj(response, tmp, length=1024 * 1024)
+        headers = response.headers
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    snapshot = f"{stem}-{timestamp}.parquet"
+    try:
+        _csv_to_parquet(tmp.name, os.path.join(cache_dir, snapshot))
+    finally:
+        os.remove(tmp.name)
+
+    meta.update({
+        "etag": headers.get("ETag", ""),
+        "last_modified": headers.get("Last-Modified", ""),
+        "snapshot": snapshot,
+        "fetched_at": timestamp,
+    })
+    return os.path.join(cache_dir, snapshot)
+
+
+def resolve_snapshot(file_name: str, url: str = DATA_URL, offline: bool = False, cache_dir: Optional[str] = None) -> str:
+    """
+    Renvoie l'instantané local à jour du jeu de données.
+    L'instantané est revalidé auprès du serveur par une requête conditionnelle (ETag/Last-Modified) :
+    les données ne sont téléchargées à nouveau que si elles ont changé.
+    :param file_name: Nom du jeu de données (ex: 'osm-france-food-service.csv').
+    :param url: URL de l'export CSV.
+    :param offline: Si True, aucune requête réseau n'est faite et l'instantané le plus récent est utilisé.
+    :param cache_dir: Répertoire des instantanés (par défaut data/raw/snapshots).
+    :return: Chemin de l'instantané Parquet.
+    """
+    cache_dir = _snapshot_dir(cache_dir)
+    stem = os.path.splitext(file_name)[0]
+    meta_path = os.path.join(cache_dir, f"{stem}.json")
+
+    snapshot = latest_snapshot(file_name, cache_dir)
+    if offline:
+        if snapshot is None:
+            raise FileNotFoundError(f"Aucun instantané local pour {file_name} en mode hors ligne.")
+        print(f"Mode hors ligne : utilisation de l'instantané {snapshot}")
+        return snapshot
+
+    meta = _read_meta(meta_path) if snapshot else {}
+    try:
+        new_snapshot = _download_snapshot(url, cache_dir, stem, meta)
+    except urllib.error.URLError as e:
+        if snapshot is None:
+            raise
+        print(f"Serveur injoignable ({e}), utilisation de l'instantané {snapshot}")
+        return snapshot
+
+    if new_snapshot is None:
+        print(f"Données inchangées, utilisation de l'instantané {snapshot}")
+        return snapshot
+
+    _write_meta(meta_path, meta)
+    _prune_snapshots(cache_dir, stem)
+    print(f"Nouvel instantané enregistré : {new_snapshot}")
+    return new_snapshot
+
+
+def get_data(file_name: str, url: str = DATA_URL, offline: bool = False, cache_dir: Optional[str] = None) -> pd.DataFrame:
+    """
+    Charge le jeu de données depuis son instantané local au format Parquet (voir resolve_snapshot).
+    :param file_name: Nom du jeu de données (ex: 'osm-france-food-service.csv').
+    :param url: URL de l'export CSV.
+    :param offline: Si True, aucune requête réseau n'est faite et l'instantané le plus récent est utilisé.
+    :param cache_dir: Répertoire des instantanés (par défaut data/raw/snapshots).
+    :return: DataFrame pandas contenant les données chargées.
+    """
+    try:
+        data = pd.read_parquet(resolve_snapshot(file_name, url, offline, cache_dir))
 
     except pd.errors.ParserError as e:
         print(f"Erreur lors de la lecture du fichier CSV: {e}")
@@ -34,4 +227,18 @@ def get_data(file_name: str) -> pd.DataFrame:
     return data
 
 
-
+def iter_data(file_name: str, chunksize: int = CHUNKSIZE, columns: List[str] = COLONNES_UTILISEES,
+              url: str = DATA_URL, offline: bool = False, cache_dir: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """
+    Lit le jeu de données par morceaux depuis son instantané local, en ne chargeant que les colonnes demandées.
+    :param file_name: Nom du jeu de données (ex: 'osm-france-food-service.csv').
+    :param chunksize: Nombre de lignes par morceau.
+    :param columns: Colonnes à lire (par défaut celles utilisées par le tableau de bord).
+    :param url: URL de l'export CSV.
+    :param offline: Si True, aucune requête réseau n'est faite et l'instantané le plus récent est utilisé.
+    :param cache_dir: Répertoire des instantanés (par défaut data/raw/snapshots).
+    :return: Itérateur de DataFrames dont toutes les colonnes sont des chaînes de caractères.
+    """
+    parquet_file = pq.ParquetFile(resolve_snapshot(file_name, url, offline, cache_dir))
+    for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+        yield batch.to_pandas()
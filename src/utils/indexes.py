@@ -0,0 +1,80 @@
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+import numpy as np
+import pandas as pd
+from .aggregation import Metrics
+
+
+@dataclass
+class DashboardIndexes:
+    """
+    Index de recherche construits une fois par version des données pour les callbacks des dropdowns et du treemap.
+    """
+    departements: List[str]
+    departement_options: List[Dict[str, str]]
+    type_options: Dict[str, List[Dict[str, str]]]
+    treemap_rows: Dict[str, pd.DataFrame]
+    nom_positions: Dict[Tuple[str, str], int]
+    nom_offsets: np.ndarray
+    nom_sorted: np.ndarray
+
+    def noms(self, departement: str, type_restaurant: str) -> np.ndarray:
+        """
+        :param departement: Le département sélectionné.
+        :param type_restaurant: Le type de restaurant sélectionné.
+        :return: Les noms distincts et triés des restaurants du couple, ou un tableau vide.
+        """
+        i = self.nom_positions.get((departement, type_restaurant))
+        if i is None:
+            return self.nom_sorted[:0]
+        return self.nom_sorted[self.nom_offsets[i]:self.nom_offsets[i + 1]]
+
+
+def _options(values) -> List[Dict[str, str]]:
+    """
+    :return: Les options d'un dropdown dont le libellé et la valeur sont identiques.
+    """
+    return [{"label": value, "value": value} for value in values]
+
+
+def build_indexes(metrics: Metrics) -> DashboardIndexes:
+    """
+    Construit les index des callbacks à partir des métriques : département -> types,
+    (département, type) -> noms triés et distincts, département -> lignes du treemap.
+    :param metrics: Métriques de la version des données.
+    :return: Les index construits.
+    """
+    departements = sorted(metrics.restaurants_par_departement['Département'].unique())
+
+    type_departement = metrics.type_departement
+    type_options = {
+        departement: _options(sorted(set(type_departement.values(i))))
+        for i, departement in enumerate(type_departement.keys['Département'])
+    }
+
+    treemap_rows = {
+        departement: rows.reset_index(drop=True)
+        for departement, rows in metrics.restaurants_par_departement.groupby('Département', sort=False, observed=True)
+    }
+
+    # Les codes de noms de chaque couple sont triés une fois par ordre alphabétique des libellés
+    nom_type = metrics.nom_type
+    order = np.argsort(nom_type.categories)
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    group = np.repeat(np.arange(len(nom_type)), np.diff(nom_type.offsets))
+    codes = nom_type.codes[np.lexsort((rank[nom_type.codes], group))]
+    noms = nom_type.categories[codes]
+    keep = noms != ""
+    offsets = np.zeros(len(nom_type) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(group[keep], minlength=len(nom_type)), out=offsets[1:])
+
+    return DashboardIndexes(
+        departements=departements,
+        departement_options=_options(departements),
+        type_options=type_options,
+        treemap_rows=treemap_rows,
+        nom_positions={key: i for i, key in enumerate(zip(nom_type.keys['Département'], nom_type.keys['Type']))},
+        nom_offsets=offsets,
+        nom_sorted=noms[keep],
+    )
@@ -0,0 +1,354 @@
+import collections
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+import flask
+from config import CONFIG
+from .figure_cache import FIGURE_CACHE
+from .metrics_store import REGISTRY
+from .profiling import Phase, on_phase
+
+# Bornes des histogrammes de durée des callbacks, en secondes
+BORNES_DUREE = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Bornes des histogrammes de taille des réponses des callbacks, en octets
+BORNES_TAILLE = (1e3, 1e4, 1e5, 3e5, 1e6, 3e6, 1e7)
+# Route par laquelle Dash exécute les callbacks
+ROUTE_CALLBACKS = "/_dash-update-component"
+# Nombre de profils de requêtes lentes conservés sur disque
+PROFILS_A_CONSERVER = 50
+
+
+class Histogram:
+    """
+    Histogramme cumulatif au format Prometheus : nombre d'observations inférieures ou égales à chaque borne,
+    somme et nombre total des observations.
+    """
+
+    def __init__(self, bounds: Sequence[float]) -> None:
+        """
+        :param bounds: Bornes supérieures des intervalles, croissantes (la borne +Inf est ajoutée).
+        """
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """
+        :param value: Valeur observée.
+        """
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """
+        :return: Les couples (borne, nombre cumulé d'observations), borne '+Inf' comprise.
+        """
+        total, buckets = 0, []
+        for bound, count in zip(list(self.bounds) + [float("inf")], self.counts):
+            total += count
+            buckets.append(("+Inf" if bound == float("inf") else f"{bound:g}", total))
+        return buckets
+
+
+def _label(value: str) -> str:
+    """
+    :return: La valeur échappée pour une étiquette Prometheus.
+    """
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class SlowRequestProfiler:
+    """
+    Profileur par échantillonnage des requêtes lentes. Pendant l'exécution d'un callback, un thread relève
+    la pile d'appels du thread qui le traite toutes les interval secondes ; si la requête dépasse threshold
+    secondes, les piles relevées sont écrites au format « collapsed » (une pile par ligne, suivie du
+    nombre d'échantillons), lisible par flamegraph.pl ou speedscope.
+    Le thread d'échantillonnage ne travaille que lorsqu'une requête est en cours.
+    """
+
+    def __init__(self, threshold: float, interval: float = 0.005, directory: Optional[str] = None) -> None:
+        """
+        :param threshold: Durée en secondes à partir de laquelle une requête est profilée.
+        :param interval: Intervalle entre deux échantillons, en secondes.
+        :param directory: Dossier des profils (CONFIG['PROFILE_DIR'] par défaut).
+        """
+        self.threshold = threshold
+        self.interval = interval
+        self.directory = directory or CONFIG['PROFILE_DIR']
+        self._lock = threading.Lock()
+        self._active: Dict[int, collections.Counter] = {}
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self) -> None:
+        """
+        Boucle du thread d'échantillonnage.
+        """
+        while True:
+            self._wake.wait()
+            frames = sys._current_frames()
+            with self._lock:
+                if not self._active:
+                    self._wake.clear()
+                    continue
+                for thread_id, stacks in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stacks[self._collapse(frame)] += 1
+            time.sleep(self.interval)
+
+    @staticmethod
+    def _collapse(frame) -> str:
+        """
+        :return: La pile d'appels d'une frame, de la racine à la fonction courante, séparée par des ';'.
+        """
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(stack))
+
+    def start(self) -> None:
+        """
+        Commence à échantillonner le thread courant.
+        """
+        with self._lock:
+            self._active[threading.get_ident()] = collections.Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sample, name="slow-request-profiler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def stop(self, name: str, seconds: float) -> Optional[str]:
+        """
+        Arrête d'échantillonner le thread courant et écrit son profil si la requête a été lente.
+        :param name: Nom du callback.
+        :param seconds: Durée de la requête.
+        :return: Le chemin du profil écrit, ou None.
+        """
+        with self._lock:
+            stacks = self._active.pop(threading.get_ident(), None)
+        if not stacks or seconds < self.threshold:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+        path = os.path.join(self.directory, f"{name}-{timestamp}-{seconds * 1e3:.0f}ms.txt")
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        self._prune()
+        print(f"Requête lente ({name}, {seconds:.2f} s), profil enregistré : {path}")
+        return path
+
+    def _prune(self) -> None:
+        """
+        Supprime les profils les plus anciens au-delà de PROFILS_A_CONSERVER.
+        """
+        paths = sorted((os.path.join(self.directory, name) for name in os.listdir(self.directory)),
+                       key=os.path.getmtime, reverse=True)
+        for path in paths[PROFILS_A_CONSERVER:]:
+            os.remove(path)
+
+
+class Instrumentation:
+    """
+    Mesures du tableau de bord exposées au format texte de Prometheus (voir instrument) :
+    durée, taille des requêtes et des réponses et nombre d'erreurs de chaque callback ;
+    durée et nombre de lignes de chaque étape du chargement des données.
+    Les mesures sont propres au processus : avec plusieurs processus serveurs, chacun expose les siennes.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.durations: Dict[str, Histogram] = collections.defaultdict(lambda: Histogram(BORNES_DUREE))
+        self.response_sizes: Dict[str, Histogram] = collections.defaultdict(lambda: Histogram(BORNES_TAILLE))
+        self.request_bytes: Dict[str, int] = collections.Counter()
+        self.errors: Dict[str, int] = collections.Counter()
+        self.slow: Dict[str, int] = collections.Counter()
+        self.stages: Dict[str, Phase] = {}
+        self.stage_runs: Dict[Tuple[str, str], int] = collections.Counter()
+        self.stage_seconds: Dict[str, float] = collections.Counter()
+
+    def record_callback(self, name: str, seconds: float, request_bytes: int, response_bytes: int, error: bool) -> None:
+        """
+        Enregistre l'exécution d'un callback.
+        :param name: Nom du callback.
+        :param seconds: Durée de la requête (exécution et sérialisation).
+        :param request_bytes: Taille du corps de la requête.
+        :param response_bytes: Taille du corps de la réponse envoyée (compressée le cas échéant).
+        :param error: True si le callback a échoué.
+        """
+        with self._lock:
+            self.durations[name].observe(seconds)
+            self.response_sizes[name].observe(response_bytes)
+            self.request_bytes[name] += request_bytes
+            if error:
+                self.errors[name] += 1
+
+    def record_slow(self, name: str) -> None:
+        """
+        Enregistre un callback profilé car plus lent que le seuil (voir SlowRequestProfiler).
+        :param name: Nom du callback.
+        """
+        with self._lock:
+            self.slow[name] += 1
+
+    def record_stage(self, phase: Phase) -> None:
+        """
+        Enregistre une étape terminée du chargement des données (voir profiling.on_phase).
+        :param phase: La phase terminée ou échouée.
+        """
+        with self._lock:
+            self.stages[phase.name] = Phase(phase.name, phase.status, phase.started_at, phase.seconds, phase.error, phase.rows)
+            self.stage_runs[phase.name, phase.status] += 1
+            self.stage_seconds[phase.name] += phase.seconds or 0.0
+
+    def render(self) -> str:
+        """
+        :return: Les mesures au format texte de Prometheus (version 0.0.4).
+        """
+        lines: List[str] = []
+
+        def family(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            family("dashboard_callback_duration_seconds", "histogram", "Durée des callbacks (exécution et sérialisation).")
+            for name, histogram in sorted(self.durations.items()):
+                self._histogram(lines, "dashboard_callback_duration_seconds", name, histogram)
+            family("dashboard_callback_response_bytes", "histogram", "Taille des réponses des callbacks.")
+            for name, histogram in sorted(self.response_sizes.items()):
+                self._histogram(lines, "dashboard_callback_response_bytes", name, histogram)
+            family("dashboard_callback_request_bytes_total", "counter", "Taille cumulée des requêtes des callbacks.")
+            for name, total in sorted(self.request_bytes.items()):
+                lines.append(f'dashboard_callback_request_bytes_total{{callback="{_label(name)}"}} {total}')
+            family("dashboard_callback_errors_total", "counter", "Nombre de callbacks en erreur.")
+            for name in sorted(self.durations):
+                lines.append(f'dashboard_callback_errors_total{{callback="{_label(name)}"}} {self.errors[name]}')
+            family("dashboard_callback_slow_total", "counter", "Nombre de callbacks profilés car plus lents que le seuil.")
+            for name, total in sorted(self.slow.items()):
+                lines.append(f'dashboard_callback_slow_total{{callback="{_label(name)}"}} {total}')
+
+            family("dashboard_stage_duration_seconds", "gauge", "Durée de la dernière exécution de chaque étape du chargement.")
+            for name, phase in self.stages.items():
+                lines.append(f'dashboard_stage_duration_seconds{{stage="{_label(name)}"}} {phase.seconds or 0.0:.6f}')
+            family("dashboard_stage_rows", "gauge", "Nombre de lignes traitées par la dernière exécution de chaque étape.")
+            for name, phase in self.stages.items():
+                if phase.rows is not None:
+                    lines.append(f'dashboard_stage_rows{{stage="{_label(name)}"}} {phase.rows}')
+            family("dashboard_stage_seconds_total", "counter", "Durée cumulée de chaque étape du chargement.")
+            for name, total in self.stage_seconds.items():
+                lines.append(f'dashboard_stage_seconds_total{{stage="{_label(name)}"}} {total:.6f}')
+            family("dashboard_stage_runs_total", "counter", "Nombre d'exécutions de chaque étape, par statut.")
+            for (name, status), total in self.stage_runs.items():
+                lines.append(f'dashboard_stage_runs_total{{stage="{_label(name)}",status="{status}"}} {total}')
+
+        stats = FIGURE_CACHE.stats()
+        family("dashboard_figure_cache_total", "counter", "Accès au cache de figures, par résultat.")
+        for result in ("hits", "misses", "coalesced"):
+            lines.append(f'dashboard_figure_cache_total{{result="{result}"}} {stats[result]}')
+        family("dashboard_figure_cache_size", "gauge", "Nombre de figures en cache.")
+        lines.append(f"dashboard_figure_cache_size {stats['size']}")
+        family("dashboard_figure_cache_bytes", "gauge", "Taille sérialisée des figures en cache (geojson partagés comptés une fois).")
+        lines.append(f"dashboard_figure_cache_bytes {stats['bytes']}")
+
+        version = REGISTRY.current()
+        family("dashboard_ready", "gauge", "1 si une version des données est publiée.")
+        lines.append(f"dashboard_ready {int(version is not None)}")
+        if version is not None:
+            family("dashboard_dataset_info", "gauge", "Version des données servie.")
+            lines.append(f'dashboard_dataset_info{{version="{_label(version.key)}"}} 1')
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _histogram(lines: List[str], metric: str, name: str, histogram: Histogram) -> None:
+        """
+        Ajoute les lignes d'un histogramme (intervalles cumulés, somme, nombre).
+        """
+        label = f'callback="{_label(name)}"'
+        for bound, total in histogram.cumulative():
+            lines.append(f'{metric}_bucket{{{label},le="{bound}"}} {total}')
+        lines.append(f"{metric}_sum{{{label}}} {histogram.sum:.6f}")
+        lines.append(f"{metric}_count{{{label}}} {histogram.count}")
+
+
+# Mesures uniques du processus
+INSTRUMENTATION = Instrumentation()
+on_phase(INSTRUMENTATION.record_stage)
+
+
+def instrument(app, instrumentation: Instrumentation = INSTRUMENTATION) -> None:
+    """
+    Mesure chaque exécution de callback de l'application et expose les mesures sur la route /metrics.
+    Si CONFIG['PROFILE_SLOW_REQUESTS'] est non nul, les callbacks plus lents que ce nombre de secondes
+    sont profilés (voir SlowRequestProfiler).
+    :param app: L'application Dash.
+    :param instrumentation: Les mesures à alimenter.
+    """
+    server = app.server
+    profiler = SlowRequestProfiler(CONFIG['PROFILE_SLOW_REQUESTS']) if CONFIG['PROFILE_SLOW_REQUESTS'] else None
+    names: Dict[str, str] = {}
+
+    def callback_name(output: str) -> str:
+        """
+        :return: Le nom de la fonction du callback correspondant à une sortie Dash.
+        """
+        if output not in names:
+            entry = app.callback_map.get(output)
+            names[output] = entry["callback"].__name__ if entry and "callback" in entry else output
+        return names[output]
+
+    @server.before_request
+    def start_timer() -> None:
+        """
+        Note l'instant de début d'une requête de callback.
+        """
+        if flask.request.path.endswith(ROUTE_CALLBACKS):
+            flask.g.instrumentation_start = time.perf_counter()
+            if profiler is not None:
+                profiler.start()
+
+    @server.after_request
+    def record_callback(response: flask.Response) -> flask.Response:
+        """
+        Enregistre la durée, les tailles et le statut d'une requête de callback.
+        """
+        start = flask.g.pop("instrumentation_start", None)
+        if start is None:
+            return response
+        seconds = time.perf_counter() - start
+        body = flask.request.get_json(silent=True) or {}
+        name = callback_name(body.get("output", "inconnu"))
+        instrumentation.record_callback(
+            name, seconds, flask.request.content_length or 0,
+            0 if response.direct_passthrough else response.calculate_content_length() or 0,
+            response.status_code >= 500,
+        )
+        flask.g.instrumentation_callback = (name, seconds)
+        return response
+
+    @server.teardown_request
+    def stop_profiler(error: Optional[BaseException]) -> None:
+        """
+        Arrête l'échantillonnage de la requête, y compris si elle s'est interrompue avant sa réponse.
+        """
+        if profiler is not None and flask.request.path.endswith(ROUTE_CALLBACKS):
+            name, seconds = flask.g.get("instrumentation_callback", ("inconnu", 0.0))
+            if profiler.stop(name, seconds):
+                instrumentation.record_slow(name)
+
+    @server.route("/metrics")
+    def metrics() -> flask.Response:
+        """
+        Expose les mesures du processus au format texte de Prometheus.
+        :return: Les mesures.
+        """
+        return flask.Response(instrumentation.render(), mimetype="text/plain", headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import threading
+import weakref
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Callable, Dict, List, Optional
+import pandas as pd
+from .aggregation import Metrics
+from .compact import COLONNES_RESIDENTES, compact_frame, resident_bytes
+from .indexes import DashboardIndexes, build_indexes
+from .name_search import NameSearchIndex
+from .point_clusters import PointClusterIndex
+from .spatial_index import SpatialIndex
+
+
+@dataclass
+class DatasetVersion:
+    """
+    Une version du jeu de données nettoyé, de ses métriques et des index des callbacks, gardée en mémoire côté serveur.
+    Les données sont sous forme compacte (voir compact_frame) et les métriques référencent leurs lignes.
+    """
+    key: str
+    data: pd.DataFrame
+    metrics: Metrics
+    indexes: DashboardIndexes
+
+    @cached_property
+    def clusters(self) -> PointClusterIndex:
+        """
+        Index multi-résolution de la carte des points, construit à la première utilisation.
+        """
+        return PointClusterIndex(self.metrics.geo_points(self.data))
+
+    @cached_property
+    def spatial(self) -> SpatialIndex:
+        """
+        Index spatial des restaurants pour les recherches de proximité, construit à la première utilisation.
+        """
+        return SpatialIndex(self.data)
+
+    @cached_property
+    def names(self) -> NameSearchIndex:
+        """
+        Index de recherche des restaurants par nom, construit à la première utilisation.
+        """
+        return NameSearchIndex(self.data)
+
+    @cached_property
+    def cascade(self) -> bytes:
+        """
+        Structure département -> type -> noms de la recherche côté navigateur (voir NameSearchIndex.cascade),
+        sérialisée en JSON une seule fois par version.
+        """
+        types = {departement: [option["value"] for option in options]
+                 for departement, options in self.indexes.type_options.items()}
+        return json.dumps(self.names.cascade(types), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    @cached_property
+    def memory(self) -> Dict[str, object]:
+        """
+        Mémoire occupée par la version, calculée à la première demande (les versions ne changent pas).
+        :return: Le nombre de lignes, les octets de chaque colonne des données et de l'index, leur total
+        et la taille des métriques.
+        """
+        columns = resident_bytes(self.data)
+        return {"rows": len(self.data), "columns": columns, "data_bytes": sum(columns.values()),
+                "metrics_bytes": self.metrics.nbytes}
+
+
+def dataset_key(data: pd.DataFrame) -> str:
+    """
+    Calcule une clé de version à partir du contenu des données : chaque valeur des colonnes gardées en mémoire
+    (voir COLONNES_RESIDENTES), dans l'ordre des lignes. Un nom renommé ou une coordonnée déplacée change la clé,
+    même si les décomptes sont identiques.
+    La clé est déterministe et ne dépend pas du type des colonnes de texte (objets Python, catégories ou types pyarrow) :
+    deux processus ayant chargé les mêmes données obtiennent la même clé.
+    :param data: Données nettoyées.
+    :return: Clé hexadécimale courte.
+    """
+    columns = [column for column in COLONNES_RESIDENTES if column in data.columns]
+    digest = hashlib.sha1(",".join(columns).encode())
+    digest.update(pd.util.hash_pandas_object(data[columns], index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+
+class MetricsRegistry:
+    """
+    Registre des versions du jeu de données, partagé par tous les callbacks du processus.
+    Le navigateur ne conserve que la clé de version (dans dcc.Store) et les callbacks
+    lisent les données en mémoire à partir de cette clé.
+
+    Le registre est un double tampon : il garde la version courante et la précédente (pour les pages ouvertes
+    avant le dernier remplacement). Les versions plus anciennes ne sont référencées que faiblement : un callback
+    qui a obtenu une version la garde jusqu'à la fin de son exécution, puis sa mémoire est libérée.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._versions: "weakref.WeakValueDictionary[str, DatasetVersion]" = weakref.WeakValueDictionary()
+        self._current: Optional[DatasetVersion] = None
+        self._previous: Optional[DatasetVersion] = None
+        self._release_hooks: List[Callable[[str], None]] = []
+
+    def on_release(self, hook: Callable[[str], None]) -> None:
+        """
+        Enregistre une fonction appelée avec la clé d'une version quand sa mémoire est libérée
+        (pour vider les caches de cette version par exemple).
+        :param hook: La fonction à appeler.
+        """
+        self._release_hooks.append(hook)
+
+    def _released(self, key: str) -> None:
+        """
+        Appelée quand une version est libérée ; ignorée si une version de même clé a été republiée depuis.
+        """
+        with self._lock:
+            if key in self._versions:
+                return
+        for hook in self._release_hooks:
+            hook(key)
+
+    def publish(self, data: pd.DataFrame, metrics: Metrics,
+                prepare: Optional[Callable[[DatasetVersion], None]] = None) -> DatasetVersion:
+        """
+        Enregistre une version sous forme compacte (voir compact_frame), construit ses index et en fait la version courante.
+        Le remplacement est atomique : les callbacks voient l'ancienne ou la nouvelle version complète,
+        jamais une version en cours de construction.
+        :param data: DataFrame nettoyé.
+        :param metrics: Métriques calculées à partir de data.
+        :param prepare: Fonction appelée sur la nouvelle version avant qu'elle devienne courante (pré-calcul des figures).
+        :return: La version enregistrée, ou la version courante si le contenu des données n'a pas changé (même clé).
+        """
+        key = dataset_key(data)
+        current = self._current
+        if current is not None and current.key == key:
+            return current
+
+        data = compact_frame(data)
+        metrics = metrics.share_dictionaries(data)
+        version = DatasetVersion(key, data, metrics, build_indexes(metrics))
+        if prepare is not None:
+            prepare(version)
+        with self._lock:
+            self._versions[version.key] = version
+            self._previous, self._current = self._current, version
+        weakref.finalize(version, self._released, version.key)
+        return version
+
+    def current(self) -> Optional[DatasetVersion]:
+        """
+        :return: La version courante, ou None si aucune version n'a été publiée.
+        """
+        return self._current
+
+    def versions(self) -> List[DatasetVersion]:
+        """
+        :return: Les versions encore en mémoire : la courante, la précédente et celles qu'un callback utilise encore.
+        """
+        with self._lock:
+            return list(self._versions.values())
+
+    def get(self, key: Optional[str]) -> Optional[DatasetVersion]:
+        """
+        Renvoie la version correspondant à une clé.
+        Une clé inconnue ou libérée (page ouverte avant un redémarrage ou plusieurs remplacements) renvoie la version courante.
+        :param key: Clé de version envoyée par le navigateur.
+        :return: La version demandée ou la version courante.
+        """
+        with self._lock:
+            return self._versions.get(key, self._current)
+
+
+# Registre unique du processus
+REGISTRY = MetricsRegistry()
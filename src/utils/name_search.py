@@ -0,0 +1,227 @@
+import re
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+# Nombre de suggestions renvoyées par frappe
+SUGGESTIONS = 20
+# Longueur maximale des préfixes dont les suggestions sont pré-calculées (les plus coûteux à chercher)
+PREFIXE_COURT = 2
+# En dessous de ce nombre de noms, un mot saisi ou le filtre département/type est parcouru en entier
+PARCOURS_DIRECT = 2000
+
+_SEPARATEURS = re.compile(r'[^a-z0-9]+')
+
+
+def fold_text(text: str) -> str:
+    """
+    Replie un texte pour la recherche : sans accents, en minuscules, les mots séparés par une seule espace.
+    :param text: Texte saisi.
+    :return: Le texte replié.
+    """
+    ascii_text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    return _SEPARATEURS.sub(' ', ascii_text.lower()).strip()
+
+
+def fold_series(values: pd.Series) -> pd.Series:
+    """
+    Applique fold_text à une série de textes (en un seul passage, plus rapide que l'enchaînement des méthodes str).
+    """
+    return pd.Series([fold_text(value) for value in values], index=values.index, dtype=object)
+
+
+class NameSearchIndex:
+    """
+    Index de recherche des restaurants par nom_complet (« Nom - Commune »), pour la saisie semi-automatique.
+    Chaque nom est replié (accents, casse, ponctuation) puis découpé en mots. Le vocabulaire est trié, si bien que
+    les mots commençant par un préfixe forment une plage trouvée par recherche dichotomique ; pour chaque mot,
+    la liste des noms qui le contiennent est triée dans l'ordre d'affichage des suggestions : les noms qui
+    commencent par ce mot, puis l'ordre alphabétique. Une requête n'examine ainsi que les premiers noms de
+    chaque mot de la plage, quelle que soit la taille du jeu de données.
+    """
+
+    def __init__(self, data: pd.DataFrame, limit: int = SUGGESTIONS) -> None:
+        self.limit = limit
+        rows = data[['nom_complet', 'Département', 'Type']].dropna(subset=['nom_complet'])
+
+        # Noms distincts, numérotés dans l'ordre alphabétique de leur forme repliée
+        noms = pd.Series(pd.unique(rows['nom_complet']), dtype=object)
+        entries = pd.DataFrame({'nom': noms, 'folded': fold_series(noms)}).sort_values(['folded', 'nom'], kind='stable')
+        self.noms = entries['nom'].to_numpy(dtype=object)
+        folded = entries['folded'].reset_index(drop=True)
+        self._padded = (' ' + folded).to_numpy(dtype=object)
+        n_entries = len(self.noms)
+
+        # Couples (département, type) -> noms, codés département * nombre de types + type
+        entry_of_row = pd.Index(self.noms).get_indexer(rows['nom_complet'])
+        departement_codes, self._departements = pd.factorize(rows['Département'])
+        type_codes, self._types = pd.factorize(rows['Type'])
+        pairs = departement_codes.astype(np.int64) * len(self._types) + type_codes
+        valid = (departement_codes >= 0) & (type_codes >= 0)
+        self._pair_entries = np.unique(pairs[valid] * n_entries + entry_of_row[valid])
+
+        # Liste inversée : mot -> noms qui le contiennent, triés par score (0 pour les noms commençant par le mot)
+        tokens = folded.str.split().explode().dropna()
+        token_codes, vocabulary = pd.factorize(tokens, sort=True)
+        entry = tokens.index.to_numpy(dtype=np.int64)
+        first = tokens.groupby(level=0).cumcount().to_numpy() == 0
+        scores = np.where(first, 0, n_entries) + entry
+        order = np.lexsort((scores, token_codes))
+        self._vocabulary = np.asarray(vocabulary, dtype=object)
+        self._token_starts = np.searchsorted(token_codes[order], np.arange(len(vocabulary) + 1))
+        self._scores = scores[order]
+
+        # Même chemin que search : la lecture élargie garantit l'ordre d'affichage
+        self._short = {
+            prefix: self._ranked(prefix, self._width(prefix)[1], None, [], self.limit)
+            for length in range(1, PREFIXE_COURT + 1)
+            for prefix in sorted({token[:length] for token in self._vocabulary if len(token) >= length})
+        }
+
+    def _tokens(self, word: str) -> Tuple[int, int]:
+        """
+        :return: La plage du vocabulaire des mots commençant par word.
+        """
+        return (int(np.searchsorted(self._vocabulary, word, side='left')),
+                int(np.searchsorted(self._vocabulary, word + '\uffff', side='left')))
+
+    def _width(self, word: str) -> Tuple[int, int]:
+        """
+        :return: Le nombre de mots distincts du vocabulaire commençant par word et le nombre de leurs occurrences.
+        """
+        first, last = self._tokens(word)
+        return last - first, int(self._token_starts[last] - self._token_starts[first])
+
+    def _scope(self, departement: Optional[str], type_restaurant: Optional[str]) -> Optional[np.ndarray]:
+        """
+        :return: Les numéros triés des noms d'un département (et d'un type), None si aucun filtre n'est demandé.
+        """
+        if not departement:
+            return None
+        n_entries, n_types = len(self.noms), len(self._types)
+        d = self._departements.get_indexer([departement])[0]
+        t = self._types.get_indexer([type_restaurant])[0] if type_restaurant else None
+        if d < 0 or t is not None and t < 0:
+            return np.empty(0, dtype=np.int64)
+        # Les couples d'un département sont contigus : d * n_types + [0, n_types)
+        first, last = (d * n_types + t, d * n_types + t + 1) if t is not None else (d * n_types, (d + 1) * n_types)
+        start, end = np.searchsorted(self._pair_entries, [first * n_entries, last * n_entries])
+        entries = self._pair_entries[start:end] % n_entries
+        return entries if t is not None else np.unique(entries)
+
+    def _filter(self, entries: np.ndarray, scope: Optional[np.ndarray], words: List[str]) -> np.ndarray:
+        """
+        :return: Masque des noms de entries qui appartiennent au filtre et dont un mot commence par chacun des mots donnés.
+        """
+        keep = np.ones(len(entries), dtype=bool)
+        if scope is not None:
+            positions = np.minimum(np.searchsorted(scope, entries), max(len(scope) - 1, 0))
+            keep &= scope[positions] == entries if len(scope) else False
+        # Les mots ne sont vérifiés que sur les noms qui passent déjà le filtre (la vérification est en Python)
+        for word in words:
+            prefix = ' ' + word
+            kept = np.flatnonzero(keep)
+            keep[kept] = np.fromiter((prefix in nom for nom in self._padded[entries[kept]]), dtype=bool, count=len(kept))
+        return keep
+
+    def _top(self, word: str, k: int, scope: Optional[np.ndarray], words: List[str]) -> Tuple[np.ndarray, np.ndarray, float]:
+        """
+        Lit les k premiers noms de chaque mot commençant par word et garde ceux qui passent les filtres.
+        :return: Les noms retenus dans l'ordre d'affichage, leurs scores, et le plus petit score non lu
+                 (les noms de score inférieur sont tous parmi les noms retenus).
+        """
+        first, last = self._tokens(word)
+        starts, ends = self._token_starts[first:last], self._token_starts[first + 1:last + 1]
+        lengths = np.minimum(ends - starts, k)
+        offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+        scores = np.unique(self._scores[np.arange(lengths.sum(), dtype=np.int64) + offsets])
+        truncated = ends - starts > k
+        threshold = self._scores[starts[truncated] + k].min() if truncated.any() else np.inf
+
+        # Un nom peut apparaître sous plusieurs mots : on garde son meilleur score
+        entries = scores % len(self.noms)
+        _, best = np.unique(entries, return_index=True)
+        best = np.sort(best)
+        entries, scores = entries[best], scores[best]
+        keep = self._filter(entries, scope, words)
+        return entries[keep], scores[keep], threshold
+
+    def search(self, query: str, departement: Optional[str] = None, type_restaurant: Optional[str] = None,
+               limit: Optional[int] = None) -> np.ndarray:
+        """
+        Recherche les restaurants dont le nom correspond à une saisie partielle.
+        Les noms qui commencent par le mot saisi le plus sélectif sont proposés en premier, puis l'ordre alphabétique.
+        :param query: Texte saisi ; chaque mot doit être le début d'un mot du nom (accents et casse ignorés).
+        :param departement: Limite la recherche à un département (toute la France si None).
+        :param type_restaurant: Limite la recherche à un type de restaurant du département.
+        :param limit: Nombre maximal de noms renvoyés (SUGGESTIONS par défaut).
+        :return: Les valeurs de nom_complet trouvées, dans l'ordre d'affichage.
+        """
+        limit = limit or self.limit
+        words = fold_text(query or "").split()
+        scope = self._scope(departement, type_restaurant)
+
+        if not words:
+            return self.noms[scope[:limit] if scope is not None else slice(0, limit)]
+        if scope is None and len(words) == 1 and len(words[0]) <= PREFIXE_COURT and limit <= self.limit:
+            return self.noms[self._short.get(words[0], np.empty(0, dtype=np.int64))[:limit]]
+
+        # Un mot peu fréquent est lu en entier ; sinon on part du mot qui couvre le moins de mots du vocabulaire
+        # et on ne lit que les premiers noms de chacun de ses mots. Les autres mots saisis sont vérifiés sur ces seuls noms.
+        widths = [self._width(word) for word in words]
+        i = int(np.argmin([occurrences for _, occurrences in widths]))
+        if widths[i][1] > PARCOURS_DIRECT:
+            i = int(np.argmin([width for width, _ in widths]))
+        driver, others = words[i], words[:i] + words[i + 1:]
+
+        if scope is not None and len(scope) <= min(PARCOURS_DIRECT, widths[i][1]):
+            entries = scope[self._filter(scope, None, words)]
+            later = np.fromiter((not nom.startswith(' ' + driver) for nom in self._padded[entries]), dtype=bool, count=len(entries))
+            return self.noms[entries[np.lexsort((entries, later))[:limit]]]
+
+        return self.noms[self._ranked(driver, widths[i][1], scope, others, limit)]
+
+    def _ranked(self, driver: str, occurrences: int, scope: Optional[np.ndarray], words: List[str], limit: int) -> np.ndarray:
+        """
+        Lit les premiers noms de chaque mot commençant par driver, en élargissant la lecture tant que les filtres
+        écartent trop de noms ou que l'ordre des noms retenus n'est pas certain (voir _top).
+        :param occurrences: Le nombre d'occurrences des mots commençant par driver (voir _width).
+        :return: Les numéros des limit premiers noms, dans l'ordre d'affichage.
+        """
+        k = limit if occurrences > PARCOURS_DIRECT else max(occurrences, 1)
+        while True:
+            entries, scores, threshold = self._top(driver, k, scope, words)
+            entries = entries[scores < threshold]
+            if len(entries) >= limit or threshold == np.inf:
+                return entries[:limit]
+            k *= 4
+
+    def options(self, query: str, departement: Optional[str] = None, type_restaurant: Optional[str] = None,
+                limit: Optional[int] = None) -> List[Dict[str, str]]:
+        """
+        Options du dropdown de recherche (voir search). Le champ search contient le nom et sa forme repliée,
+        pour que le filtre du navigateur ne masque pas les suggestions trouvées sans tenir compte des accents.
+        :return: Les options du dropdown.
+        """
+        return [{"label": nom, "value": nom, "search": f"{nom} {fold_text(nom)}"}
+                for nom in self.search(query, departement, type_restaurant, limit)]
+
+    def cascade(self, types_par_departement: Dict[str, List[str]]) -> dict:
+        """
+        Structure compacte département -> type -> noms, envoyée au navigateur pour que les dropdowns de la vue
+        « Trouve ton restaurant » se mettent à jour sans appel au serveur (voir assets/dashboard.js).
+        Chaque nom n'est transmis qu'une fois, dans l'ordre alphabétique de sa forme repliée ; les noms d'un couple
+        (département, type) sont des numéros croissants dans cette liste, codés par différence avec le précédent.
+        :param types_par_departement: Types proposés pour chaque département, dans l'ordre du dropdown.
+        :return: {"noms": [...], "types": [...], "departements": {département: [[type, numéros codés], ...]}}.
+        """
+        types = sorted({type_restaurant for values in types_par_departement.values() for type_restaurant in values})
+        position = {type_restaurant: i for i, type_restaurant in enumerate(types)}
+        departements = {}
+        for departement, values in types_par_departement.items():
+            departements[departement] = [
+                [position[type_restaurant], np.diff(self._scope(departement, type_restaurant), prepend=0).tolist()]
+                for type_restaurant in values
+            ]
+        return {"noms": self.noms.tolist(), "types": types, "departements": departements}
@@ -0,0 +1,303 @@
+import heapq
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from dataclasses import replace
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from .aggregation import GroupedValues, Metrics, compute_metrics, geo_rows
+from .clean_data import _categorize, _normalize_columns, clean_chunk
+from .cleaned_store import COLONNE_INDEX
+from .cube import CountCube
+from .get_data import COLONNES_UTILISEES
+
+# Colonne de partitionnement : les métriques par département sont calculées entièrement dans un lot
+COLONNE_PARTITION = 'Département'
+# Nombre de lots par processus : plusieurs lots par processus compensent les écarts de taille entre départements
+LOTS_PAR_PROCESSUS = 4
+# Colonnes ajoutées par clean_chunk, seules renvoyées par les processus
+COLONNES_CALCULEES = ['nom_complet', 'latitude', 'longitude']
+# Colonnes dont l'ordre de première apparition est conservé par les métriques (voir compute_metrics)
+COLONNES_ORDONNEES = ['Type', 'Nom']
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_WORKERS = 0
+_POOL_LOCK = threading.Lock()
+
+
+def _pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Renvoie le pool de processus, créé au premier nettoyage parallèle puis réutilisé par les rafraîchissements :
+    un processus lancé par spawn met une à deux secondes à importer pandas et l'application.
+    Les processus ne sont pas créés par fork, qui copierait l'état des threads du serveur.
+    :param workers: Nombre de processus.
+    """
+    global _POOL, _POOL_WORKERS
+    with _POOL_LOCK:
+        if _POOL is None or _POOL_WORKERS != workers:
+            if _POOL is not None:
+                _POOL.shutdown()
+            _POOL = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+            _POOL_WORKERS = workers
+        return _POOL
+
+
+def _write_shared(table: pa.Table) -> str:
+    """
+    Écrit une table au format Arrow IPC dans un segment de mémoire partagée : le processus qui le lit
+    accède aux colonnes sans copie ni désérialisation.
+    :param table: La table à transmettre.
+    :return: Le nom du segment, à supprimer par le processus principal (voir _unlink).
+    """
+    sink = pa.MockOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    shm = shared_memory.SharedMemory(create=True, size=sink.size())
+    buffer = pa.py_buffer(shm.buf)
+    writer_sink = pa.FixedSizeBufferWriter(buffer)
+    with pa.ipc.new_stream(writer_sink, table.schema) as writer:
+        writer.write_table(table)
+    # Le segment ne peut être fermé tant qu'un objet Arrow référence sa mémoire
+    del writer_sink, writer, buffer
+    shm.close()
+    return shm.name
+
+
+def _read_shared(shm: shared_memory.SharedMemory) -> pa.Table:
+    """
+    :return: La table d'un segment écrit par _write_shared, dont les colonnes référencent la mémoire partagée.
+    """
+    return pa.ipc.open_stream(shm.buf).read_all()
+
+
+def _unlink(name: str) -> None:
+    """
+    Supprime un segment de mémoire partagée.
+    """
+    try:
+        shm = shared_memory.SharedMemory(name)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+
+def _partitions(column: pa.ChunkedArray, n_lots: int) -> List[np.ndarray]:
+    """
+    Répartit les lignes en lots de départements entiers et de tailles proches : les départements sont pris
+    du plus grand au plus petit, chacun dans le lot le moins rempli. Les lignes sans département forment un groupe.
+    :param column: Colonne des départements des données brutes.
+    :param n_lots: Nombre de lots souhaité.
+    :return: Les numéros des lignes de chaque lot, dans l'ordre d'origine.
+    """
+    array = column.combine_chunks()
+    encoded = array if pa.types.is_dictionary(array.type) else pc.dictionary_encode(array)
+    codes = encoded.indices.fill_null(len(encoded.dictionary)).to_numpy().astype(np.int64)
+    sizes = np.bincount(codes, minlength=len(encoded.dictionary) + 1)
+
+    loads = [(0, lot) for lot in range(max(min(n_lots, np.count_nonzero(sizes)), 1))]
+    lot_of = np.zeros(len(sizes), dtype=np.int64)
+    for group in np.argsort(-sizes, kind='stable'):
+        if sizes[group] == 0:
+            break
+        load, lot = heapq.heappop(loads)
+        lot_of[group] = lot
+        heapq.heappush(loads, (load + sizes[group], lot))
+
+    row_lots = lot_of[codes]
+    order = np.argsort(row_lots, kind='stable')
+    return np.split(order, np.cumsum(np.bincount(row_lots, minlength=len(loads)))[:-1])
+
+
+def _first_rows(column: pd.Series) -> pd.Series:
+    """
+    :return: La première ligne (index) où apparaît chaque valeur renseignée de la colonne, indexée par valeur.
+    """
+    first = column.dropna().drop_duplicates()
+    return pd.Series(first.index.to_numpy(), index=first.to_numpy())
+
+
+def _clean_partition(name: str) -> Tuple[str, Metrics, Dict[str, pd.Series]]:
+    """
+    Nettoie un lot de données brutes et calcule ses métriques, dans un processus du pool.
+    :param name: Segment de mémoire partagée du lot (voir _write_shared) : les COLONNES_UTILISEES et COLONNE_INDEX.
+    :return: Le segment des colonnes calculées par clean_chunk pour les lignes conservées, les métriques du lot
+    (sans geo_rows, recalculés sur les données assemblées) et la première ligne de chaque valeur des COLONNES_ORDONNEES.
+    """
+    shm = shared_memory.SharedMemory(name)
+    try:
+        data = _read_shared(shm).to_pandas()
+    finally:
+        shm.close()
+    data.index = pd.Index(data.pop(COLONNE_INDEX).to_numpy())
+
+    _normalize_columns(data)
+    data = clean_chunk(data)
+    metrics = compute_metrics(data)
+    # Comme les décomptes de compute_metrics, l'ordre des types ne tient compte que des restaurants nommés
+    named = data['Nom'].notna()
+    firsts = {column: _first_rows(data.loc[named, column]) for column in COLONNES_ORDONNEES}
+
+    table = pa.Table.from_pandas(data[COLONNES_CALCULEES].rename_axis(COLONNE_INDEX).reset_index(), preserve_index=False)
+    return _write_shared(table), replace(metrics, geo_rows=None), firsts
+
+
+def _first_order(parts: List[pd.Series]) -> Tuple[np.ndarray, List[np.ndarray]]:
+    """
+    :param parts: La première ligne de chaque valeur, par lot (voir _first_rows).
+    :return: Les valeurs dans leur ordre de première apparition dans les données complètes
+    et, pour chaque lot, la position de chacune de ses valeurs dans ce résultat.
+    """
+    firsts = pd.concat(parts)
+    order = np.argsort(firsts.to_numpy(), kind='stable')
+    codes, labels = pd.factorize(firsts.index[order])
+    positions = np.empty(len(order), dtype=np.int64)
+    positions[order] = codes
+    return np.asarray(labels, dtype=object), np.split(positions, np.cumsum([len(part) for part in parts[:-1]]))
+
+
+def _merge_grouped(parts: List[GroupedValues], remaps: List[np.ndarray], order: np.ndarray, keys: pd.DataFrame,
+                   categories: np.ndarray) -> GroupedValues:
+    """
+    Assemble les valeurs par groupe des lots : les groupes de tous les lots sont remis dans l'ordre order
+    et les codes renvoient aux catégories des données complètes. Un groupe n'appartient qu'à un lot :
+    l'ordre des valeurs de chaque groupe est conservé.
+    :param parts: Les valeurs par groupe de chaque lot.
+    :param remaps: Pour chaque lot, la position de chacune de ses catégories dans categories.
+    :param order: Position, dans les groupes de tous les lots mis bout à bout, de chaque groupe du résultat.
+    :param keys: Les clés des groupes du résultat.
+    :param categories: Les catégories des données complètes.
+    :return: Les valeurs par groupe des données complètes.
+    """
+    codes = np.concatenate([remap[part.codes] for part, remap in zip(parts, remaps)])
+    bases = np.cumsum([0] + [len(part.codes) for part in parts[:-1]])
+    starts = np.concatenate([part.offsets[:-1] + base for part, base in zip(parts, bases)])[order]
+    lengths = np.concatenate([np.diff(part.offsets) for part in parts])[order]
+
+    offsets = np.zeros(len(order) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    codes = codes[np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])]
+    return GroupedValues(keys=keys, offsets=offsets, codes=codes.astype(np.int32), categories=categories, name=parts[0].name)
+
+
+def _merge_metrics(data: pd.DataFrame, parts: List[Metrics], firsts: List[Dict[str, pd.Series]]) -> Metrics:
+    """
+    Assemble les métriques des lots, dans l'ordre et avec les types de compute_metrics sur les données complètes.
+    :param data: Les données nettoyées assemblées.
+    :param parts: Les métriques de chaque lot.
+    :param firsts: La première ligne de chaque valeur des COLONNES_ORDONNEES, par lot.
+    :return: Les métriques des données complètes.
+    """
+    # Nombre de restaurants par type : décomptes additionnés, types dans leur ordre de première apparition
+    types, _ = _first_order([first['Type'] for first in firsts])
+    counts = pd.concat([part.restaurants_par_type for part in parts]).groupby('Type')['Count'].sum()
+    par_type = pd.Series(counts.reindex(types).to_numpy(), index=types).sort_values(ascending=False)
+    restaurants_par_type = pd.DataFrame({'Type': par_type.index.to_numpy(), 'Count': par_type.to_numpy()})
+
+    # Couples (département, type) : chaque département est entièrement dans un lot, il suffit de les trier
+    pairs = pd.concat([part.restaurants_par_departement for part in parts], ignore_index=True)
+    order = np.argsort(pairs['Département'].to_numpy(), kind='stable')
+    restaurants_par_departement = pairs.iloc[order].reset_index(drop=True)
+
+    # Une région peut s'étendre sur plusieurs lots
+    regions = pd.concat([part.restaurants_par_region for part in parts]).groupby('Région')['Count'].sum()
+    restaurants_par_region = pd.DataFrame({'Région': regions.index.to_numpy(dtype=object), 'Count': regions.to_numpy()})
+
+    departements = pd.concat([part.type_departement.keys for part in parts], ignore_index=True)
+    dep_order = np.argsort(departements['Département'].to_numpy(), kind='stable')
+    typ_labels = np.asarray(sorted(set().union(*(part.type_departement.categories for part in parts))), dtype=object)
+    type_departement = _merge_grouped(
+        [part.type_departement for part in parts],
+        [np.searchsorted(typ_labels, part.type_departement.categories) for part in parts],
+        dep_order, departements.iloc[dep_order].reset_index(drop=True), typ_labels,
+    )
+
+    # Les catégories de nom_type d'un lot sont ses noms dans l'ordre de première apparition, comme firsts['Nom']
+    nom_labels, remaps = _first_order([first['Nom'] for first in firsts])
+    nom_type = _merge_grouped([part.nom_type for part in parts], remaps, order,
+                              restaurants_par_departement[['Département', 'Type']], nom_labels)
+
+    return Metrics(
+        restaurants_par_type=restaurants_par_type,
+        restaurants_par_departement=restaurants_par_departement,
+        restaurants_par_region=restaurants_par_region,
+        geo_rows=geo_rows(data),
+        type_departement=type_departement,
+        nom_type=nom_type,
+        cube=CountCube.merge([part.cube for part in parts]),
+    )
+
+
+def parallel_clean_data(path: str, workers: int) -> Tuple[pd.DataFrame, Metrics]:
+    """
+    Nettoie les données brutes et calcule leurs métriques dans un pool de processus. Les lignes sont réparties
+    en lots de départements entiers ; seules les colonnes utilisées sont transmises aux processus, et seules
+    les colonnes calculées leur sont renvoyées, par mémoire partagée (Arrow IPC). Pendant ce temps, le processus
+    principal convertit les données brutes, puis y ajoute les colonnes calculées et assemble les métriques des lots :
+    le résultat est identique à clean_data puis compute_metrics.
+    :param path: Chemin de l'instantané Parquet des données brutes.
+    :param workers: Nombre de processus.
+    :return: Les données nettoyées et leurs métriques.
+    """
+    table = pq.read_table(path)
+    # Les noms de colonnes sont normalisés comme dans clean_data avant de choisir les colonnes transmises
+    header = pd.DataFrame(columns=table.column_names)
+    _normalize_columns(header)
+    names = dict(zip(header.columns, table.column_names))
+    if COLONNE_PARTITION not in names:
+        raise KeyError(f"Colonne de partitionnement manquante : '{COLONNE_PARTITION}'.")
+    n_rows = table.num_rows
+    used = table.select([names[column] for column in COLONNES_UTILISEES if column in names])
+    used = used.append_column(COLONNE_INDEX, pa.array(np.arange(n_rows)))
+
+    inputs, outputs = [], []
+    try:
+        lots = _partitions(table.column(names[COLONNE_PARTITION]), workers * LOTS_PAR_PROCESSUS)
+        for rows in lots:
+            inputs.append(_write_shared(used.take(rows)))
+        del used
+        print(f"Nettoyage parallèle : {len(lots)} lots de départements sur {workers} processus")
+        futures = [_pool(workers).submit(_clean_partition, name) for name in inputs]
+
+        # Conversion des données brutes, comme pd.read_parquet, pendant le nettoyage des lots
+        data = table.to_pandas()
+        del table
+        _normalize_columns(data)
+
+        wait(futures)
+        outputs = [future.result()[0] for future in futures if future.exception() is None]
+        results = [future.result() for future in futures]
+
+        segments = [shared_memory.SharedMemory(name) for name in outputs]
+        try:
+            # Un lot sans ligne conservée a des colonnes de type null : les types sont unifiés
+            computed = pa.concat_tables([_read_shared(shm) for shm in segments], promote_options="permissive")
+            index = computed.column(COLONNE_INDEX).to_numpy()
+            order = np.argsort(index, kind='stable')
+            rows = index[order]
+            computed = computed.select(COLONNES_CALCULEES).take(order)
+            del index
+        finally:
+            for shm in segments:
+                shm.close()
+    finally:
+        for name in inputs + outputs:
+            _unlink(name)
+
+    data = data.take(rows)
+    # Comme après dropna, l'index reste un RangeIndex quand aucune ligne n'a été supprimée
+    if len(rows) == n_rows:
+        data.index = pd.RangeIndex(n_rows)
+    for column in COLONNES_CALCULEES:
+        values = computed.column(column).to_numpy()
+        if values.dtype == object:
+            # Les valeurs manquantes de clean_chunk sont des NaN, des None après Arrow
+            values[pd.isna(values)] = np.nan
+        data[column] = values
+    data = _categorize(data)
+    return data, _merge_metrics(data, [metrics for _, metrics, _ in results], [firsts for _, _, firsts in results])
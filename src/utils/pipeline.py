@@ -0,0 +1,66 @@
+from typing import List, Optional, Tuple
+import pandas as pd
+from config import CONFIG
+from .aggregation import Metrics, compute_metrics
+from .clean_data import clean_data, stream_clean_data
+from .cleaned_store import has_cleaned, input_key, read_cleaned, write_cleaned
+from .get_data import DATA_URL, iter_data, resolve_snapshot
+from .parallel import parallel_clean_data
+from .profiling import StartupReport
+
+# Fichier source des données
+FICHIER_SOURCE = "osm-france-food-service.csv"
+
+
+def load_dataset(report: Optional[StartupReport] = None, columns: Optional[List[str]] = None) -> Tuple[pd.DataFrame, Metrics]:
+    """
+    Charge et nettoie les données, puis calcule les métriques du tableau de bord.
+    Les données nettoyées sont sauvegardées sous la clé de l'instantané brut (voir cleaned_store) :
+    si les données brutes n'ont pas changé depuis le dernier lancement, elles sont relues sans être nettoyées à nouveau.
+    Le mode de lecture suit la configuration ('STREAMING', 'CHUNKSIZE', 'OFFLINE') ; avec 'CLEAN_WORKERS' supérieur à 1,
+    le nettoyage et les métriques sont calculés par lots de départements dans un pool de processus (voir parallel).
+    :param report: Rapport dans lequel mesurer les phases (téléchargement, nettoyage, sauvegarde, métriques).
+    :param columns: Colonnes des données nettoyées à charger (toutes par défaut).
+    :return: Les données nettoyées et leurs métriques.
+    """
+    report = report or StartupReport()
+    with report.phase("téléchargement"):
+        snapshot = resolve_snapshot(FICHIER_SOURCE, DATA_URL, offline=CONFIG['OFFLINE'])
+        key = input_key(snapshot, "streaming" if CONFIG['STREAMING'] else "complet")
+
+    metrics = None
+    if has_cleaned(key):
+        with report.phase("nettoyage") as phase:
+            cleaned_data = read_cleaned(key, columns)
+            phase.rows = len(cleaned_data)
+        print(f"Données brutes inchangées, données nettoyées relues ({key})")
+    else:
+        with report.phase("nettoyage") as phase:
+            if CONFIG['STREAMING']:
+                # Lecture et nettoyage par morceaux de l'instantané à jour : la mémoire utilisée reste bornée
+                chunks = iter_data(FICHIER_SOURCE, chunksize=CONFIG['CHUNKSIZE'], offline=True)
+                cleaned_data, _ = stream_clean_data(chunks)
+            elif CONFIG['CLEAN_WORKERS'] > 1:
+                # Les métriques sont calculées avec le nettoyage, dans les mêmes processus
+                cleaned_data, metrics = parallel_clean_data(snapshot, CONFIG['CLEAN_WORKERS'])
+            else:
+                raw_data = pd.read_parquet(snapshot)
+                print("Données brutes chargées :")
+                print(raw_data.head())
+                cleaned_data = clean_data(raw_data)
+                del raw_data
+            phase.rows = len(cleaned_data)
+        print("\nDonnées nettoyées :")
+        print(cleaned_data.head())
+
+        with report.phase("sauvegarde") as phase:
+            write_cleaned(cleaned_data, key)
+            phase.rows = len(cleaned_data)
+        if columns is not None:
+            cleaned_data = cleaned_data[[column for column in columns if column in cleaned_data.columns]]
+
+    with report.phase("métriques") as phase:
+        phase.rows = len(cleaned_data)
+        if metrics is None:
+            metrics = compute_metrics(cleaned_data)
+        return cleaned_data, metrics
@@ -0,0 +1,133 @@
+from dataclasses import dataclass
+from typing import List, Tuple
+import numpy as np
+import pandas as pd
+
+# Niveau de zoom à partir duquel les restaurants sont affichés individuellement
+POINT_ZOOM = 14
+# Nombre maximal de marqueurs renvoyés pour une vue, quel que soit le nombre de restaurants
+MAX_MARKERS = 2000
+# Nombre de cellules de regroupement par tuile de 512 pixels de la carte (cellules d'environ 64 pixels)
+CELLS_PER_TILE = 8
+
+Bounds = Tuple[float, float, float, float]
+
+
+@dataclass
+class ClusterLevel:
+    """
+    Regroupement des restaurants sur une grille à un niveau de zoom : un élément par cellule non vide.
+    """
+    latitude: np.ndarray
+    longitude: np.ndarray
+    count: np.ndarray
+    first: np.ndarray
+
+
+def _mercator(latitude: np.ndarray, longitude: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Projette des coordonnées en Web Mercator normalisé (x et y entre 0 et 1), la projection des tuiles de la carte.
+    """
+    x = (longitude + 180.0) / 360.0
+    sin = np.sin(np.radians(np.clip(latitude, -85.0511, 85.0511)))
+    y = 0.5 - np.log((1 + sin) / (1 - sin)) / (4 * np.pi)
+    return x, y
+
+
+class PointClusterIndex:
+    """
+    Index multi-résolution des restaurants pour la carte des points.
+    Pour chaque niveau de zoom, les restaurants sont regroupés par cellule d'une grille alignée sur les tuiles
+    de la carte ; une requête ne renvoie que les groupes (ou les restaurants, à fort zoom) visibles dans la vue.
+    """
+
+    def __init__(self, geo_points: pd.DataFrame, max_zoom: int = POINT_ZOOM) -> None:
+        self.latitude = geo_points['latitude'].to_numpy(dtype=np.float64)
+        self.longitude = geo_points['longitude'].to_numpy(dtype=np.float64)
+        self.noms = geo_points['Nom'].to_numpy(dtype=object)
+        self.max_zoom = max_zoom
+
+        x, y = _mercator(self.latitude, self.longitude)
+        self.levels: List[ClusterLevel] = []
+        for zoom in range(max_zoom + 1):
+            size = CELLS_PER_TILE << zoom
+            cells = np.minimum((x * size).astype(np.int64), size - 1) * size + np.minimum((y * size).astype(np.int64), size - 1)
+            _, first, inverse = np.unique(cells, return_index=True, return_inverse=True)
+            count = np.bincount(inverse)
+            self.levels.append(ClusterLevel(
+                latitude=np.bincount(inverse, weights=self.latitude) / count,
+                longitude=np.bincount(inverse, weights=self.longitude) / count,
+                count=count,
+                first=first,
+            ))
+
+    def query(self, bounds: Bounds, zoom: float, max_markers: int = MAX_MARKERS) -> pd.DataFrame:
+        """
+        Renvoie les marqueurs visibles dans une vue de la carte.
+        :param bounds: Emprise de la vue (longitude min, latitude min, longitude max, latitude max).
+        :param zoom: Niveau de zoom de la carte.
+        :param max_markers: Nombre maximal de marqueurs renvoyés.
+        :return: DataFrame (latitude, longitude, count, Nom) : Nom est renseigné pour les restaurants isolés.
+        """
+        lon_min, lat_min, lon_max, lat_max = bounds
+
+        if zoom >= self.max_zoom:
+            visible = np.flatnonzero((self.longitude >= lon_min) & (self.longitude <= lon_max)
+                                     & (self.latitude >= lat_min) & (self.latitude <= lat_max))
+            if len(visible) <= max_markers:
+                return pd.DataFrame({
+                    'latitude': self.latitude[visible],
+                    'longitude': self.longitude[visible],
+                    'count': np.ones(len(visible), dtype=np.int64),
+                    'Nom': self.noms[visible],
+                })
+
+        # On descend vers des grilles plus grossières jusqu'à respecter le nombre maximal de marqueurs
+        level = min(max(int(zoom), 0), self.max_zoom)
+        while True:
+            cluster = self.levels[level]
+            visible = np.flatnonzero((cluster.longitude >= lon_min) & (cluster.longitude <= lon_max)
+                                     & (cluster.latitude >= lat_min) & (cluster.latitude <= lat_max))
+            if len(visible) <= max_markers or level == 0:
+                break
+            level -= 1
+        if len(visible) > max_markers:
+            visible = visible[np.argsort(cluster.count[visible])[::-1][:max_markers]]
+
+        count = cluster.count[visible]
+        return pd.DataFrame({
+            'latitude': cluster.latitude[visible],
+            'longitude': cluster.longitude[visible],
+            'count': count,
+            'Nom': np.where(count == 1, self.noms[cluster.first[visible]], None),
+        })
+
+
+def viewport_bounds(relayout_data: dict, center: Tuple[float, float], zoom: float,
+                    width: int = 1200, height: int = 700) -> Tuple[Bounds, float]:
+    """
+    Calcule l'emprise et le zoom d'une carte mapbox à partir de son relayoutData.
+    Sans coordonnées dérivées fournies par le navigateur, l'emprise est estimée à partir du centre,
+    du zoom et d'une taille de carte en pixels.
+    :param relayout_data: relayoutData du dcc.Graph (peut être None ou incomplet).
+    :param center: Centre (latitude, longitude) par défaut.
+    :param zoom: Zoom par défaut.
+    :param width: Largeur estimée de la carte en pixels.
+    :param height: Hauteur estimée de la carte en pixels.
+    :return: L'emprise (longitude min, latitude min, longitude max, latitude max) et le zoom.
+    """
+    relayout_data = relayout_data or {}
+    zoom = relayout_data.get("mapbox.zoom", zoom)
+    derived = relayout_data.get("mapbox._derived", {}).get("coordinates")
+    if derived:
+        longitudes = [point[0] for point in derived]
+        latitudes = [point[1] for point in derived]
+        return (min(longitudes), min(latitudes), max(longitudes), max(latitudes)), zoom
+
+    lat, lon = center
+    if "mapbox.center" in relayout_data:
+        lat, lon = relayout_data["mapbox.center"]["lat"], relayout_data["mapbox.center"]["lon"]
+    degrees_per_pixel = 360.0 / (512 * 2 ** zoom)
+    half_width = width / 2 * degrees_per_pixel
+    half_height = height / 2 * degrees_per_pixel * np.cos(np.radians(lat))
+    return (lon - half_width, lat - half_height, lon + half_width, lat + half_height), zoom
@@ -0,0 +1,185 @@
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+
+# Unité de ru_maxrss : des kilo-octets sous Linux, des octets sous macOS
+_MAXRSS_UNITE = 1 if sys.platform == "darwin" else 1024
+
+
+def peak_rss() -> int:
+    """
+    :return: Le pic de mémoire résidente (RSS) du processus depuis son démarrage, en octets. Contrairement
+    à tracemalloc, il compte toutes les allocations (tampons Arrow et numpy compris) et ne ralentit pas le code.
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _MAXRSS_UNITE
+
+
+@dataclass
+class StageStats:
+    """
+    Mesures cumulées d'une étape du pipeline : lignes traitées, durée et pic mémoire.
+    peak_bytes est le pic RSS du processus à la fin de l'étape ; growth_bytes, la hausse de ce pic
+    pendant l'étape (0 si l'étape reste sous un pic atteint auparavant).
+    """
+    name: str
+    rows: int = 0
+    seconds: float = 0.0
+    peak_bytes: int = 0
+    growth_bytes: int = 0
+
+    @property
+    def rows_per_second(self) -> float:
+        """
+        :return: Débit de l'étape en lignes par seconde.
+        """
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    @contextmanager
+    def measure(self) -> Iterator["StageStats"]:
+        """
+        Mesure un passage dans l'étape et cumule sa durée et la hausse du pic RSS du processus.
+        """
+        baseline = peak_rss()
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.seconds += time.perf_counter() - start
+            peak = peak_rss()
+            self.peak_bytes = max(self.peak_bytes, peak)
+            self.growth_bytes += peak - baseline
+
+    def __str__(self) -> str:
+        return (f"{self.name} : {self.rows} lignes en {self.seconds:.2f} s ({self.rows_per_second:,.0f} lignes/s), "
+                f"pic RSS {self.peak_bytes / 1e6:.1f} Mo (+{self.growth_bytes / 1e6:.1f} Mo pendant l'étape)")
+
+
+
+# Phases du démarrage, dans l'ordre ; le tableau de bord est prêt quand PHASE_PRETE est terminée
+PHASES_DEMARRAGE = ["import", "application", "téléchargement", "nettoyage", "sauvegarde", "métriques", "publication", "figures"]
+PHASE_PRETE = "publication"
+
+
+@dataclass
+class Phase:
+    """
+    État d'une phase du démarrage : 'pending', 'running', 'done' ou 'failed'.
+    Les instants sont mesurés en secondes depuis le début du démarrage.
+    """
+    name: str
+    status: str = "pending"
+    started_at: Optional[float] = None
+    seconds: Optional[float] = None
+    error: Optional[str] = None
+    rows: Optional[int] = None
+
+
+# Fonctions appelées à la fin de chaque phase, quel que soit le rapport (voir on_phase)
+_PHASE_HOOKS: List[Callable[[Phase], None]] = []
+
+
+def on_phase(hook: Callable[[Phase], None]) -> None:
+    """
+    Enregistre une fonction appelée avec chaque phase terminée ou échouée, de tous les rapports
+    (démarrage et rafraîchissements), par exemple pour exposer leur durée (voir instrumentation.py).
+    :param hook: Fonction prenant la phase en paramètre.
+    """
+    _PHASE_HOOKS.append(hook)
+
+
+def _notify(phase: Phase) -> None:
+    """
+    Transmet une phase terminée aux fonctions enregistrées par on_phase.
+    """
+    for hook in _PHASE_HOOKS:
+        hook(phase)
+
+
+class StartupReport:
+    """
+    Suivi des phases du démarrage (état et durée de chacune), exposé par le point de contrôle /ready.
+    Les phases peuvent s'exécuter dans des threads différents (chargement des données en arrière-plan).
+    """
+
+    def __init__(self, phases: Iterable[str] = PHASES_DEMARRAGE, ready_phase: str = PHASE_PRETE,
+                 started: Optional[float] = None) -> None:
+        """
+        :param phases: Noms des phases attendues, dans l'ordre.
+        :param ready_phase: Phase après laquelle l'application est prête.
+        :param started: Instant du début du démarrage (time.perf_counter), maintenant par défaut.
+        """
+        self.started = started if started is not None else time.perf_counter()
+        self.ready_phase = ready_phase
+        self._lock = threading.Lock()
+        self._phases: Dict[str, Phase] = {name: Phase(name) for name in phases}
+
+    def _get(self, name: str) -> Phase:
+        """
+        :return: La phase demandée, ajoutée à la fin si elle n'était pas attendue.
+        """
+        return self._phases.setdefault(name, Phase(name))
+
+    def record(self, name: str, start: float, end: float) -> None:
+        """
+        Enregistre une phase déjà terminée (par exemple les imports, mesurés avant la création du rapport).
+        :param name: Nom de la phase.
+        :param start: Début de la phase (time.perf_counter).
+        :param end: Fin de la phase (time.perf_counter).
+        """
+        with self._lock:
+            self.started = min(self.started, start)
+            phase = self._get(name)
+            phase.status, phase.started_at, phase.seconds = "done", start - self.started, end - start
+        _notify(phase)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[Phase]:
+        """
+        Mesure une phase : elle passe à 'running' pendant l'exécution du bloc, puis à 'done' ou 'failed'.
+        Le bloc peut renseigner phase.rows, le nombre de lignes traitées.
+        """
+        start = time.perf_counter()
+        with self._lock:
+            phase = self._get(name)
+            phase.status, phase.started_at, phase.seconds, phase.error, phase.rows = "running", start - self.started, None, None, None
+        try:
+            yield phase
+        except BaseException as e:
+            with self._lock:
+                phase.status, phase.seconds, phase.error = "failed", time.perf_counter() - start, repr(e)
+            _notify(phase)
+            raise
+        with self._lock:
+            phase.status, phase.seconds = "done", time.perf_counter() - start
+        _notify(phase)
+
+    @property
+    def ready(self) -> bool:
+        """
+        :return: True si la phase ready_phase est terminée.
+        """
+        return self._phases.get(self.ready_phase, Phase(self.ready_phase)).status == "done"
+
+    def current(self) -> Optional[str]:
+        """
+        :return: Le nom de la phase en cours, ou None.
+        """
+        with self._lock:
+            return next((phase.name for phase in self._phases.values() if phase.status == "running"), None)
+
+    def to_dict(self) -> dict:
+        """
+        :return: L'état du démarrage au format JSON : prêt ou non, durée écoulée et détail des phases.
+        """
+        with self._lock:
+            phases = [dict(vars(phase)) for phase in self._phases.values()]
+        return {"ready": self.ready, "elapsed": time.perf_counter() - self.started, "phases": phases}
+
+
+# Rapport de démarrage unique du processus
+STARTUP = StartupReport()
@@ -0,0 +1,83 @@
+import threading
+import time
+import traceback
+from typing import Callable, Optional, Tuple
+import pandas as pd
+from .aggregation import Metrics
+from .metrics_store import REGISTRY, DatasetVersion, MetricsRegistry
+
+# Chargeur des données nettoyées et de leurs métriques ; None si aucune nouvelle donnée n'est disponible
+Loader = Callable[[], Optional[Tuple[pd.DataFrame, Metrics]]]
+
+
+class RefreshScheduler:
+    """
+    Rafraîchit périodiquement le jeu de données en arrière-plan, hors du chemin des requêtes.
+    À chaque échéance, les données sont rechargées et nettoyées, les métriques, index et figures de la nouvelle
+    version sont construits, puis la version est publiée d'un seul coup dans le registre (voir MetricsRegistry.publish).
+    En cas d'erreur (réseau, données invalides), la version courante reste servie.
+    """
+
+    def __init__(self, interval: float, load: Loader,
+                 prepare: Optional[Callable[[DatasetVersion], None]] = None,
+                 registry: MetricsRegistry = REGISTRY) -> None:
+        """
+        :param interval: Durée entre deux rafraîchissements, en secondes.
+        :param load: Fonction qui charge les données nettoyées et leurs métriques (voir pipeline.load_dataset),
+        ou renvoie None si aucune nouvelle donnée n'est disponible (voir serving.SharedRefresh).
+        :param prepare: Fonction appelée sur la nouvelle version avant sa publication (pré-calcul des figures).
+        :param registry: Registre dans lequel publier les versions.
+        """
+        self.interval = interval
+        self.load = load
+        self.prepare = prepare
+        self.registry = registry
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._refresh_lock = threading.Lock()
+
+    def refresh(self) -> bool:
+        """
+        Recharge les données et publie une nouvelle version si elles ont changé.
+        :return: True si une nouvelle version a été publiée.
+        """
+        with self._refresh_lock:
+            start = time.perf_counter()
+            previous = self.registry.current()
+            try:
+                loaded = self.load()
+                if loaded is None:
+                    return False
+                version = self.registry.publish(*loaded, prepare=self.prepare)
+            except Exception:
+                print("Échec du rafraîchissement des données, la version courante est conservée :")
+                traceback.print_exc()
+                return False
+            published = version is not previous
+            if published:
+                print(f"Nouvelle version des données {version.key} publiée en {time.perf_counter() - start:.1f} s")
+            return published
+
+    def _run(self) -> None:
+        """
+        Boucle du thread : attend l'échéance suivante (ou l'arrêt) puis rafraîchit.
+        """
+        while not self._stop.wait(self.interval):
+            self.refresh()
+
+    def start(self) -> None:
+        """
+        Démarre le thread de rafraîchissement (thread démon : il ne bloque pas l'arrêt du serveur).
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="refresh-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Arrête le thread de rafraîchissement après le rafraîchissement en cours.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
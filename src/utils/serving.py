@@ -0,0 +1,259 @@
+import fcntl
+import gc
+import glob
+import gzip
+import os
+import time
+from typing import IO, Optional, Tuple
+import flask
+import pandas as pd
+import pyarrow as pa
+from config import CONFIG
+from .aggregation import Metrics, compute_metrics
+from .compact import COLONNES_RESIDENTES
+from .dashboard import create_app, warm_up_figures
+from .metrics_store import REGISTRY, DatasetVersion, dataset_key
+from .pipeline import load_dataset
+from .profiling import STARTUP, StartupReport
+from .refresh import RefreshScheduler
+
+# Colonnes des données nettoyées utilisées par les callbacks (index spatial, recherche par nom)
+COLONNES_PARTAGEES = COLONNES_RESIDENTES
+# Types de contenu compressés : réponses des callbacks (figures), pages et ressources textuelles
+TYPES_COMPRESSES = {'application/json', 'text/html', 'text/css', 'text/javascript', 'application/javascript'}
+# Nombre de fichiers de données partagées conservés (la version servie et la précédente)
+FICHIERS_PARTAGES_A_CONSERVER = 2
+# Fichier qui désigne le fichier de données partagées de la dernière version publiée
+FICHIER_VERSION_COURANTE = "current"
+# Verrou détenu par le seul processus serveur qui recharge les données (voir SharedRefresh)
+FICHIER_VERROU_RAFRAICHISSEMENT = "refresh.lock"
+# Intervalle, en secondes, auquel les autres processus serveurs vérifient si une nouvelle version a été publiée
+INTERVALLE_SUIVI = 30
+
+
+def share_dataframe(data: pd.DataFrame, directory: str = None) -> pd.DataFrame:
+    """
+    Écrit les colonnes utilisées des données nettoyées dans un fichier Arrow puis les relit en mémoire projetée.
+    Les colonnes du DataFrame renvoyé pointent directement dans le fichier projeté (types pyarrow, sans objets Python) :
+    les processus serveurs partagent donc les mêmes pages mémoire au lieu d'avoir chacun leur copie.
+    Le fichier est nommé d'après le contenu des colonnes partagées (voir dataset_key) : un fichier existant
+    du même nom contient exactement ces données et est réutilisé tel quel.
+    Seules les données sont partagées : les métriques et les index restent des objets Python propres à chaque processus.
+    :param data: DataFrame nettoyé.
+    :param directory: Dossier du fichier (CONFIG['SHARED_DATA_DIR'] par défaut).
+    :return: Le DataFrame adossé au fichier projeté.
+    """
+    directory = directory or CONFIG['SHARED_DATA_DIR']
+    os.makedirs(directory, exist_ok=True)
+    columns = [column for column in COLONNES_PARTAGEES if column in data.columns]
+    path = _shared_path(directory, dataset_key(data[columns]))
+
+    if os.path.exists(path):
+        # Rajeunit le fichier réutilisé pour qu'il ne soit pas supprimé comme une ancienne version (voir _prune_shared)
+        os.utime(path)
+    else:
+        table = pa.Table.from_pandas(data[columns], preserve_index=False)
+        # Chaque processus écrit son propre fichier temporaire : plusieurs processus peuvent rafraîchir en même temps
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+        _prune_shared(directory)
+    _set_current(directory, path)
+
+    return _map_shared(path)
+
+
+def _shared_path(directory: str, key: str) -> str:
+    """
+    :return: Le chemin du fichier de données partagées d'une version.
+    """
+    return os.path.join(directory, f"cleaned-{key}.arrow")
+
+
+def _map_shared(path: str) -> pd.DataFrame:
+    """
+    :return: Le DataFrame adossé au fichier de données partagées projeté en mémoire (types pyarrow).
+    """
+    table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def _prune_shared(directory: str) -> None:
+    """
+    Supprime les fichiers de données partagées les plus anciens (les processus qui les projettent encore
+    gardent leur accès : le fichier n'est réellement effacé qu'à la fermeture de la projection).
+    """
+    paths = sorted(glob.glob(os.path.join(directory, "cleaned-*.arrow")), key=os.path.getmtime, reverse=True)
+    for path in paths[FICHIERS_PARTAGES_A_CONSERVER:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _set_current(directory: str, path: str) -> None:
+    """
+    Désigne un fichier de données partagées comme celui de la dernière version publiée (écriture atomique).
+    """
+    tmp_path = os.path.join(directory, f"{FICHIER_VERSION_COURANTE}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w') as file:
+        file.write(os.path.basename(path))
+    os.replace(tmp_path, os.path.join(directory, FICHIER_VERSION_COURANTE))
+
+
+def _current_shared(directory: str) -> Optional[str]:
+    """
+    :return: Le chemin du fichier de données partagées de la dernière version publiée, ou None s'il n'y en a pas.
+    """
+    try:
+        with open(os.path.join(directory, FICHIER_VERSION_COURANTE)) as file:
+            path = os.path.join(directory, file.read().strip())
+    except OSError:
+        return None
+    return path if os.path.exists(path) else None
+
+
+def load_shared_dataset(report: Optional[StartupReport] = None, directory: str = None) -> Tuple[pd.DataFrame, Metrics]:
+    """
+    Charge les données (voir pipeline.load_dataset) et les remplace par leur version projetée en mémoire.
+    :param report: Rapport dans lequel mesurer les phases du chargement.
+    :param directory: Dossier des données partagées (CONFIG['SHARED_DATA_DIR'] par défaut).
+    :return: Les données nettoyées partagées et leurs métriques.
+    """
+    data, metrics = load_dataset(report, COLONNES_PARTAGEES)
+    return share_dataframe(data, directory), metrics
+
+
+def warm_up_all(version: DatasetVersion) -> None:
+    """
+    Pré-calcule toutes les figures d'une version, treemaps compris, ainsi que ses index.
+    """
+    warm_up_figures(version, treemaps=True)
+
+
+class SharedRefresh:
+    """
+    Rafraîchissement des données d'un processus serveur en mode production (voir start_refresh).
+    Un seul processus, celui qui obtient le verrou FICHIER_VERROU_RAFRAICHISSEMENT, télécharge et nettoie les données
+    toutes les CONFIG['REFRESH_INTERVAL'] secondes, puis écrit le fichier partagé et le désigne comme version courante.
+    Les autres processus ne téléchargent ni ne nettoient rien : ils projettent ce fichier et en calculent les métriques.
+    Si le processus qui détient le verrou s'arrête, le verrou est libéré et un autre processus prend le relais.
+    """
+
+    def __init__(self, interval: float, directory: str = None) -> None:
+        """
+        :param interval: Durée entre deux rechargements des données, en secondes.
+        :param directory: Dossier des données partagées (CONFIG['SHARED_DATA_DIR'] par défaut).
+        """
+        self.interval = interval
+        self.directory = directory or CONFIG['SHARED_DATA_DIR']
+        self._attempted_at = 0.0
+        self._lock: Optional[IO] = None
+
+    def _leader(self) -> bool:
+        """
+        :return: True si ce processus détient le verrou de rechargement (il le garde ensuite jusqu'à son arrêt).
+        """
+        if self._lock is None:
+            os.makedirs(self.directory, exist_ok=True)
+            lock = open(os.path.join(self.directory, FICHIER_VERROU_RAFRAICHISSEMENT), 'a')
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock.close()
+                return False
+            self._lock = lock
+        return True
+
+    def _due(self) -> bool:
+        """
+        :return: True si la dernière version publiée et la dernière tentative de rechargement datent de plus d'un intervalle.
+        """
+        try:
+            published = os.path.getmtime(os.path.join(self.directory, FICHIER_VERSION_COURANTE))
+        except OSError:
+            published = 0.0
+        return time.time() - max(published, self._attempted_at) >= self.interval
+
+    def __call__(self) -> Optional[Tuple[pd.DataFrame, Metrics]]:
+        """
+        Chargeur de RefreshScheduler : recharge les données si ce processus est celui qui rafraîchit et que l'échéance
+        est passée, puis renvoie la dernière version publiée dans le dossier partagé si elle n'est pas déjà servie.
+        :return: Les données partagées et leurs métriques, ou None si la version courante est déjà la dernière.
+        """
+        loaded = None
+        if self._leader() and self._due():
+            self._attempted_at = time.time()
+            loaded = load_shared_dataset(directory=self.directory)
+
+        path = _current_shared(self.directory)
+        current = REGISTRY.current()
+        if path is None or (current is not None and path == _shared_path(self.directory, current.key)):
+            return None
+        if loaded is not None:
+            return loaded
+        data = _map_shared(path)
+        return data, compute_metrics(data)
+
+
+def start_refresh() -> None:
+    """
+    Démarre le rafraîchissement des données en arrière-plan dans un processus serveur (voir gunicorn.conf.py).
+    Un seul processus recharge les données ; les autres vérifient toutes les INTERVALLE_SUIVI secondes
+    si une nouvelle version a été publiée dans le dossier partagé (voir SharedRefresh).
+    Chaque processus reconstruit ses métriques et ses index, mais les données nettoyées restent partagées via le fichier projeté.
+    """
+    if CONFIG['REFRESH_INTERVAL']:
+        interval = CONFIG['REFRESH_INTERVAL']
+        RefreshScheduler(min(interval, INTERVALLE_SUIVI), SharedRefresh(interval), prepare=warm_up_all).start()
+
+
+def enable_compression(server: flask.Flask, min_size: int = None) -> None:
+    """
+    Compresse en gzip les réponses textuelles (notamment les figures renvoyées par les callbacks)
+    quand le navigateur l'accepte.
+    :param server: Le serveur Flask de l'application.
+    :param min_size: Taille minimale en octets d'une réponse compressée (CONFIG['COMPRESSION_MIN_SIZE'] par défaut).
+    """
+    min_size = min_size if min_size is not None else CONFIG['COMPRESSION_MIN_SIZE']
+
+    @server.after_request
+    def compress_response(response: flask.Response) -> flask.Response:
+        """
+        Remplace le corps de la réponse par sa version gzip si elle est compressible.
+        """
+        if (response.direct_passthrough or response.status_code != 200
+                or response.mimetype not in TYPES_COMPRESSES or 'Content-Encoding' in response.headers
+                or flask.request.accept_encodings['gzip'] <= 0):
+            return response
+        body = response.get_data()
+        if len(body) < min_size:
+            return response
+        response.set_data(gzip.compress(body, compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+        response.vary.add('Accept-Encoding')
+        return response
+
+
+def create_production_server() -> flask.Flask:
+    """
+    Prépare le tableau de bord pour un serveur WSGI à plusieurs processus (voir wsgi.py et gunicorn.conf.py).
+    Tout le travail est fait une seule fois, dans le processus principal, avant la création des processus serveurs :
+    chargement et nettoyage des données, métriques, index, figures. Les données nettoyées sont projetées
+    en mémoire depuis un fichier Arrow et les objets construits sont gelés (gc.freeze) pour que le ramasse-miettes
+    ne les modifie pas : les processus serveurs partagent ainsi ces pages au lieu de les copier.
+    Les métriques et les index ne sont partagés que par copie sur écriture : après un rafraîchissement,
+    chaque processus en construit sa propre copie (voir SharedRefresh).
+    :return: Le serveur Flask de l'application.
+    """
+    app = create_app(*load_shared_dataset(STARTUP))
+    with STARTUP.phase("figures"):
+        warm_up_all(REGISTRY.current())
+    if CONFIG['COMPRESSION']:
+        enable_compression(app.server)
+
+    gc.collect()
+    gc.freeze()
+    return app.server
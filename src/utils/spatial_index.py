@@ -0,0 +1,174 @@
+from typing import Optional, Tuple
+import numpy as np
+import pandas as pd
+from .compact import coordinates
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = np.pi * EARTH_RADIUS_KM / 180
+# Taille des cellules de la grille, en degrés (environ 2 km)
+CELL_DEGREES = 0.02
+
+# Colonnes renvoyées par les requêtes de proximité
+COLONNES_RESULTAT = ['Nom', 'Type', 'Commune', 'Département', 'latitude', 'longitude']
+
+
+def haversine_km(lat: float, lon: float, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """
+    Calcule la distance orthodromique entre un point et un ensemble de points (formule de haversine, vectorisée).
+    :param lat: Latitude du point de référence, en degrés.
+    :param lon: Longitude du point de référence, en degrés.
+    :param latitudes: Latitudes des points, en degrés.
+    :param longitudes: Longitudes des points, en degrés.
+    :return: Les distances en kilomètres.
+    """
+    lat1 = np.radians(lat)
+    lat2 = np.radians(latitudes)
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin(np.radians(longitudes - lon) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class SpatialIndex:
+    """
+    Index spatial des restaurants nettoyés : grille régulière en latitude/longitude dont les cellules sont
+    numérotées ligne par ligne. Les restaurants sont triés par cellule, si bien que les cellules d'une même
+    ligne de la grille forment une plage contiguë trouvée par recherche dichotomique.
+    Un second ordre, par (type, cellule), permet aux requêtes filtrées par type de ne parcourir que ce type.
+    """
+
+    def __init__(self, data: pd.DataFrame, cell_degrees: float = CELL_DEGREES) -> None:
+        self.data = data
+        self.cell_degrees = cell_degrees
+        latitude = coordinates(data['latitude'])
+        longitude = coordinates(data['longitude'])
+        types, self.types = pd.factorize(data['Type'])
+
+        self.lat_min = latitude.min() if len(latitude) else 0.0
+        self.lon_min = longitude.min() if len(longitude) else 0.0
+        self.n_cols = int((longitude.max() - self.lon_min) // cell_degrees) + 1 if len(longitude) else 1
+        self.n_rows = int((latitude.max() - self.lat_min) // cell_degrees) + 1 if len(latitude) else 1
+
+        cells = self._row(latitude) * self.n_cols + self._col(longitude)
+        self.order = np.argsort(cells, kind='stable')
+        self.cells = cells[self.order]
+        self.latitude = latitude[self.order]
+        self.longitude = longitude[self.order]
+        self.type_codes = types[self.order]
+
+        n_cells = self.n_rows * self.n_cols
+        typed_cells = self.type_codes.astype(np.int64) * n_cells + self.cells
+        self.typed_order = np.argsort(typed_cells, kind='stable')
+        self.typed_cells = typed_cells[self.typed_order]
+
+    def _row(self, latitude: np.ndarray) -> np.ndarray:
+        """
+        :return: Les lignes de la grille des latitudes.
+        """
+        return ((latitude - self.lat_min) // self.cell_degrees).astype(np.int64)
+
+    def _col(self, longitude: np.ndarray) -> np.ndarray:
+        """
+        :return: Les colonnes de la grille des longitudes.
+        """
+        return ((longitude - self.lon_min) // self.cell_degrees).astype(np.int64)
+
+    def _candidates(self, lat: float, lon: float, radius_km: float, code: Optional[int]) -> np.ndarray:
+        """
+        :param code: Code du type recherché (voir _type_code), None pour tous les types.
+        :return: Les positions (dans l'ordre de l'index) des restaurants des cellules qui couvrent le cercle.
+        """
+        dlat = radius_km / KM_PER_DEGREE
+        cos = np.cos(np.radians(min(abs(lat) + dlat, 89.9)))
+        dlon = radius_km / (KM_PER_DEGREE * cos)
+
+        row_start = max(int(self._row(np.float64(lat - dlat))), 0)
+        row_end = min(int(self._row(np.float64(lat + dlat))), self.n_rows - 1)
+        col_start = max(int(self._col(np.float64(lon - dlon))), 0)
+        col_end = min(int(self._col(np.float64(lon + dlon))), self.n_cols - 1)
+        if row_start > row_end or col_start > col_end:
+            return np.empty(0, dtype=np.int64)
+
+        if code is None:
+            cells, rows = self.cells, np.arange(row_start, row_end + 1, dtype=np.int64) * self.n_cols
+        else:
+            cells = self.typed_cells
+            rows = code * self.n_rows * self.n_cols + np.arange(row_start, row_end + 1, dtype=np.int64) * self.n_cols
+        starts = np.searchsorted(cells, rows + col_start, side='left')
+        ends = np.searchsorted(cells, rows + col_end, side='right')
+        lengths = ends - starts
+        if lengths.sum() == 0:
+            return np.empty(0, dtype=np.int64)
+        # Concatène les plages [start, end) de chaque ligne sans boucle Python
+        offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+        positions = np.arange(lengths.sum(), dtype=np.int64) + offsets
+        return positions if code is None else self.typed_order[positions]
+
+    def _type_code(self, type_restaurant: Optional[str]) -> Optional[int]:
+        """
+        :return: Le code du type recherché, -2 pour un type absent des données, None pour tous les types.
+        """
+        if type_restaurant is None:
+            return None
+        code = self.types.get_indexer([type_restaurant])[0]
+        return int(code) if code >= 0 else -2
+
+    def radius_query(self, lat: float, lon: float, radius_km: float,
+                     type_restaurant: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Recherche les restaurants situés à moins de radius_km d'un point.
+        :param lat: Latitude du point.
+        :param lon: Longitude du point.
+        :param radius_km: Rayon de recherche en kilomètres.
+        :param type_restaurant: Type de restaurant recherché (tous les types si None).
+        :return: Les positions des restaurants dans le DataFrame indexé et leurs distances, triées par distance croissante.
+        """
+        candidates = self._candidates(lat, lon, radius_km, self._type_code(type_restaurant))
+        distances = haversine_km(lat, lon, self.latitude[candidates], self.longitude[candidates])
+        inside = distances <= radius_km
+        candidates, distances = candidates[inside], distances[inside]
+        order = np.argsort(distances, kind='stable')
+        return self.order[candidates[order]], distances[order]
+
+    def knn_query(self, lat: float, lon: float, k: int,
+                  type_restaurant: Optional[str] = None, start_km: float = 1.0) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Recherche les k restaurants les plus proches d'un point.
+        Le rayon de recherche est doublé jusqu'à contenir au moins k restaurants : tous les restaurants plus
+        proches que le k-ième sont alors dans le cercle, ce qui rend le résultat exact.
+        :param lat: Latitude du point.
+        :param lon: Longitude du point.
+        :param k: Nombre de restaurants recherchés.
+        :param type_restaurant: Type de restaurant recherché (tous les types si None).
+        :param start_km: Rayon de recherche initial en kilomètres.
+        :return: Les positions des restaurants dans le DataFrame indexé et leurs distances, triées par distance croissante.
+        """
+        radius = start_km
+        while True:
+            positions, distances = self.radius_query(lat, lon, radius, type_restaurant)
+            # Au-delà d'une demi-circonférence terrestre, le cercle contient tous les restaurants
+            if len(positions) >= k or radius >= np.pi * EARTH_RADIUS_KM:
+                return positions[:k], distances[:k]
+            radius *= 2
+
+    def _frame(self, positions: np.ndarray, distances: np.ndarray) -> pd.DataFrame:
+        """
+        :return: Les lignes du DataFrame indexé aux positions données, avec leur distance.
+        """
+        columns = [column for column in COLONNES_RESULTAT if column in self.data.columns]
+        result = self.data.iloc[positions][columns].reset_index(drop=True)
+        for column in ('latitude', 'longitude'):
+            result[column] = coordinates(result[column])
+        result['distance_km'] = distances
+        return result
+
+    def within(self, lat: float, lon: float, radius_km: float, type_restaurant: Optional[str] = None) -> pd.DataFrame:
+        """
+        :return: Les restaurants à moins de radius_km du point, triés par distance (voir radius_query).
+        """
+        return self._frame(*self.radius_query(lat, lon, radius_km, type_restaurant))
+
+    def nearest(self, lat: float, lon: float, k: int, type_restaurant: Optional[str] = None) -> pd.DataFrame:
+        """
+        :return: Les k restaurants les plus proches du point, triés par distance (voir knn_query).
+        """
+        return self._frame(*self.knn_query(lat, lon, k, type_restaurant))
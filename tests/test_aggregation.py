@@ -0,0 +1,51 @@
+"""
+Tests du moteur d'agrégation (compute_metrics) et du cube de décomptes des filtres croisés.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.bench_prepare_metrics import normalize_reference, prepare_metrics_reference
+from benchmarks.synthetic import generate_food_service
+from src.utils.aggregation import compute_metrics
+from src.utils.clean_data import clean_data
+
+LIGNES = 5_000
+
+
+@pytest.fixture(scope="module")
+def data() -> pd.DataFrame:
+    return clean_data(generate_food_service(LIGNES))
+
+
+# La référence regroupe des catégories sans préciser observed, comme l'ancienne implémentation
+@pytest.mark.filterwarnings("ignore:The default of observed=False:FutureWarning")
+@pytest.mark.parametrize("missing", [[], ['Type', 'Département', 'Région']])
+def test_compute_metrics_matches_reference(missing):
+    raw = generate_food_service(LIGNES)
+    rng = np.random.default_rng(0)
+    for column in missing:
+        raw.loc[rng.random(len(raw)) < 0.05, column] = None
+    data = clean_data(raw)
+    assert compute_metrics(data).to_dict(data) == normalize_reference(prepare_metrics_reference(data), data)
+
+
+def _non_zero(counts: pd.DataFrame, dimensions: list) -> pd.DataFrame:
+    counts = counts[counts['Count'] > 0]
+    return counts.sort_values(dimensions).reset_index(drop=True)[dimensions + ['Count']]
+
+
+def test_cube_rollup_matches_metrics(data):
+    # Les données synthétiques comptent des restaurants sans nom : les décomptes portent sur les autres
+    assert data['Nom'].isna().any()
+    metrics = compute_metrics(data)
+    cube = metrics.cube
+
+    for dimensions, aggregate in [(['Type'], metrics.restaurants_par_type),
+                                  (['Région'], metrics.restaurants_par_region),
+                                  (['Département', 'Type'], metrics.restaurants_par_departement)]:
+        rollup = cube.rollup(dimensions, {})
+        pd.testing.assert_frame_equal(_non_zero(rollup, dimensions), _non_zero(aggregate, dimensions),
+                                      check_dtype=False)
+
+    assert cube.total() == data['Nom'].notna().sum()
@@ -0,0 +1,96 @@
+"""
+Tests des routes d'export (/api/...) par le client de test de Flask, sur un registre propre à chaque test.
+"""
+import csv
+import gzip
+import io
+import dash
+import pytest
+
+from benchmarks.synthetic import generate_food_service
+from src.utils import export_api
+from src.utils.aggregation import compute_metrics
+from src.utils.clean_data import clean_data
+from src.utils.metrics_store import MetricsRegistry
+
+LIGNES = 3_000
+
+
+@pytest.fixture(scope="module")
+def data():
+    return clean_data(generate_food_service(LIGNES))
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(export_api, "REGISTRY", registry)
+    return registry
+
+
+@pytest.fixture
+def client(registry):
+    app = dash.Dash(__name__)
+    app.layout = dash.html.Div()
+    export_api.register_export_api(app)
+    return app.server.test_client()
+
+
+@pytest.fixture
+def version(registry, data):
+    return registry.publish(data, compute_metrics(data))
+
+
+def test_unavailable_before_load(client):
+    response = client.get("/api/counts?by=Type")
+    assert response.status_code == 503
+    assert response.get_json() == {"error": "Données en cours de chargement."}
+
+
+def test_weak_etag_revalidation(client, version):
+    response = client.get("/api/metrics/restaurants_par_region")
+    assert response.status_code == 200
+    assert response.headers["ETag"] == f'W/"{version.key}"'
+
+    revalidated = client.get("/api/metrics/restaurants_par_region", headers={"If-None-Match": response.headers["ETag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b""
+    assert revalidated.headers["X-Dataset-Version"] == version.key
+
+
+def test_gzip_negotiation(client, version):
+    plain = client.get("/api/restaurants?format=csv")
+    assert "Content-Encoding" not in plain.headers
+
+    compressed = client.get("/api/restaurants?format=csv", headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(compressed.data) == plain.data
+
+    refused = client.get("/api/restaurants?format=csv", headers={"Accept-Encoding": "gzip;q=0, identity"})
+    assert "Content-Encoding" not in refused.headers
+    assert refused.data == plain.data
+
+
+@pytest.mark.parametrize("query", ["offset=-1", "limit=-5", "offset=-1&limit=-1"])
+def test_negative_pagination(client, version, query):
+    response = client.get(f"/api/restaurants?{query}")
+    assert response.status_code == 400
+
+
+def test_csv_export(client, version, monkeypatch):
+    # Plusieurs morceaux : l'en-tête n'est écrit qu'une fois
+    monkeypatch.setattr(export_api, "LIGNES_PAR_MORCEAU", 7)
+    response = client.get("/api/restaurants?format=csv&region=Bretagne&limit=50")
+    assert response.mimetype == "text/csv"
+    assert response.headers["Content-Disposition"] == f'attachment; filename="restaurants-{version.key}.csv"'
+    rows = list(csv.reader(io.StringIO(response.data.decode("utf-8"))))
+    assert rows[0] == export_api.COLONNES_EXPORT
+    assert len(rows) - 1 == int(response.headers["X-Row-Count"]) == 50
+    assert {row[4] for row in rows[1:]} == {"Bretagne"}
+
+
+def test_counts_ignore_repeated_dimension(client, version):
+    response = client.get("/api/counts?by=Type&by=Type")
+    assert response.status_code == 200
+    assert response.get_json() == client.get("/api/counts?by=Type").get_json()
+    assert client.get("/api/counts?by=Inconnue").status_code == 400
@@ -0,0 +1,42 @@
+"""
+Tests du cache de figures : borne en octets et geojson gardé une seule fois pour toutes les cartes.
+"""
+import plotly.graph_objects as go
+
+from src.utils.figure_cache import FigureCache
+
+GEOJSON = {"type": "FeatureCollection", "features": [
+    {"type": "Feature", "id": str(i), "properties": {"nom": f"Département {i}"},
+     "geometry": {"type": "Polygon", "coordinates": [[[i, 0.0], [i + 1, 0.0], [i + 1, 1.0], [i, 0.0]]]}}
+    for i in range(200)
+]}
+
+
+def _carte(values: list) -> go.Figure:
+    return go.Figure(go.Choroplethmapbox(geojson=GEOJSON, locations=[str(i) for i in range(len(values))], z=values))
+
+
+def test_geojson_is_stored_once():
+    cache = FigureCache()
+    first = cache.get("carte", ("moyen",), "v1", lambda: _carte([1, 2, 3]))
+    alone = cache.stats()["bytes"]
+    second = cache.get("carte", ("moyen", "Région"), "v1", lambda: _carte([4, 5]))
+
+    assert first["data"][0]["geojson"] is second["data"][0]["geojson"]
+    # La seconde carte n'ajoute que sa propre taille, bien inférieure à celle du geojson
+    assert cache.stats()["bytes"] - alone < alone / 4
+
+    cache.evict_version("v1")
+    assert cache.stats() == {"hits": 0, "misses": 2, "coalesced": 0, "size": 0, "bytes": 0}
+
+
+def test_bounded_by_bytes():
+    cache = FigureCache(maxsize=256, max_bytes=40_000)
+    for i in range(20):
+        cache.get("region", (str(i),), "v1", lambda: go.Figure(go.Bar(x=list(range(100)), y=list(range(100)))))
+    stats = cache.stats()
+    assert 2 <= stats["size"] < 20
+    assert stats["bytes"] <= 40_000
+    # Les figures les plus anciennes sont retirées en premier
+    cache.get("region", ("19",), "v1", lambda: go.Figure())
+    assert cache.stats()["hits"] == 1
@@ -0,0 +1,34 @@
+"""
+Tests de la régénération des frontières simplifiées (data/geometry), dans un dossier temporaire.
+"""
+import json
+import os
+import pytest
+
+from src.utils import geometry
+
+
+@pytest.fixture
+def geometry_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(geometry, "GEOMETRY_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_preprocess_writes_every_level(geometry_dir):
+    sizes = geometry.preprocess_geometry()
+    assert sorted(os.listdir(geometry_dir)) == sorted(f"departements-{niveau}.geojson" for niveau in geometry.NIVEAUX)
+    for niveau, size in sizes.items():
+        path = geometry.geometry_path(niveau)
+        assert os.path.getsize(path) == size
+        with open(path, encoding='utf-8') as f:
+            assert json.load(f)["type"] == "FeatureCollection"
+
+
+def test_failed_simplification_leaves_no_temporary_file(geometry_dir, monkeypatch):
+    def failing(*args, **kwargs):
+        raise MemoryError
+
+    monkeypatch.setattr(geometry, "simplify_geojson", failing)
+    with pytest.raises(MemoryError):
+        geometry.preprocess_geometry()
+    assert os.listdir(geometry_dir) == []
@@ -0,0 +1,95 @@
+"""
+Tests du cache d'instantanés de get_data, contre un serveur HTTP local servant un export CSV synthétique
+(voir benchmarks.synthetic.http_stand_in) : téléchargement, revalidation 304, mode hors ligne et serveur injoignable.
+"""
+import importlib
+import os
+import time
+import urllib.error
+import pyarrow.parquet as pq
+import pytest
+
+from benchmarks.synthetic import http_stand_in, write_food_service_csv
+from src.utils.get_data import latest_snapshot, resolve_snapshot
+
+# Le module lui-même (src.utils réexporte la fonction get_data sous le même nom)
+module = importlib.import_module("src.utils.get_data")
+
+FICHIER = "osm-france-food-service.csv"
+LIGNES = 2_000
+
+
+def _snapshots(cache_dir: str) -> list:
+    return sorted(f for f in os.listdir(cache_dir) if f.endswith(".parquet"))
+
+
+@pytest.fixture
+def served(tmp_path):
+    """
+    :return: L'URL de l'export servi, le chemin du CSV et le dossier des instantanés.
+    """
+    csv_path = write_food_service_csv(str(tmp_path / FICHIER), LIGNES)
+    cache_dir = str(tmp_path / "snapshots")
+    with http_stand_in(str(tmp_path)) as root:
+        yield f"{root}/{FICHIER}", csv_path, cache_dir
+
+
+def test_download_then_revalidate(served):
+    url, csv_path, cache_dir = served
+    snapshot = resolve_snapshot(FICHIER, url, cache_dir=cache_dir)
+    assert pq.read_table(snapshot).num_rows == LIGNES
+
+    # Export inchangé : le serveur répond 304 et l'instantané existant est réutilisé
+    assert resolve_snapshot(FICHIER, url, cache_dir=cache_dir) == snapshot
+    assert _snapshots(cache_dir) == [os.path.basename(snapshot)]
+
+    # Export modifié (Last-Modified plus récent) : un nouvel instantané est téléchargé
+    later = time.time() + 10
+    os.utime(csv_path, (later, later))
+    refreshed = resolve_snapshot(FICHIER, url, cache_dir=cache_dir)
+    assert refreshed != snapshot
+    assert latest_snapshot(FICHIER, cache_dir) == refreshed
+
+
+def test_offline(served):
+    url, _, cache_dir = served
+    with pytest.raises(FileNotFoundError):
+        resolve_snapshot(FICHIER, offline=True, cache_dir=cache_dir)
+    snapshot = resolve_snapshot(FICHIER, url, cache_dir=cache_dir)
+    assert resolve_snapshot(FICHIER, offline=True, cache_dir=cache_dir) == snapshot
+
+
+def test_unreachable_server_falls_back_to_snapshot(served):
+    url, _, cache_dir = served
+    # Aucun serveur n'écoute sur le port 9 de la machine locale
+    unreachable = "http://127.0.0.1:9/" + FICHIER
+    with pytest.raises(urllib.error.URLError):
+        resolve_snapshot(FICHIER, unreachable, cache_dir=cache_dir)
+    snapshot = resolve_snapshot(FICHIER, url, cache_dir=cache_dir)
+    assert resolve_snapshot(FICHIER, unreachable, cache_dir=cache_dir) == snapshot
+
+
+def test_failed_conversion_leaves_no_snapshot(served, monkeypatch):
+    url, csv_path, cache_dir = served
+    snapshot = resolve_snapshot(FICHIER, url, cache_dir=cache_dir)
+    later = time.time() + 10
+    os.utime(csv_path, (later, later))
+
+    # La conversion échoue après le premier morceau écrit
+    monkeypatch.setattr(module, "CHUNKSIZE", LIGNES // 4)
+    class FailingWriter(pq.ParquetWriter):
+        written = 0
+
+        def write_table(self, table, *args, **kwargs):
+            FailingWriter.written += 1
+            if FailingWriter.written > 1:
+                raise OSError("disque plein")
+            super().write_table(table, *args, **kwargs)
+
+    monkeypatch.setattr(module.pq, "ParquetWriter", FailingWriter)
+    with pytest.raises(OSError):
+        resolve_snapshot(FICHIER, url, cache_dir=cache_dir)
+
+    assert _snapshots(cache_dir) == [os.path.basename(snapshot)]
+    assert not [f for f in os.listdir(cache_dir) if f.endswith(".tmp")]
+    assert latest_snapshot(FICHIER, cache_dir) == snapshot
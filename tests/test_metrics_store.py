@@ -0,0 +1,72 @@
+"""
+Tests du registre des versions : remplacement à chaud, libération des anciennes versions et clé de version.
+"""
+import gc
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import generate_food_service
+from src.utils.aggregation import compute_metrics
+from src.utils.clean_data import clean_data
+from src.utils.compact import compact_frame
+from src.utils.metrics_store import MetricsRegistry, dataset_key
+
+LIGNES = 2_000
+
+
+@pytest.fixture(scope="module")
+def datasets() -> list:
+    """
+    :return: Trois jeux de données nettoyés distincts.
+    """
+    return [clean_data(generate_food_service(LIGNES, seed=seed)) for seed in range(3)]
+
+
+def _publish(registry: MetricsRegistry, data: pd.DataFrame):
+    return registry.publish(data, compute_metrics(data))
+
+
+def test_pinned_version_survives_hot_swap(datasets):
+    registry = MetricsRegistry()
+    released = []
+    registry.on_release(released.append)
+
+    # Un callback en cours garde la version qu'il a obtenue
+    pinned = _publish(registry, datasets[0])
+    key, rows = pinned.key, len(pinned.data)
+    _publish(registry, datasets[1])
+    current = _publish(registry, datasets[2])
+
+    assert registry.current() is current
+    assert registry.get(key) is pinned
+    assert len(pinned.data) == rows and pinned.metrics.cube.total() > 0
+    assert key in {version.key for version in registry.versions()}
+    assert released == []
+
+    # Sans référence, la version sort du registre et les fonctions de libération sont appelées
+    del pinned
+    gc.collect()
+    assert key not in {version.key for version in registry.versions()}
+    assert released == [key]
+    assert registry.get(key) is current
+
+
+def test_republishing_same_content_keeps_version(datasets):
+    registry = MetricsRegistry()
+    version = _publish(registry, datasets[0])
+    assert _publish(registry, datasets[0].copy()) is version
+
+
+def test_dataset_key_depends_on_content_only(datasets):
+    data = datasets[0]
+    key = dataset_key(data)
+    assert dataset_key(data.copy()) == key
+    # Le type des colonnes de texte (objets, catégories, chaînes Arrow de compact_frame) ne change pas la clé
+    compact = compact_frame(data)
+    text = ['Nom', 'Type', 'Commune', 'Région', 'Département', 'nom_complet']
+    assert dataset_key(data.assign(**{column: compact[column].set_axis(data.index) for column in text})) == key
+
+    renamed = data.copy()
+    renamed.loc[renamed.index[0], 'Nom'] = "Autre nom"
+    assert dataset_key(renamed) != key
+    assert dataset_key(datasets[1]) != key
@@ -0,0 +1,44 @@
+"""
+Tests de l'index de recherche par nom : l'ordre des suggestions est comparé à un tri exhaustif des noms.
+Avec assez de lignes, les premiers noms de certains mots courts ne suffisent pas à ordonner les suggestions
+et la lecture doit être élargie (voir NameSearchIndex._ranked).
+"""
+import pytest
+
+from benchmarks.synthetic import generate_food_service
+from src.utils.clean_data import clean_data
+from src.utils.name_search import PREFIXE_COURT, NameSearchIndex, fold_text
+
+LIGNES = 50_000
+
+
+@pytest.fixture(scope="module")
+def index() -> NameSearchIndex:
+    return NameSearchIndex(clean_data(generate_food_service(LIGNES)))
+
+
+@pytest.fixture(scope="module")
+def brute_force(index):
+    """
+    :return: Une fonction renvoyant, pour un mot saisi, les noms dont un mot commence par lui : ceux qui commencent
+    par ce mot, puis l'ordre alphabétique (l'ordre de index.noms), limités à index.limit.
+    """
+    padded = [" " + fold_text(nom) for nom in index.noms]
+
+    def search(query: str) -> list:
+        word = " " + fold_text(query)
+        matches = [i for i, nom in enumerate(padded) if word in nom]
+        matches.sort(key=lambda i: (not padded[i].startswith(word), i))
+        return [index.noms[i] for i in matches[:index.limit]]
+    return search
+
+
+def test_short_prefixes_match_brute_force(index, brute_force):
+    prefixes = [prefix for prefix in index._short if len(prefix) <= PREFIXE_COURT]
+    for prefix in prefixes:
+        assert list(index.search(prefix)) == brute_force(prefix), prefix
+
+
+@pytest.mark.parametrize("query", ["auberge", "rest", "Crêperie", "zzz"])
+def test_search_matches_brute_force(index, brute_force, query):
+    assert list(index.search(query)) == brute_force(query)
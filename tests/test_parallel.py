@@ -0,0 +1,47 @@
+"""
+Tests du nettoyage parallèle : parallel_clean_data doit donner exactement clean_data puis compute_metrics.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import generate_food_service
+from src.utils.aggregation import compute_metrics
+from src.utils.clean_data import clean_data
+from src.utils.parallel import parallel_clean_data
+
+LIGNES = 3_000
+
+
+@pytest.fixture(scope="module")
+def snapshot(tmp_path_factory) -> str:
+    """
+    Instantané brut de trois départements et de lignes sans département ni région. Chaque groupe forme un lot ;
+    les coordonnées d'un département sont toutes manquantes, si bien que son lot ne garde aucune ligne.
+    """
+    raw = generate_food_service(LIGNES, seed=1)
+    kept = raw['Département'].value_counts().index[:3]
+    raw = raw[raw['Département'].isin(kept)].reset_index(drop=True)
+    rng = np.random.default_rng(1)
+    raw.loc[rng.random(len(raw)) < 0.05, 'Département'] = None
+    raw.loc[rng.random(len(raw)) < 0.05, 'Région'] = None
+    raw.loc[raw['Département'] == kept[2], 'OSM Point'] = None
+
+    path = str(tmp_path_factory.mktemp("parallel") / "brut.parquet")
+    raw.to_parquet(path)
+    return path
+
+
+@pytest.mark.parametrize("workers", [2, 3])
+def test_parallel_matches_serial(snapshot, workers):
+    data = clean_data(pd.read_parquet(snapshot))
+    metrics = compute_metrics(data)
+    assert data['Département'].isna().any() and data['Région'].isna().any()
+
+    other, other_metrics = parallel_clean_data(snapshot, workers)
+
+    pd.testing.assert_frame_equal(other, data)
+    pd.testing.assert_index_equal(other.index, data.index)
+    assert other_metrics.to_dict(other) == metrics.to_dict(data)
+    for name in ('dense', 'communes', 'counts', 'offsets'):
+        np.testing.assert_array_equal(getattr(other_metrics.cube, name), getattr(metrics.cube, name))
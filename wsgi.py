@@ -0,0 +1,7 @@
+"""
+Point d'entrée WSGI du mode production.
+Lancement : gunicorn wsgi:server (la configuration est lue dans gunicorn.conf.py).
+"""
+from src.utils.serving import create_production_server
+
+server = create_production_server()